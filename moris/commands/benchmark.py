@@ -0,0 +1,200 @@
+import os
+import time
+import argparse
+from typing import List, Dict
+
+from moris.utils import *
+from moris.model import OptModel
+from moris.model.model import SolverStatus
+from moris.model.relax import weighted_proto, solve_relaxation
+from moris.model.autoconf import Candidates, extract_features, run_config, tune_rules, save_rules
+from moris.data import Dataset, DataLoader
+
+
+def list_instances(data_dir: str = DIR.TrainDir) -> List[str]:
+    """
+    数据集目录下的所有算例（按编号排序）
+    :param data_dir: 算例目录
+    :return:
+    """
+    files = [f for f in os.listdir(data_dir) if f.endswith(".txt")]
+    return sorted(files, key=lambda f: int("".join([c for c in f if c.isdigit()]) or 0))
+
+
+def run_objective_mode(filepath: str, mode: str, time_limit: int) -> Dict[str, object]:
+    """
+    以指定目标模式构建并求解单个算例
+    :param filepath: 算例路径
+    :param mode: 目标模式（weighted/lexico）
+    :param time_limit: 求解时间上限（毫秒）
+    :return:
+    """
+    s_t = time.time()
+    model = OptModel(DataLoader(Dataset(filepath)))
+    model.buildModel()
+    model.minObj(mode=mode)
+    b_t = time.time()
+    status = model.solveModel(time_limit=time_limit)
+    e_t = time.time()
+    return {
+        "mode": mode,
+        "status": SolverStatus.get(status, str(status)),
+        "build_time": b_t - s_t,
+        "solve_time": e_t - b_t,
+        "obj": model.WeightedObjValue if model.HasSolution else None
+    }
+
+
+def bench_objective_modes(files: List[str], data_dir: str = DIR.TrainDir,
+                          time_limit: int = 60000) -> List[Dict[str, object]]:
+    """
+    比较加权模式与字典序模式的求解时间和最终加权目标值
+    :param files: 算例文件名
+    :param data_dir: 算例目录
+    :param time_limit: 每个模式的求解时间上限（毫秒）
+    :return:
+    """
+    rows = []
+    print("{0:<20}{1:<10}{2:<12}{3:>10}{4:>10}{5:>14}".format(
+        "instance", "mode", "status", "build(s)", "solve(s)", "weighted_obj"))
+    for f in files:
+        for mode in ["weighted", "lexico"]:
+            try:
+                res = run_objective_mode(get_path(data_dir, f), mode, time_limit)
+            except Exception as e:
+                # 数据异常的算例记录错误后继续
+                res = {"mode": mode, "status": "ERROR", "build_time": 0.0, "solve_time": 0.0, "obj": None,
+                       "error": repr(e)}
+            res["instance"] = f
+            rows.append(res)
+            obj = "-" if res["obj"] is None else "{0:.4f}".format(res["obj"])
+            print("{0:<20}{1:<10}{2:<12}{3:>10.2f}{4:>10.2f}{5:>14}".format(
+                f, mode, res["status"], res["build_time"], res["solve_time"], obj))
+    return rows
+
+
+def run_variant(filepath: str, build_kwargs: Dict[str, object], time_limit: int) -> Dict[str, object]:
+    """
+    以指定的构建选项构建并求解单个算例，记录LP松弛的根节点下界与分支节点数
+    :param filepath: 算例路径
+    :param build_kwargs: buildModel的参数
+    :param time_limit: 求解时间上限（毫秒）
+    :return:
+    """
+    s_t = time.time()
+    model = OptModel(DataLoader(Dataset(filepath)))
+    model.buildModel(**build_kwargs)
+    b_t = time.time()
+    relax = solve_relaxation(weighted_proto(model), time_limit=time_limit)
+    r_t = time.time()
+    status = model.solveModel(time_limit=time_limit)
+    e_t = time.time()
+    return {
+        "rows": model.solver.NumConstraints(),
+        "status": SolverStatus.get(status, str(status)),
+        "build_time": b_t - s_t,
+        "root_bound": relax["bound"],
+        "lp_time": r_t - b_t,
+        "nodes": model.solver.nodes(),
+        "solve_time": e_t - r_t,
+        "obj": model.WeightedObjValue if model.HasSolution else None
+    }
+
+
+def bench_variants(files: List[str], variants: Dict[str, Dict[str, object]], data_dir: str = DIR.TrainDir,
+                   time_limit: int = 60000) -> List[Dict[str, object]]:
+    """
+    比较不同构建选项（圈数约束形式、分片构建等）的模型行数、构建时间、根节点下界、分支节点数、求解时间与目标值
+    :param files: 算例文件名
+    :param variants: 名称 -> buildModel的参数
+    :param data_dir: 算例目录
+    :param time_limit: 每次求解的时间上限（毫秒）
+    :return:
+    """
+    rows = []
+    print("{0:<20}{1:<10}{2:>8} {3:<11}{4:>10}{5:>12}{6:>10}{7:>10}{8:>14}".format(
+        "instance", "variant", "rows", "status", "build(s)", "root_bound", "nodes", "solve(s)", "weighted_obj"))
+    for f in files:
+        for name, build_kwargs in variants.items():
+            try:
+                res = run_variant(get_path(data_dir, f), build_kwargs, time_limit)
+            except Exception as e:
+                res = {"rows": 0, "status": "ERROR", "build_time": 0.0, "root_bound": None, "nodes": 0,
+                       "solve_time": 0.0, "obj": None, "error": repr(e)}
+            res["instance"] = f
+            res["variant"] = name
+            rows.append(res)
+            bound = "-" if res["root_bound"] is None else "{0:.4f}".format(res["root_bound"])
+            obj = "-" if res["obj"] is None else "{0:.4f}".format(res["obj"])
+            print("{0:<20}{1:<10}{2:>8} {3:<11}{4:>10.2f}{5:>12}{6:>10}{7:>10.2f}{8:>14}".format(
+                f, name, res["rows"], res["status"], res["build_time"], bound, res["nodes"], res["solve_time"], obj))
+    return rows
+
+
+# 构建选项的对比组
+Variants = {
+    "circle": {"index": {"circle": "index"}, "position": {"circle": "position"}},
+    "sharded": {"serial": {}, "sharded": {"processes": 4}},
+}
+
+
+def bench_engines(files: List[str], candidates: List[str] = None, data_dir: str = DIR.TrainDir,
+                  time_limit: int = None) -> List[Dict[str, object]]:
+    """
+    以各候选配置求解算例并记录算例特征，结果用于离线调整自动配置的规则表（autoconf.tune_rules）
+    :param files: 算例文件名
+    :param candidates: 候选配置名，默认全部
+    :param data_dir: 算例目录
+    :param time_limit: 每次求解的时间上限（毫秒），None时使用候选配置的时间上限
+    :return:
+    """
+    candidates = list(Candidates.keys()) if candidates is None else candidates
+    rows = []
+    print("{0:<20}{1:<14}{2:>10} {3:<11}{4:>10}{5:>10}{6:>14}".format(
+        "instance", "candidate", "triples", "status", "build(s)", "solve(s)", "weighted_obj"))
+    for f in files:
+        try:
+            features = extract_features(DataLoader(Dataset(get_path(data_dir, f))))
+        except Exception as e:
+            print("{0:<20}ERROR {1}".format(f, repr(e)))
+            continue
+        for cand in candidates:
+            try:
+                res = run_config(DataLoader(Dataset(get_path(data_dir, f))), Candidates[cand], time_limit)
+                res.pop("model")
+            except Exception as e:
+                res = {"status": "ERROR", "obj": None, "bound": None, "build_time": 0.0, "solve_time": 0.0,
+                       "error": repr(e)}
+            res.update({"instance": f, "candidate": cand, "features": features})
+            rows.append(res)
+            obj = "-" if res["obj"] is None else "{0:.4f}".format(res["obj"])
+            print("{0:<20}{1:<14}{2:>10} {3:<11}{4:>10.2f}{5:>10.2f}{6:>14}".format(
+                f, cand, features["triples"], res["status"], res["build_time"], res["solve_time"], obj))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MORIS benchmark")
+    parser.add_argument("instances", nargs="*", help="instance file names, default: all")
+    parser.add_argument("--data-dir", default=DIR.TrainDir)
+    parser.add_argument("--time-limit", type=int, default=None,
+                        help="milliseconds per solve, default 60000 (--engines: the candidate's own limit)")
+    parser.add_argument("--compare", choices=list(Variants.keys()),
+                        help="compare build variants instead of objective modes")
+    parser.add_argument("--engines", nargs="*", choices=list(Candidates.keys()),
+                        help="compare candidate engine configs (default: all)")
+    parser.add_argument("--tune", help="write the auto-configuration rule table tuned from --engines results")
+    args = parser.parse_args()
+    files = args.instances or list_instances(args.data_dir)
+    if args.engines is not None or args.tune:
+        rows = bench_engines(files, args.engines or None, args.data_dir, args.time_limit)
+        if args.tune:
+            save_rules(tune_rules(rows), args.tune)
+    elif args.compare:
+        bench_variants(files, Variants[args.compare], args.data_dir, args.time_limit or 60000)
+    else:
+        bench_objective_modes(files, args.data_dir, args.time_limit or 60000)
+
+
+if __name__ == '__main__':
+    main()
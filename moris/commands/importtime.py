@@ -0,0 +1,57 @@
+import sys
+import subprocess
+from typing import Dict, List, Tuple
+
+
+# 各模块的导入耗时预算（毫秒）
+ImportBudget = {
+    "moris.utils": 50,
+    "moris.data": 80,
+    "moris.graph": 50,
+    "moris.model": 120,
+}
+# 导入后不应被加载的重量级依赖（首次使用相应子系统时才加载）
+HeavyModules = ["polars", "pandas", "pyarrow", "numpy", "igraph", "networkx", "ortools"]
+
+
+def measure_import(module: str) -> Tuple[float, List[str]]:
+    """
+    在独立进程中用 python -X importtime 测量模块的累计导入耗时
+    :param module: 模块名
+    :return: (耗时毫秒, 被加载的重量级依赖)
+    """
+    code = "import {0}, sys; print(','.join([m for m in {1} if m in sys.modules]))".format(module, HeavyModules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, check=True)
+    cost = 0.0
+    for line in proc.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cost = int(parts[1]) / 1000
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return cost, loaded
+
+
+def check_import_budget(budget: Dict[str, float] = None, repeat: int = 3) -> bool:
+    """
+    检查各模块的导入耗时是否在预算内（取多次测量的最小值）
+    :param budget: 模块 -> 预算（毫秒）
+    :param repeat: 测量次数
+    :return: 是否全部满足
+    """
+    budget = ImportBudget if budget is None else budget
+    passed = True
+    print("{0:<16}{1:>12}{2:>12}  {3}".format("module", "cost(ms)", "budget(ms)", "heavy modules"))
+    for module, limit in budget.items():
+        results = [measure_import(module) for _ in range(repeat)]
+        cost = min([r[0] for r in results])
+        loaded = results[0][1]
+        ok = cost <= limit and len(loaded) == 0
+        passed = passed and ok
+        print("{0:<16}{1:>12.1f}{2:>12.1f}  {3}{4}".format(
+            module, cost, limit, ",".join(loaded) or "-", "" if ok else "  <-- FAIL"))
+    return passed
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check_import_budget() else 1)
@@ -1,6 +1,7 @@
 # https://pypi.tuna.tsinghua.edu.cn/simple
 from moris.utils import *
 from moris.model import OptModel
+from moris.model.model import SolverStatus
 from moris.data import Dataset, DataLoader
 
 
@@ -27,9 +28,12 @@ def main():
     model.addObj2()
     model.minObj()
     # 求解
-    model.solveModel()
+    status = model.solveModel()
+    if not model.HasSolution:
+        print("no solution: {0}".format(SolverStatus.get(status, status)))
+        return
     print(model.ObjValue)
-    df = model.get_solution()
+    df = model.get_solution("df.csv")
     print(df)
     print(model.OpCnt)
 
@@ -0,0 +1,142 @@
+import os
+import csv
+import time
+import argparse
+import tempfile
+import importlib.util
+import multiprocessing as mp
+from typing import List, Dict
+
+from moris.utils import *
+from moris.data.generator import InstanceGenerator, GeneratorConfig
+
+
+# 引擎 -> (求解后端, 目标模式)
+Engines = {
+    "scip": ("SCIP", "weighted"),
+    "lexico": ("SCIP", "lexico"),
+    "cpsat": ("CP_SAT", "weighted"),
+}
+
+
+def run_point(filepath: str, engine: str, time_limit: int) -> Dict[str, object]:
+    """
+    在独立子进程中构建并求解一个算例，记录耗时与峰值内存
+    :param filepath: 算例路径
+    :param engine: 引擎名
+    :param time_limit: 求解时间上限（毫秒）
+    :return:
+    """
+    from moris.data import Dataset, DataLoader
+    from moris.model import OptModel
+    from moris.model.model import SolverStatus
+
+    backend, mode = Engines[engine]
+    s_t = time.time()
+    model = OptModel(DataLoader(Dataset(filepath)), backend=backend)
+    model.buildModel()
+    model.minObj(mode=mode)
+    b_t = time.time()
+    status = model.solveModel(time_limit=time_limit)
+    e_t = time.time()
+    return {
+        "engine": engine,
+        "vars": model.solver.NumVariables(),
+        "constrs": model.solver.NumConstraints(),
+        "build_time": b_t - s_t,
+        "solve_time": e_t - b_t,
+        # 低内存构建按约束族重置过峰值，取两者中的较大值
+        "peak_rss_mb": max(model.stats.PeakRss, peak_rss_mb()),
+        "status": SolverStatus.get(status, str(status)),
+        "obj": model.WeightedObjValue if model.HasSolution else None
+    }
+
+
+def sweep(param: str, values: List[float], engines: List[str], time_limit: int, base: Dict[str, object] = None,
+          work_dir: str = None) -> List[Dict[str, object]]:
+    """
+    固定其它参数，逐个取值扫描单个生成参数
+    :param param: GeneratorConfig中的参数名
+    :param values: 参数取值
+    :param engines: 引擎列表
+    :param time_limit: 每次求解的时间上限（毫秒）
+    :param base: 其它参数
+    :param work_dir: 生成算例的目录
+    :return:
+    """
+    work_dir = tempfile.mkdtemp(prefix="moris-scaling-") if work_dir is None else work_dir
+    # 先检查所有取值，不可行的取值在求解前报错
+    configs = [GeneratorConfig(**dict(base or {}, **{param: value})) for value in values]
+    rows = []
+    for value, config in zip(values, configs):
+        filepath = get_path(work_dir, "{0}-{1}.txt".format(param, value))
+        dump_data(InstanceGenerator(config).generate(), filepath)
+        for engine in engines:
+            # 每个点单独一个进程，峰值内存互不影响
+            with mp.Pool(processes=1, maxtasksperchild=1) as pool:
+                try:
+                    res = pool.apply(run_point, (filepath, engine, time_limit))
+                except Exception as e:
+                    res = {"engine": engine, "status": "ERROR", "error": repr(e)}
+            res["param"] = param
+            res["value"] = value
+            res["size_kb"] = os.path.getsize(filepath) / 1024
+            rows.append(res)
+            print(", ".join(["{0}={1}".format(k, v) for k, v in res.items()]))
+    return rows
+
+
+def write_csv(rows: List[Dict[str, object]], path: str):
+    columns = ["param", "value", "engine", "size_kb", "vars", "constrs", "build_time", "solve_time",
+               "peak_rss_mb", "status", "obj"]
+    with open(file=path, mode="w", encoding="utf-8", newline="") as fp:
+        writer = csv.DictWriter(fp, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def plot(rows: List[Dict[str, object]], path: str):
+    """
+    构建耗时、求解耗时、峰值内存随规模（变量数）的变化；需要安装matplotlib
+    :param rows: 扫描结果
+    :param path: 图片路径
+    :return:
+    """
+    if importlib.util.find_spec("matplotlib") is None:
+        print("matplotlib is not installed, skip plotting")
+        return
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    metrics = [("build_time", "build time (s)"), ("solve_time", "solve time (s)"), ("peak_rss_mb", "peak RSS (MB)")]
+    fig, axes = plt.subplots(1, len(metrics), figsize=(5 * len(metrics), 4))
+    for ax, (key, label) in zip(axes, metrics):
+        for engine in sorted(set([r["engine"] for r in rows])):
+            data = sorted([(r["vars"], r[key]) for r in rows if r["engine"] == engine and r.get(key) is not None])
+            ax.plot([d[0] for d in data], [d[1] for d in data], marker="o", label=engine)
+        ax.set_xlabel("variables")
+        ax.set_ylabel(label)
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MORIS scaling benchmark on synthetic instances")
+    parser.add_argument("--param", default="n_workers", help="GeneratorConfig parameter to sweep")
+    # 默认的20个工位、30道工序下，工人数不能超过20
+    parser.add_argument("--values", default="4,8,12,16,20", help="comma separated values")
+    parser.add_argument("--engines", default="scip", help="comma separated: " + ",".join(Engines))
+    parser.add_argument("--time-limit", type=int, default=60000, help="milliseconds per solve")
+    parser.add_argument("--out", default="scaling", help="output prefix for .csv/.png")
+    args = parser.parse_args()
+    cast = float if args.param in ["skill_density", "fixed_ratio", "mono_ratio"] else int
+    values = [cast(v) for v in args.values.split(",")]
+    rows = sweep(args.param, values, args.engines.split(","), args.time_limit)
+    write_csv(rows, args.out + ".csv")
+    plot(rows, args.out + ".png")
+
+
+if __name__ == '__main__':
+    main()
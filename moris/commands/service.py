@@ -0,0 +1,355 @@
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import multiprocessing as mp
+from typing import Dict, Optional, Tuple
+
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# 求解时间上限之外，为建模与结果输出预留的时间（秒）
+GRACE = 30
+
+# 请求中可选的求解后端与目标模式
+Backends = ["SCIP", "CP_SAT"]
+Modes = ["weighted", "lexico"]
+
+
+def _warm_up():
+    """
+    预先导入重量级依赖并创建一次求解器，之后的任务不再承担这部分开销
+    :return:
+    """
+    from moris.model import runner
+    from moris.model.model import pywraplp
+    from moris.data.dataset import pl
+    pywraplp.Solver.CreateSolver("SCIP")
+    pl.DataFrame({"a": [1]})
+    return runner
+
+
+def _worker_main(conn, cache_dir: Optional[str]):
+    """
+    求解进程：循环接收任务并返回结果
+    :param conn: 与服务进程通信的管道
+    :param cache_dir: 结果缓存目录
+    :return:
+    """
+    runner = _warm_up()
+    cache = None
+    if cache_dir:
+        from moris.data.cache import ResultCache
+        cache = ResultCache(cache_dir)
+    conn.send(("ready", None))
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        job_id, data, params = msg
+        try:
+            res = runner.solve_instance(data, cache=cache, **params)
+            conn.send((DONE, res))
+        except Exception as e:
+            conn.send((FAILED, repr(e)))
+
+
+class Job:
+    __slots__ = ["job_id", "data", "params", "time_limit", "status", "result", "error",
+                 "submitted", "started", "finished", "cancel"]
+
+    def __init__(self, data: Dict, params: Dict[str, object]):
+        self.job_id = uuid.uuid4().hex
+        self.data = data
+        self.params = params
+        self.time_limit = params.get("time_limit")
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel = False
+
+    def to_dict(self, with_result: bool = True) -> Dict[str, object]:
+        d = {"job_id": self.job_id, "status": self.status, "submitted": self.submitted,
+             "started": self.started, "finished": self.finished, "error": self.error}
+        if with_result and self.result is not None:
+            d.update(self.result)
+        return d
+
+
+class SolverWorker:
+    """
+    预热的求解子进程；任务被取消或超时时直接结束子进程并重新拉起
+    """
+    def __init__(self, ctx, cache_dir: Optional[str]):
+        self.ctx = ctx
+        self.cache_dir = cache_dir
+        self.proc = None
+        self.conn = None
+
+    def start(self):
+        self.conn, child = self.ctx.Pipe()
+        self.proc = self.ctx.Process(target=_worker_main, args=(child, self.cache_dir), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def wait_ready(self):
+        self.conn.recv()
+
+    def restart(self):
+        self.stop(force=True)
+        self.start()
+
+    def stop(self, force: bool = False):
+        if self.proc is None:
+            return
+        if force:
+            self.proc.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.conn.close()
+
+
+class Service:
+    """
+    本地优化服务：有界任务队列 + 预热的求解进程池
+    """
+    def __init__(self, workers: int = 2, queue_size: int = 16, default_time_limit: int = 60000,
+                 cache_dir: str = None, max_history: int = 1000):
+        self.ctx = mp.get_context("spawn")
+        self.workers = [SolverWorker(self.ctx, cache_dir) for _ in range(workers)]
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self.default_time_limit = default_time_limit
+        self.max_history = max_history
+        self.jobs: Dict[str, Job] = {}
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            worker.start()
+        await asyncio.gather(*[loop.run_in_executor(None, w.wait_ready) for w in self.workers])
+        for worker in self.workers:
+            asyncio.ensure_future(self.consume(worker))
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def submit(self, data: Dict, params: Dict[str, object]) -> Job:
+        params = dict(params)
+        params.setdefault("time_limit", self.default_time_limit)
+        job = Job(data, params)
+        # 队列已满时抛出asyncio.QueueFull
+        self.queue.put_nowait(job)
+        self.jobs[job.job_id] = job
+        self.prune()
+        return job
+
+    def prune(self):
+        finished = [j for j in self.jobs.values() if j.status in [DONE, FAILED, CANCELLED]]
+        # 状态已更新但结束时间尚未写入的任务按提交时间排序
+        for job in sorted(finished, key=lambda j: j.finished or j.submitted)[:max(len(self.jobs) - self.max_history, 0)]:
+            del self.jobs[job.job_id]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.finished = time.time()
+        elif job.status == RUNNING:
+            job.cancel = True
+        return job
+
+    async def consume(self, worker: SolverWorker):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            if job.status == CANCELLED:
+                continue
+            job.status = RUNNING
+            job.started = time.time()
+            worker.conn.send((job.job_id, job.data, job.params))
+            # 算例数据已交给求解进程，不再保留
+            job.data = None
+            deadline = None
+            if job.time_limit:
+                deadline = job.started + job.time_limit / 1000 + GRACE
+            while True:
+                ready = await loop.run_in_executor(None, worker.conn.poll, 0.2)
+                if ready:
+                    try:
+                        status, res = worker.conn.recv()
+                    except (EOFError, OSError) as e:
+                        status, res = FAILED, repr(e)
+                    if status == DONE:
+                        job.result = res
+                    else:
+                        job.error = res
+                    job.status = status
+                    if not worker.proc.is_alive():
+                        worker.restart()
+                        await loop.run_in_executor(None, worker.wait_ready)
+                    break
+                timeout = deadline is not None and time.time() > deadline
+                if job.cancel or timeout or not worker.proc.is_alive():
+                    job.status = CANCELLED if job.cancel else FAILED
+                    job.error = None if job.cancel else ("timeout" if timeout else "worker died")
+                    worker.restart()
+                    await loop.run_in_executor(None, worker.wait_ready)
+                    break
+            job.finished = time.time()
+
+    @property
+    def Health(self) -> Dict[str, object]:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": len(self.workers), "queue": self.queue.qsize(), "queue_size": self.queue_size,
+                "jobs": counts}
+
+    def route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, object]]:
+        """
+        POST /jobs                 提交算例：{"instance": {...}, "time_limit": ms, "backend": ..., "mode": ...}
+                                   或直接提交算例json
+        GET /jobs/{id}             任务状态（完成后附带dispatch_results）
+        GET /jobs/{id}/result      dispatch_results
+        DELETE /jobs/{id}          取消任务
+        GET /health                服务状态
+        :return: (HTTP状态码, 响应json)
+        """
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if method == "GET" and parts == ["health"]:
+            return 200, self.Health
+        if method == "POST" and parts == ["jobs"]:
+            try:
+                payload = json.loads(body.decode("utf-8"))
+            except ValueError:
+                return 400, {"error": "invalid json"}
+            if not isinstance(payload, dict):
+                return 400, {"error": "request body must be a json object"}
+            data = payload.get("instance", payload)
+            if not isinstance(data, dict) or "process_list" not in data:
+                return 400, {"error": "missing instance"}
+            params = {k: payload[k] for k in ["time_limit", "backend", "mode"] if k in payload}
+            error = check_params(params)
+            if error is not None:
+                return 400, {"error": error}
+            try:
+                job = self.submit(data, params)
+            except asyncio.QueueFull:
+                return 503, {"error": "queue full"}
+            return 202, job.to_dict()
+        if len(parts) in [2, 3] and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return 404, {"error": "unknown job"}
+            if method == "DELETE" and len(parts) == 2:
+                return 200, self.cancel(job.job_id).to_dict(with_result=False)
+            if method == "GET" and len(parts) == 2:
+                return 200, job.to_dict()
+            if method == "GET" and parts[2] == "result":
+                if job.status != DONE:
+                    return 409, job.to_dict(with_result=False)
+                return 200, {"dispatch_results": job.result["dispatch_results"]}
+        return 404, {"error": "not found"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        最小的HTTP/1.1处理：每个连接一个请求
+        :return:
+        """
+        try:
+            line = await reader.readline()
+            method, path, _ = line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in [b"\r\n", b"\n", b""]:
+                    break
+                k, v = h.decode("latin-1").split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            code, res = self.route(method.upper(), path, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            code, res = 400, {"error": "bad request"}
+        except Exception as e:
+            # 未预料的错误也返回响应，不直接断开连接
+            code, res = 500, {"error": repr(e)}
+        content = json.dumps(res, ensure_ascii=False).encode("utf-8")
+        reason = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                  409: "Conflict", 500: "Internal Server Error", 503: "Service Unavailable"}[code]
+        writer.write("HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\nContent-Length: {2}\r\n"
+                     "Connection: close\r\n\r\n".format(code, reason, len(content)).encode("latin-1") + content)
+        await writer.drain()
+        writer.close()
+
+
+def check_params(params: Dict[str, object]) -> Optional[str]:
+    """
+    检查请求中的求解参数；参数不合法的任务不入队（求解进程收到后才报错会使任务一直处于running）
+    :param params: time_limit / backend / mode
+    :return: 错误信息，合法时为None
+    """
+    time_limit = params.get("time_limit")
+    # bool是int的子类，需单独排除
+    if "time_limit" in params and (not isinstance(time_limit, int) or isinstance(time_limit, bool)
+                                   or time_limit <= 0):
+        return "time_limit must be a positive integer (milliseconds)"
+    if "backend" in params and params["backend"] not in Backends:
+        return "backend must be one of {0}".format(", ".join(Backends))
+    if "mode" in params and params["mode"] not in Modes:
+        return "mode must be one of {0}".format(", ".join(Modes))
+    return None
+
+
+async def serve(service: Service, host: str = "127.0.0.1", port: int = 8765, unix: str = None):
+    await service.start()
+    if unix:
+        server = await asyncio.start_unix_server(service.handle, path=unix)
+    else:
+        server = await asyncio.start_server(service.handle, host=host, port=port)
+    print("moris service listening on {0}".format(unix or "{0}:{1}".format(host, port)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MORIS local optimization service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="listen on a unix socket instead of tcp")
+    parser.add_argument("--workers", type=int, default=2, help="number of pre-warmed solver processes")
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--time-limit", type=int, default=60000, help="default milliseconds per job")
+    parser.add_argument("--cache-dir", default=None, help="result cache directory")
+    args = parser.parse_args()
+    service = Service(args.workers, args.queue_size, args.time_limit, args.cache_dir)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,8 @@
 from .dataset import Dataset
 from .data_loader import DataLoader
+from .writer import DispatchWriter
+from .generator import InstanceGenerator, GeneratorConfig
+from .cache import ResultCache
+from .analyzer import Analyzer, analyze, load_instance
+from .eligibility import Eligibility, CSR
+from .plant import PlantData, SharedPlant, group_by_plant
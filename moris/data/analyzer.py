@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+from typing import List, Dict, Tuple, Optional
+
+from .dataset import Dataset
+from .data_loader import DataLoader
+from moris.utils import LazyModule
+
+
+pl = LazyModule("polars")
+
+
+ERROR = "error"
+WARNING = "warning"
+
+
+class Issue:
+    """
+    预检发现的单个问题
+    """
+    __slots__ = ["code", "level", "message", "items"]
+
+    def __init__(self, code: str, message: str, items: List[object] = None, level: str = ERROR):
+        self.code = code
+        self.level = level
+        self.message = message
+        self.items = [] if items is None else items
+
+    def __repr__(self):
+        items = ", ".join([str(x) for x in self.items[:10]])
+        more = " ... (+{0})".format(len(self.items) - 10) if len(self.items) > 10 else ""
+        return "[{0}] {1}: {2} [{3}{4}]".format(self.level, self.code, self.message, items, more)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"code": self.code, "level": self.level, "message": self.message, "items": [str(x) for x in self.items]}
+
+
+class InstanceError(ValueError):
+    def __init__(self, issues: List[Issue]):
+        self.issues = issues
+        super().__init__("\n".join([repr(issue) for issue in issues]))
+
+
+class Analyzer:
+    """
+    求解前的数据一致性与必要可行性检查，在DataLoader之后、建模之前运行
+    只做必要条件的检查：报告的错误必然导致模型不可行或建模失败，通过检查不代表模型一定可行
+    """
+    def __init__(self, data_loader: DataLoader):
+        self.data_loader = data_loader
+        self.dataset = data_loader.dataset
+        self.issues: List[Issue] = []
+
+    def add(self, code: str, message: str, items: List[object], level: str = ERROR):
+        if items:
+            self.issues.append(Issue(code, message, sorted(items, key=str), level))
+
+    def checkDuplicates(self):
+        """
+        工序、工人、工位编码重复
+        :return:
+        """
+        for code, df, col in [("DUPLICATE_OP", self.dataset.df_process, "op_code"),
+                              ("DUPLICATE_WORKER", self.dataset.df_w_st, "w_code"),
+                              ("DUPLICATE_STATION", self.dataset.df_station, "st_code")]:
+            dup = df.groupby(col).agg(pl.count().alias("cnt")).filter(pl.col("cnt") > 1)[col].to_list()
+            self.add(code, "duplicated {0}".format(col), dup)
+
+    def checkReferences(self, listOps: List[str]):
+        """
+        装配关系、邻居工位、工人技能、设备引用不存在的编码
+        :param listOps: 全部工序
+        :return:
+        """
+        setOps = set(listOps)
+        setSts = set(self.data_loader.listStations)
+        setParts = set(self.dataset.df_process["part_code"].to_list())
+        df_joint = self.dataset.df_joint
+        self.add("JOINT_UNKNOWN_OP", "joint_operation references unknown operation",
+                 list(set(df_joint["joint_op"].to_list()) - setOps))
+        self.add("JOINT_UNKNOWN_PART", "joint_operation references unknown part",
+                 list(set(df_joint["part_code"].to_list()) - setParts))
+        nbrs = self.dataset.df_station.select("nbr_st_list").explode("nbr_st_list")["nbr_st_list"].drop_nulls()
+        # 实际数据中常见相邻产线的工位不在算例中，不影响建模
+        self.add("UNKNOWN_NEIGHBOR_STATION", "neighbor_station_list references unknown station",
+                 list(set(nbrs.to_list()) - setSts), level=WARNING)
+        self.add("SKILL_UNKNOWN_OP", "operation_skill_list references unknown operation",
+                 list(set(self.dataset.df_w_skill["op_code"].to_list()) - setOps), level=WARNING)
+        machs = self.dataset.df_process["m_type"].unique().to_list()
+        self.add("UNKNOWN_MACHINE", "operation machine_type not in machine_list",
+                 list(set(machs) - set(self.data_loader.listMachines)))
+        cur = self.dataset.df_station.select("cur_m_list").explode("cur_m_list")["cur_m_list"].drop_nulls()
+        self.add("STATION_UNKNOWN_MACHINE", "curr_machine_list references unknown machine",
+                 list(set(cur.to_list()) - set(self.data_loader.listMachines)))
+
+    def checkEligibility(self, df: pl.DataFrame, listOps: List[str]):
+        """
+        工序没有可分配的工人、所需的固定设备不在任何工位上
+        :param df: DataLoader.df
+        :param listOps: 全部工序
+        :return:
+        """
+        self.add("NO_ELIGIBLE_WORKER", "operation category mastered by no worker",
+                 list(set(listOps) - set(df.filter(~pl.col("w_code").is_null())["op_code"].to_list())))
+        no_station = df \
+            .filter((pl.col("is_movable") == False) & pl.col("st_code").is_null())["op_code"].unique().to_list()
+        self.add("NO_MACHINE_STATION", "operation needs an unmovable machine placed on no station", no_station)
+
+    def checkFixedAlloc(self):
+        """
+        固定分配（设备，工序，工人，工位）与工人、工序的可分配工位冲突
+        :return:
+        """
+        dl = self.data_loader
+        fixed_alloc = dl.fixed_alloc
+        if not fixed_alloc:
+            return
+        wkToAvailSts = dl.wkToAvailSts
+        opToAvailSts = dl.opToAvailSts
+        opToAvailWks = dl.opToAvailWks
+        setSts = set(dl.listStations)
+        unknown, wk_conflict, op_conflict, skill_conflict = [], [], [], []
+        for m, op, w, s in fixed_alloc:
+            if s not in setSts or w not in wkToAvailSts:
+                unknown.append((op, w, s))
+                continue
+            if s not in wkToAvailSts[w]:
+                wk_conflict.append((op, w, s))
+            if s not in opToAvailSts.get((m, op), []):
+                op_conflict.append((op, w, s))
+            if w not in opToAvailWks.get((m, op), []):
+                skill_conflict.append((op, w, s))
+        self.add("FIXED_UNKNOWN", "fixed assignment references unknown worker or station", unknown)
+        self.add("FIXED_WORKER_STATION", "fixed station not available to the fixed worker", wk_conflict)
+        self.add("FIXED_OP_STATION", "fixed station not available to the operation", op_conflict)
+        self.add("FIXED_OP_WORKER", "fixed worker cannot do the operation", skill_conflict)
+        # 同一工位固定给了多个工人
+        pairs = {}
+        for m, op, w, s in fixed_alloc:
+            pairs.setdefault(s, set()).add(w)
+        self.add("FIXED_STATION_WORKERS", "station fixed to more than one worker",
+                 [s for s, wks in pairs.items() if len(wks) > 1])
+
+    def checkCounting(self, df: pl.DataFrame):
+        """
+        计数论证：工人至少占一个工位且每个工位至多一人；需要的工位数不超过工人能覆盖的工位数
+        :param df: DataLoader.df
+        :return:
+        """
+        dl = self.data_loader
+        conf = dl.conf
+        WkCnt, StCnt = dl.WkCnt, dl.StCnt
+        if WkCnt > StCnt:
+            self.add("WORKERS_EXCEED_STATIONS", "every worker needs a station, {0} workers > {1} stations"
+                     .format(WkCnt, StCnt), ["workers={0}".format(WkCnt), "stations={0}".format(StCnt)])
+        df = df.filter(~pl.col("w_code").is_null())
+        # 使用固定设备的工序只能在固定设备所在工位上，每个这样的工位都需要一个工人
+        fixed_sts = df.filter(pl.col("is_movable") == False) \
+            .groupby("op_code").agg(pl.col("st_code").drop_nulls().unique())
+        required = set([sts[0] for sts in fixed_sts["st_code"].to_list() if len(sts) == 1])
+        # 移动独占设备各占一个不带固定设备的工位
+        move_mono = df.filter((pl.col("is_mono") == True) & (pl.col("is_movable") == True))["m_type"].unique()
+        move_need = df.filter(pl.col("is_movable") == True)["m_type"].unique()
+        n_move = len(move_mono) + (1 if len(move_need) > len(move_mono) else 0)
+        capacity = WkCnt * int(conf["max_st_per_w"])
+        n_required = len(required) + n_move
+        if n_required > capacity:
+            self.add("STATIONS_EXCEED_CAPACITY",
+                     "at least {0} stations needed, workers can cover at most max_st_per_w * workers = {1}"
+                     .format(n_required, capacity),
+                     ["required={0}".format(n_required), "capacity={0}".format(capacity)])
+        n_move_sts = len(dl.listMoveSt)
+        if n_move > n_move_sts:
+            self.add("MOVABLE_STATIONS", "{0} stations needed for movable machines, only {1} free stations"
+                     .format(n_move, n_move_sts), list(move_mono.to_list()))
+        n_types = len(move_need)
+        if n_types > n_move_sts * int(conf["max_m_per_st"]):
+            self.add("MACHINES_EXCEED_SLOTS", "{0} movable machine types > free stations * max_m_per_st"
+                     .format(n_types), ["types={0}".format(n_types)])
+
+    def run(self) -> List[Issue]:
+        """
+        执行全部检查，返回所有问题（不在第一个问题处停止）
+        :return:
+        """
+        self.issues = []
+        try:
+            df = self.data_loader.df
+            listOps = self.dataset.df_process["op_code"].to_list()
+            self.checkDuplicates()
+            self.checkReferences(listOps)
+            self.checkEligibility(df, listOps)
+            self.checkFixedAlloc()
+            self.checkCounting(df)
+        except Exception as e:
+            # 数据表按需解析，结构不符的字段在检查中才报错
+            self.issues.append(parse_issue(e))
+        return self.issues
+
+    @property
+    def Errors(self) -> List[Issue]:
+        return [issue for issue in self.issues if issue.level == ERROR]
+
+
+def parse_issue(e: Exception) -> Issue:
+    return Issue("PARSE_ERROR", "failed to parse instance: {0}".format(repr(e)), [type(e).__name__])
+
+
+def load_instance(data: Dict, plant=None) -> Tuple[Optional[DataLoader], List[Issue]]:
+    """
+    解析算例；字段缺失或结构不符时不抛出异常，返回PARSE_ERROR问题
+    :param data: 算例原始数据
+    :param plant: 共享的工厂主数据（plant.PlantData）
+    :return: (数据，解析失败时为None；问题)
+    """
+    try:
+        return DataLoader(Dataset.from_data(data, plant)), []
+    except Exception as e:
+        return None, [parse_issue(e)]
+
+
+def analyze(data_loader: DataLoader, raise_on_error: bool = False) -> List[Issue]:
+    """
+    预检算例
+    :param data_loader: 数据
+    :param raise_on_error: 有错误时抛出InstanceError
+    :return: 全部问题
+    """
+    analyzer = Analyzer(data_loader)
+    issues = analyzer.run()
+    if raise_on_error and analyzer.Errors:
+        raise InstanceError(analyzer.Errors)
+    return issues
@@ -1,24 +1,24 @@
-import polars as pl
-import igraph as ig
-import networkx as nx
+from __future__ import annotations
+
 from typing import List, Dict, Tuple
 
 from .dataset import Dataset
-from moris.utils import OpStr
+from moris.utils import OpStr, LazyModule
+
+
+pl = LazyModule("polars")
+ig = LazyModule("igraph")
+nx = LazyModule("networkx")
 
 
 class BaseLoader:
     def __init__(self, dataset: Dataset):
         self.dataset = dataset
-        # 设备列表
-        self.listMachines = self.dataset.df_machine["m_type"].to_list()
-        # 工人列表
-        self.listWorkers = self.dataset.df_worker["w_code"].unique().to_list()
+        # 设备列表，工人列表，从小到达排序的工位（同一工厂的算例共享）
+        plant = self.dataset.plant
+        self.listMachines, self.listWorkers, self.listStations = \
+            self.masterLists(dataset) if plant is None else plant.lists
         self.WkCnt = len(self.listWorkers)
-
-        # 从小到达排序的工位
-        self.listStations = self.dataset.df_station \
-            .sort(by=["line_id"], descending=False)["st_code"].to_list()
         # 工位数
         self.StCnt = len(self.listStations)
         self.stToIdx = self.calStrToIdx(self.listStations)
@@ -34,14 +34,45 @@ class BaseLoader:
             .with_columns(
                 pl.concat_str(pl.col("m_type"), pl.col("op_code"), separator=";").alias("op_code")
             ) \
-            .groupby(by=["part_code"], maintain_order=True).agg(pl.col("op_code")) \
-            .to_pandas().set_index(["part_code"]).to_dict(orient="dict")["op_code"]
+            .groupby(by=["part_code"], maintain_order=True).agg(pl.col("op_code"))
+        partToOps = self.toDict(partToOps, ["part_code"], "op_code")
         self.partToOps = {part: [OpStr(op).to_tpl for op in ops_arr] for part, ops_arr in partToOps.items()}
         self.opToIdx = {part: self.calOpIdx(data) for part, data in self.partToOps.items()}
         # 工序对应的工件
-        self.opToPart = self.df_process \
-            .select(["op_code", "part_code"]) \
-            .to_pandas().set_index(["op_code"]).to_dict(orient="dict")["part_code"]
+        self.opToPart = self.toDict(self.df_process, ["op_code"], "part_code")
+        # 工序编号（输入数据中的operation_number）
+        df = self.dataset.df_process.select(["op_code", "op_id"])
+        self.opToNum = dict(zip(df["op_code"].to_list(), df["op_id"].to_list()))
+        # 工位所在产线
+        df = self.dataset.df_station.select(["st_code", "line_id"])
+        self.stToLine = dict(zip(df["st_code"].to_list(), df["line_id"].to_list()))
+
+    @staticmethod
+    def masterLists(dataset: Dataset) -> Tuple[List[str], List[str], List[str]]:
+        """
+        由主数据得到的设备、工人与（按产线排序的）工位列表
+        :param dataset: 数据
+        :return:
+        """
+        listMachines = dataset.df_machine["m_type"].to_list()
+        listWorkers = dataset.df_worker["w_code"].unique().to_list()
+        listStations = dataset.df_station \
+            .sort(by=["line_id"], descending=False)["st_code"].to_list()
+        return listMachines, listWorkers, listStations
+
+    @staticmethod
+    def toDict(df: pl.DataFrame, keys: List[str], value: str) -> Dict:
+        """
+        DataFrame -> dict，多个键时以元组为键（重复键保留最后一个）
+        :param df: 数据
+        :param keys: 键所在列
+        :param value: 值所在列
+        :return:
+        """
+        values = df[value].to_list()
+        if len(keys) == 1:
+            return dict(zip(df[keys[0]].to_list(), values))
+        return dict(zip(zip(*[df[k].to_list() for k in keys]), values))
 
     @staticmethod
     def calStrToIdx(data) -> Dict[str, int]:
@@ -62,12 +93,11 @@ class BaseLoader:
             .join(self.dataset.df_worker.select(["w_code", "op_cat", "e"]).unique(),
                   on=["op_cat"], how="left") \
             .select(["w_code", "op_code", "op_time", "e"])
-        d = df \
+        df = df \
             .with_columns([
                 (pl.col("op_time") / pl.col("e")).alias("w_time")
-            ]) \
-            .to_pandas().set_index(["op_code", "w_code"]).to_dict(orient="dict")["w_time"]
-        return d
+            ])
+        return self.toDict(df, ["op_code", "w_code"], "w_time")
 
     @property
     def stToNbrSts(self) -> Dict[str, List[str]]:
@@ -75,10 +105,7 @@ class BaseLoader:
         工位对应的邻居工位
         :return:
         """
-        d = self.dataset.df_station \
-            .select(["st_code", "nbr_st_list"]) \
-            .to_pandas().set_index(["st_code"]).to_dict(orient="dict")["nbr_st_list"]
-        return d
+        return self.toDict(self.dataset.df_station, ["st_code"], "nbr_st_list")
 
     @property
     def df_process(self) -> pl.DataFrame:
@@ -109,6 +136,8 @@ class BaseLoader:
                 pl.concat_str([pl.col("from"), pl.col("to")], separator=",").alias("name")
             ])
         _g = nx.from_pandas_edgelist(df=df, source="from", target="to", edge_attr=True, create_using=nx.DiGraph)
+        # 没有装配关系的工件（joint_operation_list为空时为全部工件）作为孤立点
+        _g.add_nodes_from(self.partToOps)
         g = ig.Graph.from_networkx(_g, vertex_attr_hashable="name")
         return g
 
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import hashlib
+from typing import List, Dict, Optional
+
+
+def _sorted(items: List[Dict], key: str) -> List[Dict]:
+    return sorted(items, key=lambda x: str(x.get(key, "")))
+
+
+def canonical_instance(data: Dict) -> Dict:
+    """
+    规范化算例：工人、工位、工序、设备等列表按编码排序，与输入顺序无关
+    :param data: 算例原始数据
+    :return:
+    """
+    workers = []
+    for w in _sorted(data["worker_list"], "worker_code"):
+        workers.append({
+            "worker_code": w["worker_code"],
+            "operation_skill_list": _sorted(w["operation_skill_list"], "operation_code"),
+            "operation_category_skill_list": _sorted(w["operation_category_skill_list"], "operation_category"),
+            "curr_station_list": _sorted(w["curr_station_list"], "station_code")
+        })
+    stations = []
+    for s in _sorted(data["station_list"], "station_code"):
+        s = dict(s)
+        s["curr_machine_list"] = _sorted(s["curr_machine_list"], "machine_type")
+        s["neighbor_station_list"] = _sorted(s["neighbor_station_list"], "station_code")
+        stations.append(s)
+    joint = sorted(data["joint_operation_list"], key=lambda x: (x["part_code"], x["joint_operation"]))
+    return {
+        "worker_list": workers,
+        "station_list": stations,
+        "process_list": _sorted(data["process_list"], "operation"),
+        "machine_list": _sorted(data["machine_list"], "machine_type"),
+        "joint_operation_list": joint,
+        "config_param": data["config_param"]
+    }
+
+
+def content_hash(obj) -> str:
+    content = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def instance_hash(data: Dict) -> str:
+    """
+    算例的规范化哈希
+    :param data: 算例原始数据
+    :return:
+    """
+    return content_hash(canonical_instance(data))
+
+
+def plant_hash(data: Dict) -> str:
+    """
+    工厂主数据（工人、工位、设备）的哈希，用于查找相近算例
+    :param data: 算例原始数据
+    :return:
+    """
+    canonical = canonical_instance(data)
+    return content_hash([canonical["worker_list"], canonical["station_list"], canonical["machine_list"]])
+
+
+class ResultCache:
+    """
+    以（规范化算例哈希 + 求解配置）为键的结果缓存，磁盘上按LRU淘汰
+    每个条目一个json文件，文件修改时间即最近访问时间
+    """
+    def __init__(self, cache_dir: str, max_entries: int = 1000, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(data: Dict, config: Dict[str, object]) -> str:
+        return content_hash({"instance": instance_hash(data), "config": config})
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def entries(self) -> List[str]:
+        return [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".json")]
+
+    def read(self, path: str) -> Optional[Dict]:
+        try:
+            with open(file=path, mode="r", encoding="utf-8") as fp:
+                return json.loads(fp.read())
+        except (OSError, ValueError):
+            return None
+
+    def get(self, data: Dict, config: Dict[str, object]) -> Optional[Dict]:
+        """
+        命中时返回缓存的dispatch_results、目标值与状态，并刷新访问时间
+        :param data: 算例原始数据
+        :param config: 求解配置
+        :return:
+        """
+        path = self.path(self.key(data, config))
+        entry = self.read(path) if os.path.exists(path) else None
+        if entry is not None:
+            os.utime(path, None)
+        return entry
+
+    def put(self, data: Dict, config: Dict[str, object], result: Dict[str, object]):
+        """
+        写入缓存条目后按条目数与总大小淘汰最久未访问的条目
+        :param data: 算例原始数据
+        :param config: 求解配置
+        :param result: 包含dispatch_results、obj、status
+        :return:
+        """
+        entry = dict(result)
+        entry["config"] = config
+        entry["instance"] = instance_hash(data)
+        entry["plant"] = plant_hash(data)
+        entry["ops"] = sorted([p["operation"] for p in data["process_list"]])
+        entry["created"] = time.time()
+        path = self.path(self.key(data, config))
+        tmp = path + ".tmp"
+        with open(file=tmp, mode="w", encoding="utf-8") as fp:
+            json.dump(entry, fp, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        files = sorted(self.entries(), key=lambda f: os.path.getmtime(f))
+        total = sum([os.path.getsize(f) for f in files])
+        while files and (len(files) > self.max_entries or total > self.max_bytes):
+            f = files.pop(0)
+            total -= os.path.getsize(f)
+            os.remove(f)
+
+    def nearest(self, data: Dict, min_similarity: float = 0.8) -> Optional[Dict]:
+        """
+        同一工厂主数据下工序集合最相近的缓存条目（Jaccard相似度），用于热启动
+        :param data: 算例原始数据
+        :param min_similarity: 最低相似度
+        :return:
+        """
+        plant = plant_hash(data)
+        ops = set([p["operation"] for p in data["process_list"]])
+        best, best_sim = None, min_similarity
+        for f in self.entries():
+            entry = self.read(f)
+            if entry is None or entry.get("plant") != plant or not entry.get("dispatch_results"):
+                continue
+            other = set(entry["ops"])
+            sim = len(ops & other) / max(len(ops | other), 1)
+            if sim >= best_sim:
+                best, best_sim = entry, sim
+        return best
@@ -1,32 +1,36 @@
-import polars as pl
+from __future__ import annotations
+
 from typing import List, Dict, Tuple
 
 from .dataset import Dataset
 from .base_loader import BaseLoader
+from .eligibility import Eligibility
+from moris.utils import LazyModule
+
+
+pl = LazyModule("polars")
 
 
 class DataLoader(BaseLoader):
     def __init__(self, dataset: Dataset):
         super().__init__(dataset)
+        self._eligibility = None
 
     @property
-    def df(self) -> pl.DataFrame:
+    def plan(self) -> pl.LazyFrame:
         """
-        设备类型(m)->工序(p)->工人(w)->设备所在当前工位(s)
+        设备类型(m)->工序(p)->工人(w)->设备所在当前工位(s)的查询计划
         :return:
         """
         # 当前工位-设备的对应关系
-        df_tmp = self.dataset.df_station \
-            .select(["st_code", "cur_m_list"]) \
-            .explode("cur_m_list") \
-            .rename({"cur_m_list": "m_type"})
-        df_wk = self.dataset.df_worker \
+        df_tmp = self.dataset.df_st_mach.lazy()
+        df_wk = self.dataset.df_worker.lazy() \
             .select(["w_code", "op_cat", "cur_st"])
         # 添加(工人，设备信息，当前工位)字段
-        df = self.dataset.df_process \
+        df = self.dataset.df_process.lazy() \
             .rename({"fixed_st_code": "fix_st", "fixed_w_code": "fix_w"}) \
             .join(df_wk, on=["op_cat"], how="left") \
-            .join(self.dataset.df_machine, on=["m_type"], how="left") \
+            .join(self.dataset.df_machine.lazy(), on=["m_type"], how="left") \
             .join(df_tmp, on=["m_type"], how="left") \
             .with_columns(
             pl.concat_str(pl.col("m_type"), pl.col("m_type2"), separator=",").alias("m_type")
@@ -34,6 +38,24 @@ class DataLoader(BaseLoader):
             .select(["m_type", "op_code", "w_code", "cur_st", "fix_st", "fix_w", "is_mono", "is_movable", "need_m", "st_code"])
         return df
 
+    @property
+    def df(self) -> pl.DataFrame:
+        """
+        设备类型(m)->工序(p)->工人(w)->设备所在当前工位(s)
+        :return:
+        """
+        return self.plan.collect()
+
+    @property
+    def eligibility(self) -> Eligibility:
+        """
+        可分配关系（CSR），首次访问时一次查询计算，之后复用
+        :return:
+        """
+        if self._eligibility is None:
+            self._eligibility = Eligibility(self.plan, self.listWorkers, self.listStations)
+        return self._eligibility
+
     @property
     def fixed_alloc(self) -> List[Tuple[str, str, str, str]]:
         """
@@ -55,9 +77,7 @@ class DataLoader(BaseLoader):
         固定设备所在工位
         :return:
         """
-        listFixedSts = self.df \
-            .filter(pl.col("is_movable") == False)["st_code"].unique().to_list()
-        return listFixedSts
+        return self.eligibility.listFixSt
 
     @property
     def listMoveSt(self) -> List[str]:
@@ -65,7 +85,7 @@ class DataLoader(BaseLoader):
         不带固定设备的工位
         :return:
         """
-        return list(set(self.listStations) - set(self.listFixSt))
+        return self.eligibility.listMoveSt
 
     @property
     def wkToAvailOps(self) -> Dict[str, List[str]]:
@@ -73,11 +93,7 @@ class DataLoader(BaseLoader):
         员工对应的可做工序
         :return:
         """
-        d = self.df \
-            .select(["w_code", "op_code"]).unique() \
-            .groupby("w_code").agg(pl.col("op_code")) \
-            .to_pandas().set_index(["w_code"]).to_dict(orient="dict")["op_code"]
-        return d
+        return self.eligibility.view("wkToOps")
 
     @property
     def fixStMachPair(self) -> List[Tuple[str, str]]:
@@ -118,12 +134,7 @@ class DataLoader(BaseLoader):
         工序->可分配工人（(m,op) -> [w1,w2,...]）
         :return:
         """
-        df = self.df \
-            .select(["m_type", "op_code", "w_code"]).unique() \
-            .groupby(["m_type", "op_code"]).agg(pl.col("w_code"))
-        d = df \
-            .to_pandas().set_index(["m_type", "op_code"]).to_dict(orient="dict")["w_code"]
-        return d
+        return self.eligibility.view("opToWks")
 
     @property
     def wkToAvailSts(self) -> Dict[str, List[str]]:
@@ -131,21 +142,7 @@ class DataLoader(BaseLoader):
         工人->可分配工位（w -> [s1,s2,...]）
         :return:
         """
-        dictSts = {"1": self.listMoveSt}
-        df = self.df \
-            .select(["w_code", "st_code"]).unique()
-        df1 = df.filter(~pl.col("st_code").is_null())
-        df2 = df \
-            .filter(pl.col("st_code").is_null()) \
-            .fill_null("1") \
-            .with_columns(
-                pl.col("st_code").map_dict(dictSts)
-            ) \
-            .explode("st_code")
-        d = pl.concat([df1, df2]) \
-            .groupby(["w_code"]).agg(pl.col("st_code")) \
-            .to_pandas().set_index(["w_code"]).to_dict(orient="dict")["st_code"]
-        return d
+        return self.eligibility.view("wkToSts")
 
     @property
     def opToAvailSts(self) -> Dict[Tuple[str, str], List[str]]:
@@ -153,21 +150,7 @@ class DataLoader(BaseLoader):
         工序->可分配工位（(m,op) -> [s1,s2,...]）
         :return:
         """
-        df = self.df \
-            .select(["m_type", "op_code", "st_code"]).unique()
-        df1 = df.filter(~pl.col("st_code").is_null())
-        dictSts = {"1": self.listMoveSt}
-        df2 = df \
-            .filter(pl.col("st_code").is_null()) \
-            .fill_null("1") \
-            .with_columns(
-                pl.col("st_code").map_dict(dictSts)
-            ) \
-            .explode("st_code")
-        d = pl.concat([df1, df2]) \
-            .groupby(["m_type", "op_code"]).agg(pl.col("st_code")) \
-            .to_pandas().set_index(["m_type", "op_code"]).to_dict(orient="dict")["st_code"]
-        return d
+        return self.eligibility.view("opToSts")
 
     @property
     def stToAvailMachs(self) -> Dict[str, List[str]]:
@@ -175,17 +158,4 @@ class DataLoader(BaseLoader):
         工位->可分配设备（s -> [m1,m2,...]）
         :return:
         """
-        dictSts = {"1": self.listMoveSt}
-        df = self.df.select(["st_code", "m_type"]).unique()
-        df1 = df.filter(~pl.col("st_code").is_null())
-        df2 = df \
-            .filter(pl.col("st_code").is_null()) \
-            .fill_null("1") \
-            .with_columns(
-                pl.col("st_code").map_dict(dictSts)
-            ) \
-            .explode("st_code")
-        d = pl.concat([df1, df2]) \
-            .groupby(["st_code"]).agg(pl.col("m_type")) \
-            .to_pandas().set_index(["st_code"]).to_dict(orient="dict")["m_type"]
-        return d
+        return self.eligibility.view("stToMachs")
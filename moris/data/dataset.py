@@ -1,9 +1,14 @@
-import polars as pl
+from __future__ import annotations
+
+from functools import wraps
 from typing import List, Dict
 
 from moris.utils import *
 
 
+pl = LazyModule("polars")
+
+
 def get_cur_station(item: List[Dict[str, str]]) -> str:
     if len(item) == 0:
         return ""
@@ -19,12 +24,45 @@ def get_nbr_stations(item: List[Dict[str, str]]):
     return res
 
 
+# 只依赖工厂主数据（工人、工位、设备）的表，同一工厂的算例之间可以共享（见plant.PlantData）
+MasterFrames = ["df_w_st", "df_w_skill", "df_w_cat", "df_worker", "df_machine", "df_station", "df_st_mach"]
+
+
+def master_frame(func):
+    """
+    主数据表：绑定了工厂主数据时直接返回共享的表，不再解析
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self):
+        if self.plant is not None:
+            return self.plant.frames[name]
+        return func(self)
+    return wrapper
+
+
 class Dataset:
     def __init__(self, filename: str):
         filepath = get_path(DIR.DataDir, filename)
         self.data = load_data(filepath)
+        self.plant = None
+
+    @classmethod
+    def from_data(cls, data: Dict, plant=None) -> Dataset:
+        """
+        由已读取的算例数据构造（如服务请求、缓存、生成器）
+        :param data: 算例原始数据
+        :param plant: 同一工厂共享的主数据（PlantData），None时从data解析
+        :return:
+        """
+        dataset = cls.__new__(cls)
+        dataset.data = data
+        dataset.plant = plant
+        return dataset
 
     @property
+    @master_frame
     def df_w_st(self):
         df_worker = pl.DataFrame(data=self.data["worker_list"])
         # 工人当前工位 ["w_code", "cur_st"]
@@ -39,6 +77,7 @@ class Dataset:
         return df_w_st
 
     @property
+    @master_frame
     def df_w_skill(self):
         # 工人技能 ["w_code", "op_code", "op_cat", "e"]
         data = [w["operation_skill_list"] for w in self.data["worker_list"]]
@@ -51,6 +90,7 @@ class Dataset:
         return df_w_skill
 
     @property
+    @master_frame
     def df_w_cat(self):
         # 工人技能种类 ["w_code", "op_cat", "e"]
         data = [w["operation_category_skill_list"] for w in self.data["worker_list"]]
@@ -62,6 +102,7 @@ class Dataset:
         return df_w_cat
 
     @property
+    @master_frame
     def df_worker(self):
         # 合并所有工人信息 ["w_code", "op_code", "op_cat", "e", "cur_st"]
         df = self.df_w_skill \
@@ -82,6 +123,7 @@ class Dataset:
         return df
 
     @property
+    @master_frame
     def df_machine(self):
         df = pl.DataFrame(data=self.data["machine_list"]) \
             .rename({"machine_type": "m_type",
@@ -89,6 +131,7 @@ class Dataset:
         return df
 
     @property
+    @master_frame
     def df_station(self):
         df = pl.DataFrame(data=self.data["station_list"]) \
             .rename({"station_code": "st_code",
@@ -105,6 +148,16 @@ class Dataset:
             ])
         return df
 
+    @property
+    @master_frame
+    def df_st_mach(self):
+        # 工位当前的设备 ["st_code", "m_type"]
+        df = self.df_station \
+            .select(["st_code", "cur_m_list"]) \
+            .explode("cur_m_list") \
+            .rename({"cur_m_list": "m_type"})
+        return df
+
     @property
     def conf(self):
         df = pl.DataFrame(data=self.data["config_param"]) \
@@ -122,6 +175,8 @@ class Dataset:
 
     @property
     def df_joint(self):
-        df = pl.DataFrame(data=self.data["joint_operation_list"]) \
+        # 没有装配关系时保留列结构
+        schema = {"part_code": pl.Utf8, "joint_operation": pl.Utf8}
+        df = pl.DataFrame(data=self.data["joint_operation_list"], schema=schema) \
             .rename({"joint_operation": "joint_op"})
         return df
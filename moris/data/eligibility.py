@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from typing import List, Dict, Tuple, Hashable
+
+from moris.utils import LazyModule
+
+
+pl = LazyModule("polars")
+np = LazyModule("numpy")
+
+
+class CSR:
+    """
+    稀疏的（行 -> 列）关系：第i行的列为indices[indptr[i]:indptr[i + 1]]
+    rows、cols为行、列索引对应的键
+    """
+    __slots__ = ["rows", "cols", "indptr", "indices"]
+
+    def __init__(self, rows: List[Hashable], cols: List[Hashable], indptr: np.ndarray, indices: np.ndarray):
+        self.rows = rows
+        self.cols = cols
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def fromPairs(cls, rows: List[Hashable], cols: List[Hashable], row_idx: np.ndarray,
+                  col_idx: np.ndarray) -> CSR:
+        """
+        由（行索引，列索引）对构造，每行的列按列索引升序
+        :param rows: 行的键
+        :param cols: 列的键
+        :param row_idx: 行索引
+        :param col_idx: 列索引
+        :return:
+        """
+        row_idx = np.asarray(row_idx, dtype=np.int64)
+        col_idx = np.asarray(col_idx, dtype=np.int64)
+        order = np.lexsort((col_idx, row_idx))
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_idx, minlength=len(rows)), out=indptr[1:])
+        return cls(rows, cols, indptr, col_idx[order])
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    def row(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def transpose(self) -> CSR:
+        row_idx = np.repeat(np.arange(len(self.rows), dtype=np.int64), np.diff(self.indptr))
+        return CSR.fromPairs(self.cols, self.rows, self.indices, row_idx)
+
+    def toDict(self) -> Dict[Hashable, List[Hashable]]:
+        """
+        dict视图（行 -> [列]），不含空行
+        :return:
+        """
+        cols, indptr = self.cols, self.indptr.tolist()
+        indices = self.indices.tolist()
+        return {key: [cols[j] for j in indices[indptr[i]:indptr[i + 1]]]
+                for i, key in enumerate(self.rows) if indptr[i + 1] > indptr[i]}
+
+
+class Eligibility:
+    """
+    可分配关系（工序-工人、工序-工位、工人-工位、工位-设备）
+    所有关系在同一个polars LazyFrame查询中计算（共享DataLoader.df的关联，一次collect_all），
+    以CSR整数数组保存，dict视图按需生成并缓存
+    """
+    def __init__(self, plan: pl.LazyFrame, listWorkers: List[str], listStations: List[str]):
+        """
+        :param plan: DataLoader.df对应的LazyFrame
+        :param listWorkers: 工人列表
+        :param listStations: 按产线排序的工位列表
+        """
+        self.listWorkers = listWorkers
+        self.listStations = listStations
+        df_wk = pl.LazyFrame({"w_code": listWorkers}) \
+            .with_row_count("w_idx")
+        df_st = pl.LazyFrame({"st_code": listStations}) \
+            .with_row_count("st_idx")
+        df_op = plan \
+            .select(["m_type", "op_code"]).unique() \
+            .sort(by=["m_type", "op_code"]) \
+            .with_row_count("op_idx")
+        df_m = plan \
+            .select("m_type").unique() \
+            .sort(by="m_type") \
+            .with_row_count("m_idx")
+        # 固定设备所在工位；设备可移动（st_code为空）的行展开到所有不带固定设备的工位
+        df_fix = plan \
+            .filter(pl.col("is_movable") == False) \
+            .select("st_code").unique()
+        df_move = df_st.join(df_fix, on="st_code", how="anti")
+        base = plan \
+            .select(["m_type", "op_code", "w_code", "st_code"]) \
+            .join(df_op, on=["m_type", "op_code"], how="left") \
+            .join(df_m, on="m_type", how="left") \
+            .join(df_wk, on="w_code", how="left")
+        df_avail = pl.concat([
+            base.filter(~pl.col("st_code").is_null())
+            .join(df_st, on="st_code", how="inner"),
+            base.filter(pl.col("st_code").is_null())
+            .drop("st_code")
+            .join(df_move, how="cross")
+            .select(base.columns + ["st_idx"]),
+        ])
+        pairs = {
+            "op_wk": base.filter(~pl.col("w_idx").is_null()).select(["op_idx", "w_idx"]).unique(),
+            "op_st": df_avail.select(["op_idx", "st_idx"]).unique(),
+            "wk_st": df_avail.filter(~pl.col("w_idx").is_null()).select(["w_idx", "st_idx"]).unique(),
+            "st_m": df_avail.select(["st_idx", "m_idx"]).unique(),
+        }
+        frames = pl.collect_all([df_op, df_m, df_move.select("st_code")] + list(pairs.values()))
+        df_op, df_m, df_move = frames[:3]
+        pairs = dict(zip(pairs.keys(), frames[3:]))
+        self.listOps: List[Tuple[str, str]] = list(zip(df_op["m_type"].to_list(), df_op["op_code"].to_list()))
+        self.listMachs: List[str] = df_m["m_type"].to_list()
+        setMove = set(df_move["st_code"].to_list())
+        # 与工位顺序一致
+        self.listMoveSt = [s for s in listStations if s in setMove]
+        self.listFixSt = [s for s in listStations if s not in setMove]
+
+        def csr(key: str, rows: List[Hashable], cols: List[Hashable]) -> CSR:
+            df = pairs[key]
+            return CSR.fromPairs(rows, cols, df[df.columns[0]].to_numpy(), df[df.columns[1]].to_numpy())
+
+        self.opToWks = csr("op_wk", self.listOps, listWorkers)
+        self.opToSts = csr("op_st", self.listOps, listStations)
+        self.wkToSts = csr("wk_st", listWorkers, listStations)
+        self.stToMachs = csr("st_m", listStations, self.listMachs)
+        self._views: Dict[str, Dict] = {}
+
+    def view(self, name: str) -> Dict[Hashable, List[Hashable]]:
+        """
+        CSR关系的dict视图（缓存，调用方不应修改）
+        :param name: opToWks / opToSts / wkToSts / stToMachs / wkToOps
+        :return:
+        """
+        if name not in self._views:
+            if name == "wkToOps":
+                # 值为工序编码（不含设备）
+                data = self.opToWks.transpose().toDict()
+                self._views[name] = {w: list(dict.fromkeys([op for _, op in ops])) for w, ops in data.items()}
+            else:
+                self._views[name] = getattr(self, name).toDict()
+        return self._views[name]
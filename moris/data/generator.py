@@ -0,0 +1,212 @@
+import random
+from typing import List, Dict
+
+
+class GeneratorConfig:
+    """
+    合成算例的参数
+    """
+    __slots__ = ["n_lines", "n_stations", "n_workers", "n_parts", "depth", "fan_in", "ops_per_part",
+                 "n_categories", "n_machines", "skill_density", "fixed_ratio", "mono_ratio", "seed"]
+
+    def __init__(self, n_lines: int = 1, n_stations: int = 20, n_workers: int = 12, n_parts: int = 6,
+                 depth: int = 3, fan_in: int = 2, ops_per_part: int = 5, n_categories: int = 10,
+                 n_machines: int = 12, skill_density: float = 0.6, fixed_ratio: float = 0.1,
+                 mono_ratio: float = 0.05, seed: int = 0):
+        # 产线数，每条产线的工位数
+        self.n_lines = n_lines
+        self.n_stations = n_stations
+        self.n_workers = n_workers
+        # 工件数，装配树深度与每个工件的子工件数上限
+        self.n_parts = n_parts
+        self.depth = depth
+        self.fan_in = fan_in
+        self.ops_per_part = ops_per_part
+        self.n_categories = n_categories
+        self.n_machines = n_machines
+        # 每个工人掌握的工序类别比例（过低时难以满足节拍波动率约束）
+        self.skill_density = skill_density
+        # 固定设备比例、独占设备比例
+        self.fixed_ratio = fixed_ratio
+        self.mono_ratio = mono_ratio
+        self.seed = seed
+        self.check()
+
+    def check(self):
+        """
+        生成的算例必须满足的计数条件：每个工人占一个工位且每个工位至多一人；
+        节拍波动率约束要求每个工人至少做一道工序
+        :return:
+        """
+        n_stations = self.n_stations * self.n_lines
+        if self.n_workers > n_stations:
+            raise ValueError("n_workers={0} exceeds n_stations * n_lines = {1}".format(self.n_workers, n_stations))
+        n_ops = max(self.n_parts, 2) * self.ops_per_part
+        if self.n_workers > n_ops:
+            raise ValueError("n_workers={0} exceeds the number of operations n_parts * ops_per_part = {1}"
+                             .format(self.n_workers, n_ops))
+
+    def to_dict(self) -> Dict[str, object]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class InstanceGenerator:
+    """
+    生成与训练集相同格式（Dataset可读取）的合成算例
+    """
+    def __init__(self, config: GeneratorConfig = None):
+        self.config = GeneratorConfig() if config is None else config
+        self.rnd = random.Random(self.config.seed)
+
+    def stations(self, fixed_machs: List[str]) -> List[Dict[str, object]]:
+        """
+        工位：按产线编号，相邻工位互为邻居；固定设备分布在不同工位上
+        :param fixed_machs: 固定设备
+        :return:
+        """
+        c = self.config
+        codes = [["st-{0}-{1}".format(line + 1, i + 1) for i in range(c.n_stations)] for line in range(c.n_lines)]
+        flat = [s for line in codes for s in line]
+        fixed_sts = self.rnd.sample(flat, min(len(fixed_machs), len(flat)))
+        stToMach = {s: m for s, m in zip(fixed_sts, fixed_machs)}
+        data = []
+        for line in codes:
+            for i, s in enumerate(line):
+                nbrs = [line[j] for j in (i - 1, i + 1) if 0 <= j < len(line)]
+                data.append({
+                    "station_code": s,
+                    "line_number": len(data) + 1,
+                    "curr_machine_list": [{"machine_type": stToMach[s], "is_mono": False}] if s in stToMach else [],
+                    "neighbor_station_list": [{"station_code": n} for n in nbrs]
+                })
+        return data
+
+    def machines(self) -> List[Dict[str, object]]:
+        c = self.config
+        data = []
+        for i in range(c.n_machines):
+            data.append({
+                "machine_type": "m-{0:06d}-01".format(i + 1),
+                "is_mono": self.rnd.random() < c.mono_ratio,
+                "is_movable": self.rnd.random() >= c.fixed_ratio,
+                "is_machine_needed": True
+            })
+        # 至少保留一台可移动设备与一台固定设备
+        data[0]["is_movable"] = True
+        data[-1]["is_movable"] = False
+        return data
+
+    def parts(self) -> Dict[str, str]:
+        """
+        装配树：根工件在第1层，每个工件最多fan_in个子工件，深度不超过depth
+        :return: 子工件 -> 父工件
+        """
+        c = self.config
+        names = ["BJ{0:02d}".format(i + 1) for i in range(max(c.n_parts, 2))]
+        parent = {}
+        layer = [names[0]]
+        rest = names[1:]
+        for _ in range(max(c.depth, 2) - 1):
+            next_layer = []
+            for p in layer:
+                for _ in range(c.fan_in):
+                    if not rest:
+                        break
+                    child = rest.pop(0)
+                    parent[child] = p
+                    next_layer.append(child)
+            layer = next_layer
+            if not rest or not layer:
+                break
+        # 超出深度的工件挂到最深一层
+        leaves = layer if layer else [names[0]]
+        for i, child in enumerate(rest):
+            parent[child] = leaves[i % len(leaves)]
+        return parent
+
+    def generate(self) -> Dict[str, object]:
+        """
+        生成算例
+        :return: 与训练集相同的json结构
+        """
+        c = self.config
+        machines = self.machines()
+        movable = [m["machine_type"] for m in machines if m["is_movable"]]
+        fixed = [m["machine_type"] for m in machines if not m["is_movable"]]
+        stations = self.stations(fixed)
+        # 实际放置到工位上的固定设备
+        placed = [m["machine_type"] for s in stations for m in s["curr_machine_list"]]
+        categories = [str(200000 + i) for i in range(c.n_categories)]
+        parent = self.parts()
+        list_parts = ["BJ{0:02d}".format(i + 1) for i in range(max(c.n_parts, 2))]
+
+        process = []
+        partToOps = {}
+        for p_idx, part in enumerate(list_parts):
+            for k in range(c.ops_per_part):
+                use_fixed = placed and self.rnd.random() < c.fixed_ratio
+                m_type = self.rnd.choice(placed) if use_fixed else self.rnd.choice(movable)
+                op = "op-{0}-{1:03d}".format(part, k + 1)
+                process.append({
+                    "operation": op,
+                    "operation_number": 300000 + (p_idx * c.ops_per_part + k + 1) * 10,
+                    "part_code": part,
+                    "operation_category": self.rnd.choice(categories),
+                    "machine_type": m_type,
+                    "machine_type_2": "A",
+                    "standard_oper_time": round(self.rnd.uniform(5, 80), 2),
+                    "fixed_station_code": "",
+                    "fixed_worker_code": ""
+                })
+                partToOps.setdefault(part, []).append(op)
+        joint = [{"part_code": child, "joint_operation": self.rnd.choice(partToOps[p])} for child, p in parent.items()]
+
+        used = sorted(set([p["operation_category"] for p in process]))
+        workers = []
+        station_codes = [s["station_code"] for s in stations]
+        for i in range(c.n_workers):
+            w = "w-{0:06d}".format(i + 1)
+            n = max(1, int(round(c.skill_density * len(used))))
+            cats = self.rnd.sample(used, min(n, len(used)))
+            workers.append({"worker_code": w, "cats": cats,
+                            "cur_st": station_codes[i % len(station_codes)]})
+        # 每个类别至少有一个工人掌握
+        for i, cat in enumerate(used):
+            if all([cat not in w["cats"] for w in workers]):
+                workers[i % len(workers)]["cats"].append(cat)
+        worker_list = []
+        for w in workers:
+            eff = {cat: round(self.rnd.uniform(0.7, 1.3), 4) for cat in w["cats"]}
+            worker_list.append({
+                "worker_code": w["worker_code"],
+                "operation_skill_list": [
+                    {"worker_code": w["worker_code"], "operation_code": p["operation"],
+                     "operation_category": p["operation_category"], "efficiency": eff[p["operation_category"]]}
+                    for p in process if p["operation_category"] in eff
+                ],
+                "operation_category_skill_list": [
+                    {"worker_code": w["worker_code"], "operation_category": cat, "efficiency": e}
+                    for cat, e in eff.items()
+                ],
+                "curr_station_list": [{"station_code": w["cur_st"]}]
+            })
+        config_param = {
+            "max_worker_per_oper": 2,
+            "max_station_per_worker": 2,
+            "max_cycle_count": 4,
+            "max_revisited_station_count": 3,
+            "volatility_rate": 0.8,
+            "volatility_weight": 0.3,
+            "upph_weight": 0.7,
+            "max_machine_per_station": 3,
+            "max_station_per_oper": 2,
+            "max_split_num": 3
+        }
+        return {
+            "worker_list": worker_list,
+            "station_list": stations,
+            "process_list": process,
+            "machine_list": machines,
+            "joint_operation_list": joint,
+            "config_param": config_param
+        }
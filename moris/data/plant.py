@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import io
+import sys
+import pickle
+from multiprocessing import shared_memory
+from typing import List, Dict, Tuple, Optional
+
+from .dataset import Dataset, MasterFrames
+from .base_loader import BaseLoader
+from .cache import plant_hash
+from .analyzer import Issue, parse_issue
+from moris.utils import LazyModule
+
+
+pl = LazyModule("polars")
+
+
+# 算例中属于工厂主数据的字段，其余（工序、装配关系、参数）随算例变化
+MasterKeys = ["worker_list", "station_list", "machine_list"]
+
+
+def split_instance(data: Dict) -> Tuple[Dict, Dict]:
+    """
+    拆分算例
+    :param data: 算例原始数据
+    :return: 主数据，算例自身的数据
+    """
+    master = {k: data[k] for k in MasterKeys}
+    rest = {k: v for k, v in data.items() if k not in MasterKeys}
+    return master, rest
+
+
+def intern_list(items: List[object]) -> List[object]:
+    return [sys.intern(x) if isinstance(x, str) else x for x in items]
+
+
+class PlantData:
+    """
+    同一工厂的主数据：工人技能、工位、设备表（见dataset.MasterFrames）与设备、工人、工位列表
+    解析一次后由批量中的算例只读共享，每个算例只解析、关联自身的工序与装配关系表
+    """
+    def __init__(self, key: str, master: Dict, frames: Dict[str, pl.DataFrame],
+                 lists: Tuple[List[str], List[str], List[str]]):
+        """
+        :param key: 主数据的内容哈希（cache.plant_hash）
+        :param master: 主数据原始字段
+        :param frames: 主数据表
+        :param lists: 设备列表，工人列表，按产线排序的工位列表（字符串已驻留）
+        """
+        self.key = key
+        self.master = master
+        self.frames = frames
+        self.lists = lists
+
+    @classmethod
+    def fromData(cls, data: Dict, key: str = None) -> PlantData:
+        """
+        由工厂中任一算例解析主数据
+        :param data: 算例原始数据
+        :param key: 主数据哈希，None时计算
+        :return:
+        """
+        master, _ = split_instance(data)
+        dataset = Dataset.from_data(master)
+        frames = {name: getattr(dataset, name) for name in MasterFrames}
+        lists = tuple(intern_list(items) for items in BaseLoader.masterLists(dataset))
+        return cls(plant_hash(data) if key is None else key, master, frames, lists)
+
+    def complete(self, data: Dict) -> Dict:
+        """
+        补全只含算例自身数据的算例（主数据字段共享，不复制）
+        :param data: 算例原始数据，可不含主数据字段
+        :return:
+        """
+        if all([k in data for k in MasterKeys]):
+            return data
+        return dict(data, **self.master)
+
+    def dataset(self, data: Dict) -> Dataset:
+        """
+        绑定本工厂主数据的算例
+        :param data: 算例原始数据，可不含主数据字段
+        :return:
+        """
+        return Dataset.from_data(self.complete(data), self)
+
+    def toBytes(self) -> bytes:
+        # 表以Arrow IPC格式序列化
+        frames = {}
+        for name, df in self.frames.items():
+            buf = io.BytesIO()
+            df.write_ipc(buf)
+            frames[name] = buf.getvalue()
+        obj = {"key": self.key, "master": self.master, "frames": frames, "lists": self.lists}
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def fromBytes(cls, data: bytes) -> PlantData:
+        obj = pickle.loads(data)
+        frames = {name: pl.read_ipc(io.BytesIO(buf)) for name, buf in obj["frames"].items()}
+        lists = tuple(intern_list(items) for items in obj["lists"])
+        return cls(obj["key"], obj["master"], frames, lists)
+
+
+class SharedPlant:
+    """
+    放在共享内存中的工厂主数据：主进程写入一次，进程池中的子进程按名称映射读取，不经过任务参数传输
+    """
+    def __init__(self, plant: PlantData):
+        data = plant.toBytes()
+        self.key = plant.key
+        self.size = len(data)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self.shm.buf[:self.size] = data
+
+    @property
+    def handle(self) -> Tuple[str, str, int]:
+        return self.key, self.shm.name, self.size
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_plant(handle: Tuple[str, str, int]) -> PlantData:
+    """
+    子进程中读取共享内存中的工厂主数据
+    :param handle: SharedPlant.handle
+    :return:
+    """
+    _, name, size = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    return PlantData.fromBytes(data)
+
+
+def group_by_plant(instances: List[Dict]) -> Tuple[List[Optional[str]], Dict[str, PlantData], Dict[int, List[Issue]]]:
+    """
+    按主数据的内容哈希对算例分组，每个工厂只解析一次主数据；
+    主数据无法解析的算例不抛出异常，哈希记为None并返回其PARSE_ERROR问题
+    :param instances: 算例原始数据
+    :return: 每个算例的主数据哈希，哈希 -> 主数据，算例序号 -> 解析问题
+    """
+    keys, plants, issues, failed = [], {}, {}, {}
+    for i, data in enumerate(instances):
+        try:
+            key = plant_hash(data)
+            if key in failed:
+                raise failed[key]
+            if key not in plants:
+                try:
+                    plants[key] = PlantData.fromData(data, key)
+                except Exception as e:
+                    # 同一工厂的其它算例不再重复解析
+                    failed[key] = e
+                    raise
+        except Exception as e:
+            keys.append(None)
+            issues[i] = [parse_issue(e)]
+            continue
+        keys.append(key)
+    return keys, plants, issues
@@ -0,0 +1,32 @@
+import json
+from typing import Dict, List
+
+
+class DispatchWriter:
+    """
+    批量输出dispatch_results：每行一个算例（JSON Lines），写完即落盘
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.fp = open(file=path, mode="a", encoding="utf-8")
+
+    def write(self, instance: str, results: Dict[str, List[Dict[str, object]]]):
+        """
+        :param instance: 算例名
+        :param results: {"dispatch_results": [...]}
+        :return:
+        """
+        line = {"instance": instance}
+        line.update(results)
+        self.fp.write(json.dumps(line, ensure_ascii=False))
+        self.fp.write("\n")
+        self.fp.flush()
+
+    def close(self):
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,5 +1,9 @@
-import igraph as ig
-from typing import List, Dict, Iterator
+from __future__ import annotations
+
+from typing import List, Dict, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import igraph as ig
 
 
 class Graph:
@@ -12,8 +16,13 @@ class Graph:
         self.MaxLayer = max(list(self.layerMap.values()))
 
     def initLayerMap(self) -> Dict[str, int]:
-        layerMap = {}
-        root = self.DstVertex[0]
+        # isolated vertices (parts without joint operations) are placed in the last layer
+        isolated = [v["name"] for v in self.g.vs if v.degree() == 0]
+        layerMap = {v: 1 for v in isolated}
+        roots = [v for v in self.DstVertex if v not in layerMap]
+        if len(roots) == 0:
+            return layerMap
+        root = roots[0]
         layerMap[root] = 1
         cnt = 2
         completed = False
@@ -31,7 +40,8 @@ class Graph:
                 cnt += 1
                 curr_layers = predecessors
         for p in self.SrcVertex:
-            layerMap[p] = cnt
+            if p not in isolated:
+                layerMap[p] = cnt
         return layerMap
 
     def updateVertexLayer(self):
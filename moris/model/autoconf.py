@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import copy
+import json
+import time
+from typing import List, Dict, Optional
+
+from .opt import OptModel
+from .model import SolverStatus
+from .memory import count_triples
+from moris.data import DataLoader
+from moris.graph import Graph
+from moris.utils import LazyModule
+
+
+np = LazyModule("numpy")
+
+
+# 候选求解配置
+# engine：mip（SCIP）/ cpsat（CP-SAT）/ lns（大邻域搜索）/ benders（逻辑Benders分解）/ heuristic（LP松弛取整、构造与修复）
+Candidates: Dict[str, Dict[str, object]] = {
+    "mip": {"engine": "mip", "formulation": "full", "circle": "index", "time_limit": 60000},
+    "mip_position": {"engine": "mip", "formulation": "full", "circle": "position", "time_limit": 60000},
+    "cpsat": {"engine": "cpsat", "formulation": "full", "circle": "position", "time_limit": 60000},
+    "lns": {"engine": "lns", "formulation": "compact", "circle": "position", "time_limit": 120000,
+            "sub_time_limit": 5000},
+    "benders": {"engine": "benders", "formulation": "full", "circle": "position", "time_limit": 120000,
+                "sub_time_limit": 10000},
+    "heuristic": {"engine": "heuristic", "formulation": "compact", "circle": "position", "time_limit": 30000},
+}
+
+# 规则表：按顺序匹配，第一条满足的规则生效；when为 特征 -> [下界, 上界]（None表示不限）
+# 默认规则来自tiny/训练集/合成算例上的经验：小算例SCIP数秒内证明最优；
+# 中等算例SCIP常在时限内找不到可行解，交给LNS（LP取整构造得到可行解时从该解出发，否则先整体求解）；
+# 超大算例只做启发式：取整后构造工位分配，子MIP只修补剩余的违反，
+# 构造仍违反圈数/重复入站约束且修补超时、或没有满足波动率约束的分配时只给出下界
+DefaultRules: List[Dict[str, object]] = [
+    {"name": "small", "when": {"triples": [None, 1000]}, "config": "mip_position"},
+    {"name": "medium", "when": {"triples": [None, 60000]}, "config": "lns"},
+    {"name": "large", "when": {}, "config": "heuristic"},
+]
+
+
+def extract_features(data_loader: DataLoader, graph: Graph = None) -> Dict[str, float]:
+    """
+    算例特征（毫秒级，只读取可分配关系与工件图）
+    :param data_loader: 数据
+    :param graph: 工件图，None时由data_loader构造
+    :return:
+    """
+    s_t = time.time()
+    elig = data_loader.eligibility
+    n_ops = max(len(elig.listOps), 1)
+    if graph is None:
+        try:
+            graph = Graph(data_loader.graph)
+        except (IndexError, ValueError):
+            # 工件图不完整（没有终点工件）时层数记为0
+            graph = None
+    features = {
+        "workers": data_loader.WkCnt,
+        "stations": data_loader.StCnt,
+        "ops": len(elig.listOps),
+        "parts": len(data_loader.partToOps),
+        "machines": len(elig.listMachs),
+        "fixed_ratio": len(elig.listFixSt) / max(data_loader.StCnt, 1),
+        "max_layer": graph.MaxLayer if graph is not None else 0,
+        "skill_density": elig.opToWks.nnz / (n_ops * max(data_loader.WkCnt, 1)),
+        "sts_per_op": elig.opToSts.nnz / n_ops,
+        "mono": len(data_loader.listMoveMonoMachs),
+        "triples": count_triples(data_loader),
+    }
+    features["feature_time"] = time.time() - s_t
+    return features
+
+
+def match(when: Dict[str, List[Optional[float]]], features: Dict[str, float]) -> bool:
+    for name, (lb, ub) in when.items():
+        value = features.get(name)
+        if value is None:
+            return False
+        if lb is not None and value < lb:
+            return False
+        if ub is not None and value > ub:
+            return False
+    return True
+
+
+def choose_config(features: Dict[str, float], rules: List[Dict[str, object]] = None) -> Dict[str, object]:
+    """
+    按规则表选择求解配置
+    :param features: 算例特征
+    :param rules: 规则表，默认DefaultRules
+    :return: 配置（含规则名与候选名）
+    """
+    rules = DefaultRules if rules is None else rules
+    for rule in rules:
+        if match(rule["when"], features):
+            config = copy.deepcopy(Candidates[rule["config"]])
+            config.update(rule.get("override", {}))
+            config["rule"] = rule["name"]
+            config["candidate"] = rule["config"]
+            return config
+    raise ValueError("no rule matches the instance features")
+
+
+def run_config(data_loader: DataLoader, config: Dict[str, object], time_limit: int = None) -> Dict[str, object]:
+    """
+    按配置构建并求解
+    :param data_loader: 数据
+    :param config: 求解配置
+    :param time_limit: 总时间上限（毫秒），与配置中的时间上限取较小值
+    :return: {"status", "obj", "bound", "build_time", "solve_time", "model"}
+    """
+    limit = config["time_limit"] if time_limit is None else min(config["time_limit"], time_limit)
+    s_t = time.time()
+    model = OptModel(data_loader, backend="CP_SAT" if config["engine"] == "cpsat" else "SCIP")
+    model.formulation = config["formulation"]
+    model.buildModel(circle=config["circle"])
+    b_t = time.time()
+    bound = None
+    engine = config["engine"]
+    if engine in ["mip", "cpsat"]:
+        model.solveModel(limit)
+    elif engine == "lns":
+        # 以LP松弛取整修复的解作为初始解（中等规模算例上SCIP常在时限内找不到可行解）
+        res = model.relaxAndRound(lp_time_limit=limit / 4, repair_time_limit=max(limit / 20, 1000))
+        bound = res["bound"]
+        remaining = limit - (time.time() - b_t) * 1000
+        if remaining > 0:
+            model.solveLNS(remaining, config.get("sub_time_limit", 5000))
+    elif engine == "benders":
+        res = model.solveBenders(limit, config.get("sub_time_limit", 10000))
+        bound = res["bound"]
+    elif engine == "heuristic":
+        res = model.relaxAndRound(lp_time_limit=limit / 2, repair_time_limit=max(limit / 6, 1000))
+        bound = res["bound"]
+    else:
+        raise ValueError("unknown engine: {0}".format(engine))
+    status = model.status
+    return {
+        "status": SolverStatus.get(status, str(status)),
+        "obj": model.WeightedObjValue if model.HasSolution else None,
+        "bound": bound,
+        "build_time": b_t - s_t,
+        "solve_time": time.time() - b_t,
+        "model": model,
+    }
+
+
+def solve_auto(data_loader: DataLoader, time_limit: int = None,
+               rules: List[Dict[str, object]] = None) -> Dict[str, object]:
+    """
+    由算例特征自动选择求解引擎、模型形式与时间上限并求解
+    :param data_loader: 数据
+    :param time_limit: 总时间上限（毫秒），None时使用规则的时间上限
+    :param rules: 规则表，默认DefaultRules
+    :return: 求解结果，附带features与config
+    """
+    features = extract_features(data_loader)
+    config = choose_config(features, rules)
+    res = run_config(data_loader, config, time_limit)
+    res["features"] = features
+    res["config"] = config
+    return res
+
+
+def tune_rules(results: List[Dict[str, object]], rules: List[Dict[str, object]] = None) -> List[Dict[str, object]]:
+    """
+    由基准测试结果离线调整规则表：规则的匹配条件不变，每条规则改用其覆盖的算例上表现最好的候选配置
+    评价顺序：找到可行解的比例（高）> 与各算例最好解的平均相对差距（小）> 平均总耗时（小）
+    :param results: 基准结果，每行含instance、candidate、features、obj、build_time、solve_time
+    :param rules: 原规则表，默认DefaultRules
+    :return: 新规则表
+    """
+    rules = DefaultRules if rules is None else rules
+    best = {}
+    for row in results:
+        if row["obj"] is not None:
+            best[row["instance"]] = min(best.get(row["instance"], np.inf), row["obj"])
+    # 每个算例归属第一条匹配的规则
+    owner = {}
+    for row in results:
+        if row["instance"] not in owner:
+            owner[row["instance"]] = next((rule["name"] for rule in rules if match(rule["when"], row["features"])),
+                                          None)
+    tuned = []
+    for rule in rules:
+        rows = [row for row in results if owner.get(row["instance"]) == rule["name"]]
+        scores = {}
+        for cand in set([row["candidate"] for row in rows]):
+            list_row = [row for row in rows if row["candidate"] == cand]
+            found = [row for row in list_row if row["obj"] is not None]
+            gaps = [(row["obj"] - best[row["instance"]]) / max(abs(best[row["instance"]]), 1e-9) for row in found]
+            times = [row["build_time"] + row["solve_time"] for row in list_row]
+            scores[cand] = (-len(found) / len(list_row), float(np.mean(gaps)) if gaps else np.inf,
+                            float(np.mean(times)))
+        new_rule = copy.deepcopy(rule)
+        if scores:
+            new_rule["config"] = min(scores, key=scores.get)
+            found, gap, t = scores[new_rule["config"]]
+            new_rule["score"] = {"found_rate": -found, "gap": gap if np.isfinite(gap) else None, "time": t}
+        tuned.append(new_rule)
+    return tuned
+
+
+def save_rules(rules: List[Dict[str, object]], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rules, f, ensure_ascii=False, indent=2)
+
+
+def load_rules(path: str) -> List[Dict[str, object]]:
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    for rule in rules:
+        if rule["config"] not in Candidates:
+            raise ValueError("unknown candidate config: {0}".format(rule["config"]))
+    return rules
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import time
+from typing import List, Dict, Tuple, Optional
+
+from .model import SolverStatus, pywraplp, linear_solver_pb2, np
+from .relax import weighted_proto, solve_relaxation
+
+
+EPSILON = 1e-6
+
+
+class Cut:
+    """
+    主问题的割：theta >= rhs * (1 - sum(zeros))（最优性割），或 sum(zeros) + sum(1 - ones) >= 1（可行性割）
+    zeros/ones为主问题决策变量在原模型中的index
+    """
+    __slots__ = ["kind", "zeros", "ones", "rhs"]
+
+    def __init__(self, kind: str, zeros: List[int], ones: List[int] = None, rhs: float = 0.0):
+        self.kind = kind
+        self.zeros = zeros
+        self.ones = [] if ones is None else ones
+        self.rhs = rhs
+
+
+class LogicBenders:
+    """
+    基于逻辑的Benders分解
+    主问题：工位-设备（w）与工人-工位（y）的放置，以及只涉及w、y的约束；theta为加权目标的下界
+    子问题：固定w、y后分配工序（x、z、var），检查节拍、圈数与重复入站约束
+    子问题的可行域随w、y取1的集合单调增大：w、y只作为工序分配的使能条件出现
+    因此当前放置不可行时，它的所有子集都不可行（可行性割只涉及取0的变量）；
+    当前放置的最优值Z*是其所有子集的下界（最优性割 theta >= Z* * (1 - sum(取0的变量))）
+    """
+    def __init__(self, model, sub_time_limit: int = 10000):
+        self.model = model
+        self.sub_time_limit = sub_time_limit
+        self.proto = weighted_proto(model)
+        m = model
+        self.decision = [v.index() for s in m.w for v in m.w[s].values()] + \
+                        [v.index() for w in m.y for v in m.y[w].values()]
+        self.master_vars = sorted(self.decision)
+        self.cuts: List[Cut] = []
+        self.lb = 0.0
+        self.ub: Optional[float] = None
+        self.best_response = None
+        # 是否加入过只排除单个放置的割（子问题超时未定论时），此时不再能证明最优
+        self.exact = True
+        # 第一次加入这种割之前的下界：之后主问题的下界不再成立，这个下界仍然成立
+        self.valid_lb = 0.0
+        self.history: List[Dict[str, object]] = []
+
+    def coverRows(self) -> List[Tuple[List[int], float]]:
+        """
+        主问题中工序覆盖的有效不等式：每道工序至少有一个放了其设备的可用工位，至少有一个可做它的工人在其可用工位上
+        :return: [(变量index列表, 下界)]
+        """
+        m = self.model
+        rows = []
+        for op in m.z:
+            machs = [m.w[s][op[0]].index() for s in m.z[op] if s in m.w and op[0] in m.w[s]]
+            if machs:
+                rows.append((machs, 1.0))
+            wks = [m.y[w][s].index() for w in m.x.get(op, {}) for s in m.z[op] if s in m.y.get(w, {})]
+            if wks:
+                rows.append((wks, 1.0))
+        return rows
+
+    def masterProto(self) -> Tuple[linear_solver_pb2.MPModelProto, Dict[int, int], int]:
+        """
+        主问题：原模型中只涉及主问题变量的约束、工序覆盖不等式与已生成的割
+        :return: 主问题proto、原index -> 主问题index、theta的index
+        """
+        master = linear_solver_pb2.MPModelProto()
+        idxMap = {}
+        for i in self.master_vars:
+            idxMap[i] = len(master.variable)
+            var = master.variable.add()
+            var.CopyFrom(self.proto.variable[i])
+            var.objective_coefficient = 0
+        theta = len(master.variable)
+        var = master.variable.add()
+        var.name = "theta"
+        var.lower_bound = self.lb
+        var.upper_bound = pywraplp.Solver.infinity()
+        var.objective_coefficient = 1
+        for constr in self.proto.constraint:
+            if all([i in idxMap for i in constr.var_index]):
+                row = master.constraint.add()
+                row.lower_bound = constr.lower_bound
+                row.upper_bound = constr.upper_bound
+                row.var_index.extend([idxMap[i] for i in constr.var_index])
+                row.coefficient.extend(constr.coefficient)
+        for list_idx, lb in self.coverRows():
+            row = master.constraint.add()
+            row.lower_bound = lb
+            row.upper_bound = pywraplp.Solver.infinity()
+            row.var_index.extend([idxMap[i] for i in list_idx])
+            row.coefficient.extend([1.0] * len(list_idx))
+        for cut in self.cuts:
+            row = master.constraint.add()
+            row.upper_bound = pywraplp.Solver.infinity()
+            if cut.kind == "optimality":
+                # theta + rhs * sum(zeros) >= rhs
+                row.lower_bound = cut.rhs
+                row.var_index.extend([theta] + [idxMap[i] for i in cut.zeros])
+                row.coefficient.extend([1.0] + [cut.rhs] * len(cut.zeros))
+            else:
+                # sum(zeros) - sum(ones) >= 1 - |ones|
+                row.lower_bound = 1.0 - len(cut.ones)
+                row.var_index.extend([idxMap[i] for i in cut.zeros] + [idxMap[i] for i in cut.ones])
+                row.coefficient.extend([1.0] * len(cut.zeros) + [-1.0] * len(cut.ones))
+        return master, idxMap, theta
+
+    @property
+    def Bound(self) -> float:
+        """
+        加权目标的下界：nogood割排除当前最好放置后，主问题的下界只对其余放置成立，可能超过上界，取二者较小者
+        :return:
+        """
+        lb = self.lb if self.exact else self.valid_lb
+        return lb if self.ub is None else min(lb, self.ub)
+
+    def inexact(self):
+        """
+        加入只排除单个放置、但没有证明其下界的割
+        :return:
+        """
+        if self.exact:
+            self.valid_lb = self.lb
+        self.exact = False
+
+    def solveMaster(self, time_limit: int) -> Tuple[int, Optional[np.ndarray], Optional[float]]:
+        master, idxMap, theta = self.masterProto()
+        solver = pywraplp.Solver.CreateSolver("SCIP")
+        solver.LoadModelFromProto(master)
+        solver.SetTimeLimit(int(max(time_limit, 1)))
+        status = solver.Solve()
+        if status not in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+            return status, None, None
+        response = linear_solver_pb2.MPSolutionResponse()
+        solver.FillSolutionResponseProto(response)
+        vals = np.asarray(response.variable_value, dtype=np.float64)
+        placement = {i: float(round(vals[idxMap[i]])) for i in self.decision}
+        bound = response.best_objective_bound if status == pywraplp.Solver.FEASIBLE else vals[theta]
+        return status, placement, bound
+
+    def uncovered(self, placement: Dict[int, float]) -> Optional[List[int]]:
+        """
+        快速检查：是否存在工序，它的可用工位中没有一个同时放了其设备、且有可做它的工人
+        这样的工序只有在与它相关的w、y由0变1时才可能变得可行，据此生成比整体no-good更强的可行性割
+        :param placement: 主问题解
+        :return: 相关的取0变量index，所有工序都可覆盖时为None
+        """
+        m = self.model
+        for op in m.z:
+            zeros, covered = [], False
+            for s in m.z[op]:
+                if s not in m.w or op[0] not in m.w[s]:
+                    continue
+                idx_w = m.w[s][op[0]].index()
+                list_y = [m.y[w][s].index() for w in m.x.get(op, {}) if s in m.y.get(w, {})]
+                if placement[idx_w] > 0.5:
+                    if any([placement[i] > 0.5 for i in list_y]):
+                        covered = True
+                        break
+                else:
+                    zeros.append(idx_w)
+                zeros += [i for i in list_y if placement[i] < 0.5]
+            if not covered:
+                return zeros
+        return None
+
+    def solveSub(self, placement: Dict[int, float], time_limit: int):
+        sub = linear_solver_pb2.MPModelProto()
+        sub.CopyFrom(self.proto)
+        for i, val in placement.items():
+            sub.variable[i].lower_bound = val
+            sub.variable[i].upper_bound = val
+        solver = pywraplp.Solver.CreateSolver(self.model.backend)
+        solver.LoadModelFromProto(sub)
+        solver.SetTimeLimit(int(max(time_limit, 1)))
+        status = solver.Solve()
+        response = linear_solver_pb2.MPSolutionResponse()
+        if status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+            solver.FillSolutionResponseProto(response)
+        return status, response
+
+    def addCuts(self, placement: Dict[int, float], status: int, response):
+        zeros = [i for i, val in placement.items() if val < 0.5]
+        ones = [i for i, val in placement.items() if val > 0.5]
+        if status == pywraplp.Solver.INFEASIBLE:
+            self.cuts.append(Cut("feasibility", zeros))
+        elif status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+            obj = response.objective_value
+            if self.ub is None or obj < self.ub - EPSILON:
+                self.ub = obj
+                self.best_response = response
+            # 子问题未证明最优时用其下界
+            rhs = obj if status == pywraplp.Solver.OPTIMAL else response.best_objective_bound
+            if rhs > self.lb + EPSILON:
+                self.cuts.append(Cut("optimality", zeros, rhs=rhs))
+            # 同一放置不必再求解
+            self.cuts.append(Cut("nogood", zeros, ones))
+            if status != pywraplp.Solver.OPTIMAL:
+                self.inexact()
+        else:
+            # 子问题超时未定论：只排除当前放置
+            self.cuts.append(Cut("nogood", zeros, ones))
+            self.inexact()
+
+    def run(self, time_limit: int = 60000, max_iter: int = 1000) -> Dict[str, object]:
+        """
+        :param time_limit: 总时间上限（毫秒）
+        :param max_iter: 最大迭代次数
+        :return: 上界、下界（不超过上界）、gap、迭代次数与是否证明最优
+        """
+        m = self.model
+        s_t = time.time()
+        deadline = s_t + time_limit / 1000
+        # 主问题theta的初始下界取LP松弛的严格下界
+        relax = solve_relaxation(self.proto, time_limit=min(time_limit / 4, 10000))
+        if relax["bound"] == np.inf:
+            m.status = pywraplp.Solver.INFEASIBLE
+            return {"obj": None, "bound": None, "gap": None, "iterations": 0, "optimal": False,
+                    "status": SolverStatus.get(m.status), "history": self.history}
+        if relax["bound"] is not None:
+            self.lb = max(0.0, relax["bound"])
+        status = None
+        it = 0
+        while it < max_iter and time.time() < deadline:
+            it += 1
+            remaining = (deadline - time.time()) * 1000
+            status, placement, bound = self.solveMaster(remaining)
+            if placement is None:
+                # 主问题不可行：所有放置都已被排除
+                break
+            if status == pywraplp.Solver.OPTIMAL:
+                self.lb = max(self.lb, bound)
+            if self.ub is not None and self.lb >= self.ub - EPSILON:
+                break
+            zeros = self.uncovered(placement)
+            if zeros is not None:
+                self.cuts.append(Cut("feasibility", zeros))
+                sub_status = pywraplp.Solver.INFEASIBLE
+            else:
+                remaining = (deadline - time.time()) * 1000
+                sub_status, response = self.solveSub(placement, min(self.sub_time_limit, remaining))
+                self.addCuts(placement, sub_status, response)
+            self.history.append({"iter": it, "lb": self.Bound, "ub": self.ub, "sub": SolverStatus.get(sub_status),
+                                 "cuts": len(self.cuts), "time": time.time() - s_t})
+        optimal = self.exact and self.ub is not None and self.lb >= self.ub - EPSILON
+        res = {"obj": self.ub, "bound": self.Bound, "gap": None, "iterations": it,
+               "optimal": optimal, "status": None, "history": self.history}
+        if res["obj"] is not None and res["bound"] is not None:
+            res["gap"] = max(res["obj"] - res["bound"], 0.0) / max(abs(res["obj"]), 1e-9)
+        if self.best_response is not None:
+            m.solver.LoadSolutionFromProto(self.best_response)
+            m.status = pywraplp.Solver.OPTIMAL if optimal else pywraplp.Solver.FEASIBLE
+            m.incumbent = m.Incumbent
+            res["status"] = SolverStatus.get(m.status)
+        elif self.exact and status == pywraplp.Solver.INFEASIBLE:
+            m.status = pywraplp.Solver.INFEASIBLE
+            res["status"] = SolverStatus.get(m.status)
+        return res
+
+
+def run_benders(model, time_limit: int = 60000, sub_time_limit: int = 10000) -> Dict[str, object]:
+    """
+    基于逻辑的Benders分解求解
+    :param model: 已构建的OptModel
+    :param time_limit: 总时间上限（毫秒）
+    :param sub_time_limit: 每个子问题的时间上限（毫秒）
+    :return:
+    """
+    return LogicBenders(model, sub_time_limit).run(time_limit)
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Optional
+
+from .model import Model, SolverStatus, pywraplp, linear_solver_pb2
+from .relax import INF
+
+
+# 时间片用时低于时间上限的此比例且没有解时，视为求解器立即返回
+IMMEDIATE_RATIO = 0.05
+StatusCode = {v: k for k, v in SolverStatus.items()}
+
+
+def instance_signature(data: Dict) -> str:
+    """
+    算例内容签名，用于校验检查点与算例是否匹配
+    :param data: 算例原始数据
+    :return:
+    """
+    content = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    """
+    求解检查点：当前最好解、目标值、界以及求解器信息
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(self, data: Dict):
+        """
+        原子写入（先写临时文件再替换），进程被杀时不会留下损坏的检查点
+        :param data: 检查点内容
+        :return:
+        """
+        tmp = self.path + ".tmp"
+        with open(file=tmp, mode="w", encoding="utf-8") as fp:
+            json.dump(data, fp)
+        os.replace(tmp, self.path)
+
+    def load(self) -> Optional[Dict]:
+        if not self.exists:
+            return None
+        with open(file=self.path, mode="r", encoding="utf-8") as fp:
+            return json.loads(fp.read())
+
+    def remove(self):
+        if self.exists:
+            os.remove(self.path)
+
+
+def load_incumbent(model: Model, incumbent: Dict[str, float], obj: float, status: int) -> int:
+    """
+    把最好解（变量名 -> 取值）写回求解器，之后可直接读取解与目标值
+    :param model: 模型
+    :param incumbent: 最好解
+    :param obj: 最好解的目标值
+    :param status: 最好解的状态（OPTIMAL / FEASIBLE）
+    :return: 载入后的状态
+    """
+    response = linear_solver_pb2.MPSolutionResponse()
+    response.status = linear_solver_pb2.MPSOLVER_OPTIMAL if status == pywraplp.Solver.OPTIMAL \
+        else linear_solver_pb2.MPSOLVER_FEASIBLE
+    response.objective_value = obj
+    response.variable_value.extend([incumbent.get(var.name(), 0.0) for var in model.Vars])
+    model.solver.LoadSolutionFromProto(response)
+    model.status = status if status == pywraplp.Solver.OPTIMAL else pywraplp.Solver.FEASIBLE
+    model.incumbent = incumbent
+    return model.status
+
+
+def solve_with_checkpoint(model: Model, path: str, time_limit: int = None, interval: int = 60000,
+                          resume: bool = True) -> int:
+    """
+    分时间片求解，每个时间片结束后把当前最好解写入检查点；下一时间片以该解热启动
+    resume=True且检查点存在时，以检查点中的解热启动，并扣除已消耗的求解时间；已用完时间上限时直接载入检查点中的解
+    返回前把最好解写回求解器（最后一个时间片可能停在更差的解上）
+    限制：每个时间片都调用resetSolve，SCIP从头开始求解，不保留上一时间片的搜索树与对偶界；
+    检查点记录各时间片中最大的下界（bound），但不能传给下一个时间片，时间片越短下界越弱
+    注意：按模型当前设置的目标求解（字典序模式请分阶段调用）
+    :param model: 已构建的模型
+    :param path: 检查点路径
+    :param time_limit: 总求解时间上限（毫秒），None表示直到证明最优
+    :param interval: 检查点间隔（毫秒）
+    :param resume: 是否从检查点恢复
+    :return: 求解状态
+    """
+    ckpt = Checkpoint(path)
+    signature = instance_signature(model.data_loader.dataset.data)
+    elapsed, best_obj, best_bound, slices = 0.0, None, None, 0
+    best_status = status = None
+    data = ckpt.load() if resume else None
+    if data is not None:
+        if data["signature"] != signature:
+            raise ValueError("checkpoint {0} does not match the instance".format(path))
+        elapsed = data["elapsed"]
+        best_obj = data["obj"]
+        best_bound = data["bound"]
+        slices = data["slices"]
+        status = StatusCode.get(data["status"])
+        best_status = StatusCode.get(data.get("best_status"))
+        model.incumbent = data["incumbent"]
+        print("resume from checkpoint: obj={0}, bound={1}, elapsed={2:.1f}ms".format(best_obj, best_bound, elapsed))
+    best = model.incumbent
+    while True:
+        slice_limit = interval
+        if time_limit is not None:
+            slice_limit = min(interval, time_limit - elapsed)
+            if slice_limit <= 0:
+                break
+        model.resetSolve()
+        if best:
+            model.SetHint(best)
+        s_t = time.time()
+        status = Model.solveModel(model, slice_limit)
+        took = (time.time() - s_t) * 1000
+        elapsed += took
+        if status == pywraplp.Solver.ABNORMAL or (status == pywraplp.Solver.NOT_SOLVED and
+                                                   took < IMMEDIATE_RATIO * slice_limit):
+            # 求解器异常或立即返回：不算作时间片，也不覆盖检查点
+            print("slice returned {0} after {1:.1f}ms, stop".format(SolverStatus.get(status, str(status)), took))
+            break
+        slices += 1
+        improved = False
+        if model.HasSolution:
+            obj = model.ObjValue
+            if best_obj is None or obj < best_obj - 1e-9:
+                best_obj, best, improved = obj, model.incumbent, True
+            if status == pywraplp.Solver.OPTIMAL or improved:
+                best_status = status
+        if status in [pywraplp.Solver.FEASIBLE, pywraplp.Solver.OPTIMAL, pywraplp.Solver.NOT_SOLVED]:
+            bound = model.solver.Objective().BestBound()
+            if abs(bound) < INF:
+                best_bound = bound if best_bound is None else max(best_bound, bound)
+        ckpt.save({
+            "signature": signature,
+            "backend": model.backend,
+            "status": SolverStatus.get(status, str(status)),
+            "best_status": SolverStatus.get(best_status),
+            "obj": best_obj,
+            "bound": best_bound,
+            "elapsed": elapsed,
+            "slices": slices,
+            "nodes": model.solver.nodes(),
+            "iterations": model.solver.iterations(),
+            "incumbent": best
+        })
+        print("checkpoint {0}: obj={1}, bound={2}, elapsed={3:.1f}ms".format(slices, best_obj, best_bound, elapsed))
+        # 证明最优或不可行时停止
+        if status not in [pywraplp.Solver.FEASIBLE, pywraplp.Solver.NOT_SOLVED]:
+            break
+        # 没有改进时加长时间片，避免每次重启都在同一处截断搜索
+        if not improved:
+            interval *= 2
+    if best_obj is not None:
+        # 最后一个时间片的解可能比最好解差（或没有解）
+        return load_incumbent(model, best, best_obj, best_status)
+    return status
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import List
+
+
+def mono_cliques(list_m: List[str], monos: List[str]) -> List[List[str]]:
+    """
+    工位上设备冲突图的全部极大团：独占设备与同工位的任何其它设备冲突，普通设备之间不冲突
+    :param list_m: 工位的可分配设备
+    :param monos: 独占设备
+    :return: 每个团的设备列表（至少两个设备）
+    """
+    mono = [m for m in list_m if m in monos]
+    other = [m for m in list_m if m not in monos]
+    if not mono:
+        return []
+    if not other:
+        return [mono] if len(mono) > 1 else []
+    return [mono + [m] for m in other]
+
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import time
+import random
+from typing import List, Dict, Set, Tuple, Optional
+
+from .model import SolverStatus, pywraplp, linear_solver_pb2, np
+
+
+EPSILON = 1e-6
+
+
+class Neighborhood:
+    """
+    LNS邻域：释放的工序、工人与工位，其余决策变量固定为当前解
+    """
+    __slots__ = ["kind", "ops", "workers", "stations"]
+
+    def __init__(self, kind: str, ops: Set[tuple], workers: Set[str], stations: Set[str]):
+        self.kind = kind
+        self.ops = ops
+        self.workers = workers
+        self.stations = stations
+
+    def __repr__(self):
+        return "Neighborhood({0}: {1} ops, {2} workers, {3} stations)".format(
+            self.kind, len(self.ops), len(self.workers), len(self.stations))
+
+
+class LNS:
+    """
+    基于子MIP的大邻域搜索：反复释放一个邻域、固定其余决策变量（x、y、z、w），限时求解子问题，接受改进解
+    邻域类型（节拍最大的工人、一个工件/装配层的工序、连续的工位窗口）按历史收益自适应选择，邻域大小按子问题的求解情况自适应调整
+    """
+    Kinds = ["takt", "part", "layer", "window"]
+
+    def __init__(self, model, seed: int = 0, sub_time_limit: int = 5000, size: float = 0.2,
+                 reaction: float = 0.3):
+        """
+        :param model: 已构建（加权目标）的OptModel
+        :param seed: 随机种子
+        :param sub_time_limit: 每个子问题的时间上限（毫秒）
+        :param size: 初始邻域大小（占工人/工位数的比例）
+        :param reaction: 邻域权重的更新速率
+        """
+        self.model = model
+        self.rnd = random.Random(seed)
+        self.sub_time_limit = sub_time_limit
+        self.size = size
+        self.reaction = reaction
+        self.weights = {kind: 1.0 for kind in self.Kinds}
+        self.layers = [parts for parts in model.graph]
+        self.sts = sorted(model.data_loader.listStations, key=lambda s: model.data_loader.stToIdx[s])
+        # 决策变量的index；子问题在模型proto的副本上修改上下界，不改动model的求解器
+        self.decision = [var.index() for var in self.decisionVars()]
+        self.proto = linear_solver_pb2.MPModelProto()
+        self.best_vals: Optional[np.ndarray] = None
+        self.best_obj: Optional[float] = None
+        self.best_response = None
+        self.history: List[Dict[str, object]] = []
+
+    def decisionVars(self) -> List[pywraplp.Variable]:
+        return self.model.DecisionVars
+
+    def objValue(self, vals: np.ndarray) -> float:
+        m = self.model
+        vol = sum([vals[x.index()] for x in m.obj])
+        return m.W1 * vals[m.max_tt.index()] + m.W2 * vol
+
+    def accept(self, response: linear_solver_pb2.MPSolutionResponse):
+        """
+        记录最好解
+        :param response: 求解结果
+        :return:
+        """
+        vals = np.asarray(response.variable_value, dtype=np.float64)
+        self.best_vals = vals
+        self.best_obj = self.objValue(vals)
+        # 由变量取值重新计算加权目标（初始解可能来自字典序模式，其目标值不是加权目标）
+        response.objective_value = self.best_obj
+        self.best_response = response
+
+    def assignment(self) -> Tuple[Dict[tuple, str], Dict[tuple, str], Dict[str, List[str]]]:
+        """
+        当前最好解中的（工序 -> 工人）、（工序 -> 工位）、（工人 -> 工位）
+        :return:
+        """
+        m, vals = self.model, self.best_vals
+        opToWk = {op: w for op in m.x for w, v in m.x[op].items() if vals[v.index()] > 0.5}
+        opToSt = {op: s for op in m.z for s, v in m.z[op].items() if vals[v.index()] > 0.5}
+        wkToSts = {}
+        for w in m.y:
+            wkToSts[w] = [s for s, v in m.y[w].items() if vals[v.index()] > 0.5]
+        return opToWk, opToSt, wkToSts
+
+    def takt(self, opToWk: Dict[tuple, str]) -> Dict[str, float]:
+        load = {w: 0.0 for w in self.model.data_loader.listWorkers}
+        for op, w in opToWk.items():
+            load[w] += self.model.timeMap[(op, w)]
+        return load
+
+    def neighborhood(self, kind: str) -> Neighborhood:
+        """
+        按类型生成邻域，释放的工人、工位由当前解中与所选工序相关的部分补全
+        :param kind: takt / part / layer / window
+        :return:
+        """
+        opToWk, opToSt, wkToSts = self.assignment()
+        stToWk = {s: w for w, sts in wkToSts.items() for s in sts}
+        n_wk = max(2, int(round(self.size * len(self.model.data_loader.listWorkers))))
+        ops, workers, stations = set(), set(), set()
+        if kind == "takt":
+            # 节拍最大的工人与节拍最小的工人（供转移工序）
+            load = self.takt(opToWk)
+            order = sorted(load, key=load.get)
+            k = max(1, n_wk // 2)
+            workers = set(order[-k:] + order[:k])
+        elif kind == "part":
+            parts = list(self.model.data_loader.partToOps.keys())
+            part = self.rnd.choice(parts)
+            ops = set(self.model.data_loader.partToOps[part])
+        elif kind == "layer":
+            parts = self.rnd.choice(self.layers)
+            ops = set([op for part in parts for op in self.model.data_loader.partToOps[part]])
+        else:
+            n_st = max(2, int(round(self.size * len(self.sts))))
+            i = self.rnd.randrange(0, max(len(self.sts) - n_st, 0) + 1)
+            stations = set(self.sts[i:i + n_st])
+        # 补全：工人的工序与工位、工序的工人与工位、工位上的工人
+        workers |= set([opToWk[op] for op in ops if op in opToWk])
+        workers |= set([stToWk[s] for s in stations if s in stToWk])
+        ops |= set([op for op, w in opToWk.items() if w in workers])
+        ops |= set([op for op, s in opToSt.items() if s in stations])
+        stations |= set([s for w in workers for s in wkToSts.get(w, [])])
+        stations |= set([opToSt[op] for op in ops if op in opToSt])
+        # 空闲工位可供释放的工人使用
+        stations |= set([s for s in self.sts if s not in stToWk])
+        return Neighborhood(kind, ops, workers, stations)
+
+    def subProblem(self, nbhd: Neighborhood) -> Tuple[linear_solver_pb2.MPModelProto, int]:
+        """
+        子问题：邻域外的决策变量固定为最好解，以最好解为热启动
+        :param nbhd: 邻域
+        :return: 子问题proto与释放的决策变量数
+        """
+        m, vals = self.model, self.best_vals
+        free = set()
+        for op in nbhd.ops:
+            free |= set([v.index() for v in m.x.get(op, {}).values()])
+            free |= set([v.index() for v in m.z.get(op, {}).values()])
+        for w in nbhd.workers:
+            free |= set([v.index() for v in m.y.get(w, {}).values()])
+        for s in nbhd.stations:
+            free |= set([v.index() for v in m.w.get(s, {}).values()])
+            # 工位空闲时其它工人也可以进入
+            free |= set([m.y[w][s].index() for w in nbhd.workers if s in m.y.get(w, {})])
+        sub = linear_solver_pb2.MPModelProto()
+        sub.CopyFrom(self.proto)
+        for idx in self.decision:
+            if idx not in free:
+                val = float(round(vals[idx]))
+                sub.variable[idx].lower_bound = val
+                sub.variable[idx].upper_bound = val
+        sub.solution_hint.var_index.extend(range(len(vals)))
+        sub.solution_hint.var_value.extend(vals.tolist())
+        return sub, len(free)
+
+    def solveSub(self, sub: linear_solver_pb2.MPModelProto, time_limit: int):
+        solver = pywraplp.Solver.CreateSolver(self.model.backend)
+        solver.LoadModelFromProto(sub)
+        solver.SetTimeLimit(int(max(time_limit, 1)))
+        status = solver.Solve()
+        response = linear_solver_pb2.MPSolutionResponse()
+        if status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+            solver.FillSolutionResponseProto(response)
+        return status, response
+
+    def select(self) -> str:
+        kinds = list(self.weights.keys())
+        return self.rnd.choices(kinds, weights=[self.weights[k] for k in kinds])[0]
+
+    def update(self, kind: str, improved: bool, status: int):
+        """
+        自适应：改进的邻域类型权重增加；子问题被证明最优但未改进时扩大邻域，超时未改进时缩小邻域
+        :return:
+        """
+        reward = 1.0 if improved else 0.1
+        self.weights[kind] = (1 - self.reaction) * self.weights[kind] + self.reaction * reward
+        if not improved:
+            if status == pywraplp.Solver.OPTIMAL:
+                self.size = min(self.size * 1.2, 0.8)
+            else:
+                self.size = max(self.size / 1.2, 0.05)
+
+    def run(self, time_limit: int = 60000, init_time_limit: int = None) -> Dict[str, object]:
+        """
+        :param time_limit: 总时间上限（毫秒，墙钟）
+        :param init_time_limit: 没有初始可行解时，整体求解寻找初始解的时间上限（毫秒），默认为全部时间；
+            在此时间内未找到时，剩余时间继续整体求解
+        :return: 最好目标值、迭代历史
+        """
+        m = self.model
+        s_t = time.time()
+        deadline = s_t + time_limit / 1000
+        # 修改目标之前取出当前解
+        response = None
+        if m.HasSolution:
+            response = linear_solver_pb2.MPSolutionResponse()
+            m.solver.FillSolutionResponseProto(response)
+        if m.mode != "weighted":
+            # 子问题之间比较的是加权目标（minObj同时恢复字典序第二阶段收紧的最大节拍上界）
+            m.minObj("weighted")
+        if response is None:
+            remaining = (deadline - time.time()) * 1000
+            init = remaining if init_time_limit is None else min(init_time_limit, remaining)
+            m.solveModel(init)
+            remaining = (deadline - time.time()) * 1000
+            if not m.HasSolution and remaining > 0:
+                # 初始解的时间上限内未找到：剩余时间继续整体求解
+                m.resetSolve()
+                m.solveModel(remaining)
+            if not m.HasSolution:
+                return {"obj": None, "status": SolverStatus.get(m.status, str(m.status)), "iterations": 0,
+                        "history": self.history}
+            response = linear_solver_pb2.MPSolutionResponse()
+            m.solver.FillSolutionResponseProto(response)
+        self.model.solver.ExportModelToProto(self.proto)
+        # 导出的模型可能带有求解器上设置过的初始解（如字典序第二阶段），子问题各自设置初始解
+        self.proto.ClearField("solution_hint")
+        self.accept(response)
+        it = 0
+        while time.time() < deadline - 0.05:
+            it += 1
+            kind = self.select()
+            nbhd = self.neighborhood(kind)
+            t0 = time.time()
+            sub, n_free = self.subProblem(nbhd)
+            remaining = (deadline - time.time()) * 1000
+            status, response = self.solveSub(sub, min(self.sub_time_limit, remaining))
+            improved = False
+            if status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+                obj = self.objValue(np.asarray(response.variable_value, dtype=np.float64))
+                if obj < self.best_obj - EPSILON:
+                    self.accept(response)
+                    improved = True
+            self.update(kind, improved, status)
+            self.history.append({"iter": it, "kind": kind, "free": n_free, "status": SolverStatus.get(status),
+                                 "obj": self.best_obj, "improved": improved, "time": time.time() - t0})
+        # 最好解写回model的求解器
+        m.solver.LoadSolutionFromProto(self.best_response)
+        m.status = pywraplp.Solver.FEASIBLE
+        m.incumbent = m.Incumbent
+        return {"obj": self.best_obj, "status": SolverStatus.get(m.status), "iterations": it,
+                "weights": dict(self.weights), "history": self.history}
+
+
+def run_lns(model, time_limit: int = 60000, sub_time_limit: int = 5000, seed: int = 0,
+            init_time_limit: int = None) -> Dict[str, object]:
+    """
+    大邻域搜索
+    :param model: 已构建的OptModel（加权目标）
+    :param time_limit: 总时间上限（毫秒）
+    :param sub_time_limit: 每个子问题的时间上限（毫秒）
+    :param seed: 随机种子
+    :param init_time_limit: 寻找初始解的时间上限（毫秒）
+    :return:
+    """
+    lns = LNS(model, seed=seed, sub_time_limit=sub_time_limit)
+    return lns.run(time_limit, init_time_limit)
@@ -0,0 +1,73 @@
+import sys
+from typing import Dict
+
+from moris.data import DataLoader
+from moris.utils import rss_mb, LazyModule
+
+
+np = LazyModule("numpy")
+
+
+# 每个（工序，工人，工位）组合的内存开销估计（KB，含其余约束族随规模增长的部分），
+# 由训练集与合成算例（2.5千~6万个组合）构建前后的常驻内存实测标定
+# full：一个var变量与4条关联约束；compact：一条关联约束
+KB_PER_TRIPLE = {"full": 1.8, "compact": 0.5}
+# 首次创建求解器时加载OR-Tools的内存（MB）
+SOLVER_BASE_MB = 80
+
+
+def count_triples(data_loader: DataLoader) -> int:
+    """
+    （工序，工人，工位）组合数，即full形式中var变量的个数
+    :param data_loader: 数据
+    :return:
+    """
+    elig = data_loader.eligibility
+    n_wks = np.diff(elig.opToWks.indptr)
+    n_sts = np.diff(elig.opToSts.indptr)
+    # 没有可分配工位的工序在建模时对所有工位建变量
+    n_sts = np.where(n_sts > 0, n_sts, data_loader.StCnt)
+    return int(np.dot(n_wks, n_sts))
+
+
+def estimate_build_mb(data_loader: DataLoader) -> Dict[str, float]:
+    """
+    两种模型形式在当前内存之上新增的内存估计（MB）
+    :param data_loader: 数据
+    :return: {"full": MB, "compact": MB}
+    """
+    n = count_triples(data_loader)
+    base = 0 if "ortools.linear_solver.pywraplp" in sys.modules else SOLVER_BASE_MB
+    return {k: base + n * kb / 1024 for k, kb in KB_PER_TRIPLE.items()}
+
+
+def choose_formulation(data_loader: DataLoader, memory_budget: float) -> str:
+    """
+    按内存预算选择模型形式；两种形式都超出预算时提前抛出MemoryError，而不是构建中被系统杀掉
+    没有分解形式的兜底：Benders的子问题与分片构建的合并都需要在主进程中持有完整模型，并不比compact形式省内存
+    :param data_loader: 数据
+    :param memory_budget: 内存预算（MB）
+    :return: full / compact
+    """
+    base = rss_mb()
+    est = estimate_build_mb(data_loader)
+    for formulation in ["full", "compact"]:
+        if base + est[formulation] <= memory_budget:
+            return formulation
+    raise MemoryError("estimated {0:.0f}MB (compact) exceeds the memory budget {1:.0f}MB"
+                      .format(base + est["compact"], memory_budget))
+
+
+def check_budget(phase: str, memory_budget: float = None):
+    """
+    构建过程中检查内存是否超出预算
+    :param phase: 当前阶段（约束族）
+    :param memory_budget: 内存预算（MB），None表示不检查
+    :return:
+    """
+    if memory_budget is None:
+        return
+    rss = rss_mb()
+    if rss > memory_budget:
+        raise MemoryError("rss {0:.0f}MB exceeds the memory budget {1:.0f}MB after {2}"
+                          .format(rss, memory_budget, phase))
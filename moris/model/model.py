@@ -1,9 +1,20 @@
-from typing import List, Tuple, Dict
-from ortools.linear_solver import pywraplp
-import ortools.linear_solver.linear_solver_natural_api as lp
+from __future__ import annotations
+
+import time
+from typing import List, Tuple, Dict, TYPE_CHECKING
 
 from moris.graph import Graph
 from moris.data import DataLoader
+from moris.utils import LazyModule
+from .stats import ModelStats
+
+if TYPE_CHECKING:
+    import ortools.linear_solver.linear_solver_natural_api as lp
+
+
+np = LazyModule("numpy")
+pywraplp = LazyModule("ortools.linear_solver.pywraplp")
+linear_solver_pb2 = LazyModule("ortools.linear_solver.linear_solver_pb2")
 
 
 SolverStatus = {0: 'OPTIMAL',
@@ -18,19 +29,31 @@ def tpl_to_str(tpl: Tuple[str, str]):
     return ";".join(tpl)
 
 
+def reset_solver(solver: pywraplp.Solver):
+    # 见Model.resetSolve；不依赖Model，供直接持有求解器的组合求解使用
+    objective = solver.Objective()
+    objective.SetOffset(objective.offset())
+
+
 class Model:
-    def __init__(self, data_loader: DataLoader):
+    def __init__(self, data_loader: DataLoader, backend: str = "SCIP"):
         self.x = {}
         self.y = {}
         self.z = {}
         self.w = {}
-        self.solver = self.init_solver()
+        self.backend = backend
+        self.solver = self.init_solver(backend)
+        self.status = None
+        # 最近一次求解得到的解（变量名 -> 取值）
+        self.incumbent = {}
+        # 模型规模与求解统计
+        self.stats = ModelStats()
         self.data_loader = data_loader
         self.graph = Graph(data_loader.graph)
 
     @staticmethod
-    def init_solver() -> pywraplp.Solver:
-        return pywraplp.Solver.CreateSolver("SCIP")
+    def init_solver(backend: str = "SCIP") -> pywraplp.Solver:
+        return pywraplp.Solver.CreateSolver(backend)
 
     @property
     def StCnt(self) -> int:
@@ -126,23 +149,86 @@ class Model:
     def opToIdx(self) -> Dict[str, int]:
         dictOpToIdx = {}
         s_cnt = 1
-        for parts in self.graph:
-            for part in parts:
-                list_ops = self.data_loader.partToOps[part]
-                opToIdx = {op[1]: idx + s_cnt for idx, op in enumerate(list_ops)}
-                dictOpToIdx.update(opToIdx)
-                s_cnt += len(list_ops)
+        list_parts = [part for parts in self.graph for part in parts]
+        in_graph = set(list_parts)
+        # 不在工件图中的工件（没有装配关系）排在最后
+        list_parts += [part for part in self.data_loader.partToOps if part not in in_graph]
+        for part in list_parts:
+            list_ops = self.data_loader.partToOps[part]
+            opToIdx = {op[1]: idx + s_cnt for idx, op in enumerate(list_ops)}
+            dictOpToIdx.update(opToIdx)
+            s_cnt += len(list_ops)
         return dictOpToIdx
 
-    def AddConstr(self, constr: lp.LinearConstraint):
-        self.solver.Add(constr)
+    def AddConstr(self, constr: lp.LinearConstraint, name: str = ""):
+        return self.solver.Add(constr, name)
+
+    def LookupConstraint(self, name: str):
+        return self.solver.LookupConstraint(name)
 
     @property
     def ObjValue(self):
         return self.solver.Objective().Value()
 
-    def solveModel(self):
+    @property
+    def HasSolution(self) -> bool:
+        return self.status in [pywraplp.Solver.FEASIBLE, pywraplp.Solver.OPTIMAL]
+
+    @property
+    def Incumbent(self) -> Dict[str, float]:
+        """
+        当前解（变量名 -> 取值），用于热启动
+        :return:
+        """
+        return {var.name(): var.solution_value() for var in self.Vars}
+
+    @property
+    def SolutionValues(self) -> np.ndarray:
+        """
+        一次性读取所有变量的取值（按变量index排列）
+        :return:
+        """
+        response = linear_solver_pb2.MPSolutionResponse()
+        self.solver.FillSolutionResponseProto(response)
+        return np.asarray(response.variable_value, dtype=np.float64)
+
+    def SetHint(self, values: Dict[str, float]):
+        """
+        设置热启动解（变量名 -> 取值），不存在的变量忽略
+        :param values: 变量取值
+        :return:
+        """
+        list_var, list_val = [], []
+        for name, val in values.items():
+            var = self.LookupVariable(name)
+            if var is None:
+                continue
+            list_var.append(var)
+            list_val.append(val)
+        self.solver.SetHint(list_var, list_val)
+
+    def resetSolve(self):
+        """
+        使下一次求解从头开始：模型未修改时SCIP不释放上一次求解的变换问题，
+        新的初始解不被接受，且时间上限按累计求解时间计算；重设目标常数项即可使其释放
+        :return:
+        """
+        reset_solver(self.solver)
+
+    def solveModel(self, time_limit: int = None):
+        """
+        求解模型
+        :param time_limit: 求解时间上限（毫秒），None表示不限制
+        :return: 求解状态
+        """
+        if time_limit is not None:
+            self.solver.SetTimeLimit(int(time_limit))
+        s_t = time.time()
         status = self.solver.Solve()
+        self.status = status
+        self.stats.record_solve((time.time() - s_t) * 1000, self.HasSolution)
+        if self.HasSolution:
+            self.incumbent = self.Incumbent
         print(status)
         if status in [pywraplp.Solver.FEASIBLE, pywraplp.Solver.OPTIMAL]:
             print('Solution:')
@@ -150,3 +236,4 @@ class Model:
             print('Problem solved in %f milliseconds' % self.solver.wall_time())
         else:
             print("The problem does not have solution")
+        return status
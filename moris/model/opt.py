@@ -1,27 +1,61 @@
-import numpy as np
-import polars as pl
+from __future__ import annotations
 
-from .model import Model, tpl_to_str
+import gc
+import time
+from typing import List, Tuple, Dict, Iterator
+
+from .model import Model, tpl_to_str, linear_solver_pb2, pywraplp
+from .whatif import Scenario, WhatIfState, scenario_edits, apply_edits, time_scale
+from .checkpoint import solve_with_checkpoint
+from .stats import build_stats, model_stats, print_stats
+from .relax import relax_and_round
+from .lns import run_lns
+from .cliques import mono_cliques
+from .benders import run_benders
+from .sharded import build_sharded, usable_processes
+from .memory import choose_formulation, check_budget
 from moris.data import DataLoader
+from moris.utils import dump_data, LazyModule
+
+
+np = LazyModule("numpy")
+pl = LazyModule("polars")
 
 
 EPSILON = 1e-6
+# 字典序模式下，第二阶段最大节拍允许的相对松弛量
+LEX_TOL = 1e-4
 
 
 class OptModel(Model):
-    def __init__(self, data_loader: DataLoader):
-        super().__init__(data_loader)
+    def __init__(self, data_loader: DataLoader, backend: str = "SCIP"):
+        super().__init__(data_loader, backend)
         self.var = {}
         self.vard = {}
-        self.stToMach = {}
         self.v = {}
         self.vd = {}
         self.dual = {}
         self.tt = {}
+        # 工人做工序的时间 (op, w) -> t
+        self.timeMap = {}
+        # 节拍波动变量的上界 w -> M
+        self.volUb = {}
         self.obj = []
         self.max_tt = None
         self.allow_help = False
+        # 目标模式：weighted（加权和）/ lexico（先最大节拍，后波动率）
+        self.mode = "weighted"
+        self.lex_tol = LEX_TOL
+        # what-if变更状态
+        self.whatIfState = WhatIfState()
+        # 模型形式：full（含var变量）/ compact（不建var变量，直接约束x、v与y）
+        self.formulation = "full"
+        # 圈数约束形式：index（工位序号之差的双向大M）/ position（工序位置整数变量与逐对收紧的大M）
+        self.circle_form = "index"
+        # 是否逐个约束族记录峰值内存（低内存/有预算的构建）
+        self.track_peak_rss = False
 
+    @build_stats()
     def allocStToMach(self):
         """
         w变量：(工位-设备)分配关系
@@ -31,35 +65,22 @@ class OptModel(Model):
         [self.create_w(s, m) for s, list_m in self.data_loader.stToAvailMachs.items() for m in list_m]
         # 固定设备约束
         for s, m in self.data_loader.fixStMachPair:
-            self.AddConstr(self.w[s][m] == 1)
+            self.AddConstr(self.w[s][m] == 1, name="fix_mach_{0}_{1}".format(s, m))
             if m in self.data_loader.listMonoMachs:
                 expr = self.Sum([self.w[s][_m] for _m in self.w[s]])
                 self.AddConstr(expr == 1)
-        # 移动设备中需要考虑独占设备的约束
+        # 移动独占设备所分配的工位，不允许其它设备的加入：工位上设备冲突图的极大团
+        monos = self.data_loader.listMoveMonoMachs
         for s, list_m in self.w.items():
-            for m in list_m:
-                # 移动独占设备所分配的工位，不允许其它设备的加入
-                if m in self.data_loader.listMoveMonoMachs:
-                    # y = (1 - x1) * x2
-                    name = "contr_mono_{0}_{1}".format(s, m)
-                    u = int(self.data_loader.conf["max_m_per_st"])
-                    x1 = 1 - self.w[s][m]
-                    x2 = self.Sum([self.w[s][_m] for _m in self.w[s] if _m != m])
-                    # 引入新变量y，代表工位s其它设备的入站情况（除去m设备）
-                    y = self.IntVar(0, u, name=name)
-                    self.AddConstr(y <= u * (1 - x1))
-                    self.AddConstr(y <= x2)
-                    self.AddConstr(x2 - u * x1 <= y)
-                    # 更新s工位的替代变量
-                    self.stToMach[s] = self.w[s][m] + y
+            for clique in mono_cliques(list(list_m.keys()), monos):
+                expr = self.Sum([self.w[s][m] for m in clique])
+                self.AddConstr(expr <= 1, name="mono_{0}_{1}".format(s, clique[-1]))
         # 每个工位的设备数量有上限约束
         for s in self.w:
-            if s in self.data_loader.listMoveMonoMachs:
-                expr = self.stToMach[s]
-            else:
-                expr = self.Sum([self.w[s][m] for m in self.w[s]])
+            expr = self.Sum([self.w[s][m] for m in self.w[s]])
             self.AddConstr(expr <= self.data_loader.conf["max_m_per_st"])
 
+    @build_stats()
     def allocOpToWks(self):
         """
         x变量：(工序-工人)分配关系
@@ -74,6 +95,7 @@ class OptModel(Model):
             expr = self.Sum([self.x[op][w] for w in self.x[op]])
             self.AddConstr(expr == 1)
 
+    @build_stats()
     def allocWkToSts(self):
         """
         y变量：(工人-工位)分配关系
@@ -83,13 +105,14 @@ class OptModel(Model):
         [self.create_y(w, s) for w, list_s in self.data_loader.wkToAvailSts.items() for s in list_s]
         for w in self.y:
             expr = self.Sum([self.y[w][s] for s in self.y[w]])
-            self.AddConstr(1 <= expr)
-            self.AddConstr(expr <= self.data_loader.conf["max_st_per_w"])
+            self.AddConstr(1 <= expr, name="wk_st_lb_{0}".format(w))
+            self.AddConstr(expr <= self.data_loader.conf["max_st_per_w"], name="wk_st_ub_{0}".format(w))
         # 每个工位最多分配一个人
         for s in self.data_loader.listStations:
             expr = self.Sum([self.y[w][s] for w in self.y if s in self.y[w]])
             self.AddConstr(expr <= 1)
 
+    @build_stats()
     def allocOpToSts(self):
         """
         z变量：(工序-工位)分配关系
@@ -104,11 +127,14 @@ class OptModel(Model):
             expr = self.Sum([self.z[op][s] for s in self.z[op]])
             self.AddConstr(expr == 1)
 
+    @build_stats()
     def create_var(self):
         """
         var变量：(工序-工人-工位)分配关系
         :return:
         """
+        if self.formulation == "compact":
+            return
         for op, list_w in self.data_loader.opToAvailWks.items():
             self.var.setdefault(op, {})
             for w in list_w:
@@ -122,26 +148,27 @@ class OptModel(Model):
                         name = "var_{0}_{1}_{2}".format(tpl_to_str(op), w, s)
                         self.var[op][w][s] = self.BoolVar(name=name)
 
-    def addVarConstr(self):
+    @build_stats()
+    def addVarConstr(self, ops: List[Tuple[str, str]] = None):
         """
         x,y,z,w,var之间的关系
+        :param ops: 只构建这些工序的约束（分片构建，不含工人层级平衡约束），默认全部
         :return:
         """
+        if self.formulation == "compact":
+            return self.addCompactVarConstr(ops)
+        ops_x, ops_z = self.opsOf(ops)
         # 工序，工人确定时，最多只能分配一个工位
-        for op in self.x:
+        for op in ops_x:
             for w in self.var[op]:
                 expr = self.Sum([self.var[op][w][s] for s in self.var[op][w]])
                 self.AddConstr(expr <= 1)
 
-        # 每个工人做的工件满足上下层级平衡约束
-        for w in self.data_loader.listWorkers:
-            lhs = self.Sum([self.x[op][w] for op in self.x for _w in self.x[op] if _w == w])
-            rhs = self.Sum([self.var[op][w][s] for op in self.var for _w in self.var[op]
-                            if _w == w for s in self.var[op][w]])
-            self.AddConstr(lhs == rhs)
+        if ops is None:
+            self.addBalanceConstr()
 
         # y = z[op][s] * w[s][m]（分配了对应设备的工位，工序才能分配到该工位）
-        for op in self.z:
+        for op in ops_z:
             for s in self.z[op]:
                 if s in self.w and op[0] in self.w[s]:
                     x1 = self.w[s][op[0]]
@@ -157,7 +184,7 @@ class OptModel(Model):
                     self.v[op][s] = y
 
         # var等效约束
-        for op in self.var:
+        for op in ops_x:
             for w in self.var[op]:
                 for s in self.var[op][w]:
                     # var = x * y * v(z的替代变量)
@@ -166,6 +193,61 @@ class OptModel(Model):
                     self.AddConstr(self.var[op][w][s] <= self.v[op][s])
                     self.AddConstr(self.x[op][w] + self.y[w][s] + self.v[op][s] - 2 <= self.var[op][w][s])
 
+    def opsOf(self, ops: List[Tuple[str, str]] = None) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        按x、z的工序顺序筛选工序
+        :param ops: 工序子集，默认全部
+        :return: 有x变量的工序，有z变量的工序
+        """
+        if ops is None:
+            return list(self.x), list(self.z)
+        ops = set(ops)
+        return [op for op in self.x if op in ops], [op for op in self.z if op in ops]
+
+    def addBalanceConstr(self):
+        """
+        每个工人做的工件满足上下层级平衡约束（full形式）
+        :return:
+        """
+        for w in self.data_loader.listWorkers:
+            lhs = self.Sum([self.x[op][w] for op in self.x for _w in self.x[op] if _w == w])
+            rhs = self.Sum([self.var[op][w][s] for op in self.var for _w in self.var[op]
+                            if _w == w for s in self.var[op][w]])
+            self.AddConstr(lhs == rhs)
+
+    def addCompactVarConstr(self, ops: List[Tuple[str, str]] = None):
+        """
+        紧凑形式：不引入var变量，工序分配给工人w且落在工位s时，工人w必须在工位s
+        x[op][w] + v[op][s] - 1 <= y[w][s]，与full形式的可行域在x、y、z、w上相同
+        :param ops: 只构建这些工序的约束，默认全部
+        :return:
+        """
+        ops_x, ops_z = self.opsOf(ops)
+        for op in ops_z:
+            for s in self.z[op]:
+                if s in self.w and op[0] in self.w[s]:
+                    x1 = self.w[s][op[0]]
+                    x2 = self.z[op][s]
+                    name = "constr_eq_{0}_{1}".format(tpl_to_str(op), s)
+                    y = self.BoolVar(name=name)
+                    self.AddConstr(y <= x1)
+                    self.AddConstr(y <= x2)
+                    self.AddConstr(x1 + x2 - 1 <= y)
+                    self.v.setdefault(op, {})
+                    self.v[op][s] = y
+        for op in ops_x:
+            # 工序所在工位必须有其设备（full形式中由var <= v保证）
+            self.AddConstr(self.Sum([y for y in self.v.get(op, {}).values()]) == 1)
+            sts = self.v.get(op, {})
+            for w in self.x[op]:
+                for s in sts:
+                    if s in self.y[w]:
+                        self.AddConstr(self.x[op][w] + sts[s] - 1 <= self.y[w][s])
+                    else:
+                        # 工人去不了该工位
+                        self.AddConstr(self.x[op][w] + sts[s] <= 1)
+
+    @build_stats()
     def addFixedConstr(self):
         """
         固定（设备，工序，工人，工位）约束
@@ -176,56 +258,119 @@ class OptModel(Model):
             self.AddConstr(self.x[op][w] == 1)
             self.AddConstr(self.y[w][s] == 1)
             self.AddConstr(self.v[op][s] == 1)
-            self.AddConstr(self.var[op][w][s] == 1)
+            if self.formulation == "full":
+                self.AddConstr(self.var[op][w][s] == 1)
+
+    def iterParts(self, parts: List[str] = None) -> Iterator[str]:
+        """
+        按装配层级遍历工件
+        :param parts: 只遍历这些工件，默认全部
+        :return:
+        """
+        parts = None if parts is None else set(parts)
+        for layer in self.graph:
+            for part in layer:
+                if parts is None or part in parts:
+                    yield part
 
-    def addCircleConstr(self):
+    @build_stats()
+    def addCircleConstr(self, parts: List[str] = None):
         """
         工件圈数约束
+        :param parts: 只构建这些工件的约束（分片构建），默认全部
         :return:
         """
-        for parts in self.graph:
-            for part in parts:
-                list_gap = []
-                list_ops = self.data_loader.partToOps[part]
-                # 每个工件分配的工位数字
-                listStNum = [[self.z[op][s] * self.data_loader.stToIdx[s] for s in self.z[op]] for op in list_ops]
-                for i in range(len(listStNum) - 1):
-                    preStNum = self.Sum(listStNum[i])
-                    nextStNum = self.Sum(listStNum[i+1])
-                    """
-                    1.原始变量x，代表工序i+1到工序i对应工位的数字之差（若该数字之差小于0，即代表对应的工件存在绕圈）
-                    2.x的取值范围是[-(StCnt-1), StCnt-1]，且是整数
-                    3.若x属于[-(StCnt-1),-1]，则新变量z取1，代表绕了一圈；否则取0
-                    """
-                    x = nextStNum - preStNum
-                    # 引入0-1辅助变量x1,x2
-                    name1 = "circle_{0}_{1}_{2}_{3}_1".format(part, str(i),
-                                                              tpl_to_str(list_ops[i]), tpl_to_str(list_ops[i+1]))
-                    name2 = "circle_{0}_{1}_{2}_{3}_2".format(part, str(i),
-                                                              tpl_to_str(list_ops[i]), tpl_to_str(list_ops[i+1]))
-                    x1 = self.BoolVar(name1)
-                    x2 = self.BoolVar(name2)
-                    self.AddConstr(x1 + x2 == 1)
-                    # 新的目标变量
-                    z = 1 * x1 + 0 * x2
-                    # 原始变量与辅助变量之间的约束关系
-                    self.AddConstr(-1 * (self.StCnt-1) * x1 <= x)
-                    self.AddConstr(x <= -1 * x1 + (self.StCnt-1) * x2)
-                    # 添加新变量
-                    list_gap.append(z)
-                # 当前工件的绕圈数
-                expr = self.Sum(list_gap)
-                MaxCycleCnt = np.maximum(1, self.data_loader.conf["max_cycle_cnt"] - 1)
-                self.AddConstr(expr <= MaxCycleCnt)
-
-    def addRevisitedStConstr(self):
+        if self.circle_form == "position":
+            return self.addPositionCircleConstr(parts)
+        for part in self.iterParts(parts):
+            list_gap = []
+            list_ops = self.data_loader.partToOps[part]
+            # 每个工件分配的工位数字
+            listStNum = [[self.z[op][s] * self.data_loader.stToIdx[s] for s in self.z[op]] for op in list_ops]
+            for i in range(len(listStNum) - 1):
+                preStNum = self.Sum(listStNum[i])
+                nextStNum = self.Sum(listStNum[i+1])
+                """
+                1.原始变量x，代表工序i+1到工序i对应工位的数字之差（若该数字之差小于0，即代表对应的工件存在绕圈）
+                2.x的取值范围是[-(StCnt-1), StCnt-1]，且是整数
+                3.若x属于[-(StCnt-1),-1]，则新变量z取1，代表绕了一圈；否则取0
+                """
+                x = nextStNum - preStNum
+                # 引入0-1辅助变量x1,x2
+                name1 = "circle_{0}_{1}_{2}_{3}_1".format(part, str(i),
+                                                          tpl_to_str(list_ops[i]), tpl_to_str(list_ops[i+1]))
+                name2 = "circle_{0}_{1}_{2}_{3}_2".format(part, str(i),
+                                                          tpl_to_str(list_ops[i]), tpl_to_str(list_ops[i+1]))
+                x1 = self.BoolVar(name1)
+                x2 = self.BoolVar(name2)
+                self.AddConstr(x1 + x2 == 1)
+                # 新的目标变量
+                z = 1 * x1 + 0 * x2
+                # 原始变量与辅助变量之间的约束关系
+                self.AddConstr(-1 * (self.StCnt-1) * x1 <= x)
+                self.AddConstr(x <= -1 * x1 + (self.StCnt-1) * x2)
+                # 添加新变量
+                list_gap.append(z)
+            # 当前工件的绕圈数
+            expr = self.Sum(list_gap)
+            MaxCycleCnt = np.maximum(1, self.data_loader.conf["max_cycle_cnt"] - 1)
+            self.AddConstr(expr <= MaxCycleCnt)
+
+    def addPositionCircleConstr(self, parts: List[str] = None):
+        """
+        工件圈数约束（位置形式）
+        1.每道工序的工位序号用整数变量p表示，取值范围为其可分配工位序号的最小、最大值，p = sum(z * 序号)
+        2.相邻工序（前i，后j）绕圈的大M取 max(p_i) - min(p_j)：不可能绕圈的工序对不建变量，必然绕圈的记为常数1
+        3.绕圈标记只出现在圈数上限约束中，只需 p_j - p_i >= -M * b（b=0时不允许后退），不需要反向约束
+        :param parts: 只构建这些工件的约束（分片构建），默认全部
+        :return:
+        """
+        stToIdx = self.data_loader.stToIdx
+        pos, bounds = {}, {}
+        for part in self.iterParts(parts):
+            for op in self.data_loader.partToOps[part]:
+                if op in pos:
+                    continue
+                list_idx = [stToIdx[s] for s in self.z[op]]
+                lb, ub = min(list_idx), max(list_idx)
+                bounds[op] = (lb, ub)
+                if lb == ub:
+                    pos[op] = lb
+                    continue
+                pos[op] = self.IntVar(lb, ub, name="pos_{0}".format(tpl_to_str(op)))
+                expr = self.Sum([self.z[op][s] * stToIdx[s] for s in self.z[op]])
+                self.AddConstr(pos[op] == expr)
+        MaxCycleCnt = np.maximum(1, self.data_loader.conf["max_cycle_cnt"] - 1)
+        for part in self.iterParts(parts):
+            list_gap, n_fixed = [], 0
+            list_ops = self.data_loader.partToOps[part]
+            for i in range(len(list_ops) - 1):
+                pre, nxt = list_ops[i], list_ops[i+1]
+                M = bounds[pre][1] - bounds[nxt][0]
+                if M <= 0:
+                    # 后一道工序的工位序号不小于前一道：不会绕圈
+                    continue
+                if bounds[nxt][1] < bounds[pre][0]:
+                    # 后一道工序的工位序号都小于前一道：必然绕圈
+                    n_fixed += 1
+                    continue
+                name = "circle_{0}_{1}_{2}_{3}".format(part, str(i), tpl_to_str(pre), tpl_to_str(nxt))
+                b = self.BoolVar(name)
+                self.AddConstr(pos[nxt] - pos[pre] >= -M * b)
+                list_gap.append(b)
+            if list_gap or n_fixed > MaxCycleCnt:
+                self.AddConstr(self.Sum(list_gap) <= MaxCycleCnt - n_fixed)
+
+    @build_stats()
+    def addRevisitedStConstr(self, stations: List[str] = None):
         """
         重复入站约束
         1.固定设备所在工位的重复入站数无限制，其他设备所在站位重复入站数上限不超过2次
         2.所有工位的重复入站的总数量小于max_revisited_station_count
+        :param stations: 只构建这些工位的约束（分片构建），默认全部
         :return:
         """
-        for s in self.data_loader.listStations:
+        for s in self.data_loader.listStations if stations is None else stations:
             if s in self.data_loader.listFixSt:
                 continue
             list_cnt = []
@@ -273,6 +418,7 @@ class OptModel(Model):
             expr = self.Sum(list_cnt)
             self.AddConstr(expr <= 2)
 
+    @build_stats()
     def addObj1(self):
         """
         最小化最大节拍
@@ -280,16 +426,19 @@ class OptModel(Model):
         """
         # 设立变量：最大节拍
         self.max_tt = self.NumVar(0, self.M, name="max_tt")
+        wkTimeMap = self.data_loader.wkTimeMap
+        self.timeMap = {(op, w): wkTimeMap[(op[1], w)] for op in self.x for w in self.x[op]}
         for w in self.data_loader.listWorkers:
             # 每个员工的节拍
-            list_t = [self.x[op][_w] * self.data_loader.wkTimeMap[(op[1], _w)] for op in self.x for _w in self.x[op]
+            list_t = [self.x[op][_w] * self.timeMap[(op, _w)] for op in self.x for _w in self.x[op]
                       if _w == w]
             t = self.Sum(list_t)
             # 添加约束
-            self.AddConstr(t <= self.max_tt)
+            self.AddConstr(t <= self.max_tt, name="tt_{0}".format(w))
             # 记录每个员工的节拍
             self.tt[w] = t
 
+    @build_stats()
     def addObj2(self):
         """
         最小化节拍波动率
@@ -300,40 +449,398 @@ class OptModel(Model):
         for w, t in self.tt.items():
             # 每个员工对应的大M
             OpCnt = len(self.data_loader.wkToAvailOps[w])
-            M = self.MaxT * OpCnt
+            # |t - avg| <= max(t, avg)：t不超过该工人可做工序数 * MaxT，avg不超过全部工序数 * MaxT / 人数
+            M = max(self.MaxT * OpCnt, self.M / self.WkCnt)
             # 原始变量
             x = t - avg_t
             # 引入新变量，等同于 abs(x)
             new_x = self.NumVar(0, M, name="obj_{0}".format(w))
+            self.volUb[w] = M
             # 构建新变量和原始变量的约束关系
-            self.AddConstr(x <= new_x)
-            self.AddConstr(-1 * x <= new_x)
-            self.AddConstr(new_x <= self.data_loader.conf["vol_rate"] * avg_t)
+            self.AddConstr(x <= new_x, name="vol_pos_{0}".format(w))
+            self.AddConstr(-1 * x <= new_x, name="vol_neg_{0}".format(w))
+            self.AddConstr(new_x <= self.data_loader.conf["vol_rate"] * avg_t, name="vol_rate_{0}".format(w))
             # 累加每个员工的节拍波动
             self.obj.append(new_x)
 
-    def minObj(self):
-        obj = self.W1 * self.max_tt + self.W2 * self.Sum(self.obj)
+    def minObj(self, mode: str = "weighted", lex_tol: float = LEX_TOL):
+        """
+        设置目标
+        1.weighted：最小化 upph_w * max_tt + vol_w * sum(|t_w - avg|)
+        2.lexico：第一阶段只最小化max_tt，第二阶段固定max_tt（允许lex_tol的相对松弛）后最小化波动率
+        :param mode: 目标模式
+        :param lex_tol: 字典序模式第二阶段max_tt的相对松弛量
+        :return:
+        """
+        if mode not in ["weighted", "lexico"]:
+            raise ValueError("unknown objective mode: {0}".format(mode))
+        self.mode = mode
+        self.lex_tol = lex_tol
+        # 恢复字典序第二阶段收紧的最大节拍上界
+        self.max_tt.SetUb(self.TaktUb)
+        if mode == "weighted":
+            obj = self.W1 * self.max_tt + self.W2 * self.Sum(self.obj)
+        else:
+            obj = self.max_tt
         self.solver.Minimize(obj)
 
-    def get_solution(self):
-        data = [[p, w, s] for p in self.var for w in self.var[p] for s in self.var[p][w]
-                if self.var[p][w][s].solution_value() > 0]
-        df = pl.DataFrame(data=data, schema=["op", "worker_code", "station_code"], orient="row")
-        df = df \
-            .with_columns([
-                pl.col("op").apply(lambda x: x[1], return_dtype=pl.Utf8).alias("operation")
-            ]) \
-            .with_columns([
-                pl.col("operation").map_dict(self.opToIdx, return_dtype=pl.Int64).alias("operation_number"),
-                pl.col("operation").map_dict(self.data_loader.opToPart, return_dtype=pl.Utf8).alias("part_code")
-            ])
-        df_st = self.data_loader.dataset.df_station \
-            .rename({"st_code": "station_code"}) \
-            .select(["station_code", "line_id"])
-        df = df \
-            .join(df_st, on=["station_code"], how="left") \
-            .sort(by=["operation_number", "line_id"]) \
-            .select(["line_id", "station_code", "worker_code", "operation", "operation_number", "part_code"])
-        df.to_pandas().to_csv("df.csv", index=False)
+    @property
+    def TaktUb(self) -> float:
+        """
+        最大节拍的上界（what-if修改做工时间后随最长做工时间放大）
+        :return:
+        """
+        return self.M * time_scale(self, self.whatIfState)
+
+    @property
+    def DecisionVars(self) -> List[pywraplp.Variable]:
+        """
+        决策变量x、z、y、w（其余变量由它们确定）
+        :return:
+        """
+        list_var = [v for op in self.x for v in self.x[op].values()]
+        list_var += [v for op in self.z for v in self.z[op].values()]
+        list_var += [v for w in self.y for v in self.y[w].values()]
+        list_var += [v for s in self.w for v in self.w[s].values()]
+        return list_var
+
+    @property
+    def DecisionIncumbent(self) -> Dict[str, float]:
+        """
+        当前解中决策变量的取值（变量名 -> 取值），用于跨进程热启动
+        :return:
+        """
+        vals = self.SolutionValues
+        return {var.name(): vals[var.index()] for var in self.DecisionVars}
+
+    @property
+    def WeightedObjValue(self) -> float:
+        """
+        加权目标值（与目标模式无关，用于不同模式之间比较）
+        :return:
+        """
+        vol = sum([x.solution_value() for x in self.obj])
+        return self.W1 * self.max_tt.solution_value() + self.W2 * vol
+
+    def solveModel(self, time_limit: int = None):
+        """
+        求解模型；字典序模式下分两阶段求解，第二阶段以第一阶段的解热启动
+        :param time_limit: 求解时间上限（毫秒），字典序模式下为两阶段合计
+        :return: 求解状态
+        """
+        if self.mode == "weighted":
+            return super().solveModel(time_limit)
+        # 第一阶段：最小化最大节拍（上一次求解可能停在第二阶段的目标与上界，先恢复）
+        self.minObj(self.mode, self.lex_tol)
+        s_t = time.time()
+        status = super().solveModel(time_limit)
+        if not self.HasSolution:
+            return status
+        stage1_time = (time.time() - s_t) * 1000
+        if time_limit is not None and time_limit - stage1_time <= 0:
+            # 第一阶段已用完时间上限
+            return status
+        hint = self.Incumbent
+        stage1_status = status
+        stage1 = linear_solver_pb2.MPSolutionResponse()
+        self.solver.FillSolutionResponseProto(stage1)
+        # 第二阶段：固定最大节拍，最小化波动率，使用剩余时间
+        ub = self.max_tt.solution_value() * (1 + self.lex_tol) + EPSILON
+        self.max_tt.SetUb(ub)
+        self.solver.Minimize(self.Sum(self.obj))
+        self.SetHint(hint)
+        status = super().solveModel(None if time_limit is None else time_limit - stage1_time)
+        if not self.HasSolution:
+            # 第二阶段未找到解时，恢复第一阶段的目标并载入其解（不再重新求解）
+            self.minObj(self.mode, self.lex_tol)
+            self.solver.LoadSolutionFromProto(stage1)
+            status = self.status = stage1_status
+            self.incumbent = hint
+        return status
+
+    @property
+    def opTime(self) -> Dict[str, float]:
+        """
+        工序标准工时
+        :return:
+        """
+        df = self.data_loader.dataset.df_process.select(["op_code", "op_time"])
+        return dict(zip(df["op_code"].to_list(), df["op_time"].to_list()))
+
+    def applyScenario(self, scenario: Scenario):
+        """
+        在已构建的模型上原地执行what-if变更（只修改变量上下界与约束系数，不重建模型）
+        :param scenario: 场景
+        :return:
+        """
+        edits, state = scenario_edits(self, scenario, self.whatIfState)
+        apply_edits(self.solver, edits)
+        self.whatIfState = state
+
+    def removeWorker(self, w: str):
+        """
+        工人缺勤
+        :param w: 工人
+        :return:
+        """
+        self.applyScenario(Scenario().removeWorker(w))
+
+    def addWorker(self, w: str):
+        """
+        工人恢复出勤（仅限模型中已有的工人）
+        :param w: 工人
+        :return:
+        """
+        self.applyScenario(Scenario().addWorker(w))
+
+    def blockStation(self, s: str):
+        """
+        工位不可用
+        :param s: 工位
+        :return:
+        """
+        self.applyScenario(Scenario().blockStation(s))
+
+    def unblockStation(self, s: str):
+        self.applyScenario(Scenario().unblockStation(s))
+
+    def changeEfficiency(self, w: str, op: str, e: float):
+        """
+        修改工人做某道工序的效率
+        :param w: 工人
+        :param op: 工序编码
+        :param e: 新效率
+        :return:
+        """
+        self.applyScenario(Scenario().changeEfficiency(w, op, e))
+
+    def addFixedAssignment(self, op: str, w: str, s: str):
+        """
+        新增固定分配（工序，工人，工位）
+        :param op: 工序编码
+        :param w: 工人
+        :param s: 工位
+        :return:
+        """
+        self.applyScenario(Scenario().addFixedAssignment(op, w, s))
+
+    def reSolve(self, time_limit: int = None):
+        """
+        以上一次的解热启动，重新求解
+        :param time_limit: 求解时间上限（毫秒）
+        :return: 求解状态
+        """
+        if self.incumbent:
+            self.SetHint(self.incumbent)
+        return self.solveModel(time_limit)
+
+    def hintFromDispatch(self, dispatch_results: List[Dict[str, object]]) -> int:
+        """
+        以（相近算例的）dispatch_results作为部分热启动解，只设置模型中存在的x、y、z、var变量
+        :param dispatch_results: 工位 -> 工人 -> 工序列表
+        :return: 设置的变量数
+        """
+        codeToOp = {op[1]: op for op in self.x}
+        hint = {}
+        for item in dispatch_results:
+            s, w = item["station_code"], item["worker_code"]
+            if s in self.y.get(w, {}):
+                hint[self.y[w][s]] = 1
+            for d in item["operation_list"]:
+                op = codeToOp.get(d["operation"])
+                if op is None:
+                    continue
+                for var in (self.x[op].get(w), self.z.get(op, {}).get(s), self.var.get(op, {}).get(w, {}).get(s)):
+                    if var is not None:
+                        hint[var] = 1
+        self.solver.SetHint(list(hint.keys()), list(hint.values()))
+        return len(hint)
+
+    def solveWithCheckpoint(self, path: str, time_limit: int = None, interval: int = 60000, resume: bool = True):
+        """
+        周期性保存检查点的求解，进程重启后可从检查点热启动继续
+        :param path: 检查点路径
+        :param time_limit: 总求解时间上限（毫秒）
+        :param interval: 检查点间隔（毫秒）
+        :param resume: 是否从已有检查点恢复
+        :return: 求解状态
+        """
+        return solve_with_checkpoint(self, path, time_limit, interval, resume)
+
+    def relaxAndRound(self, rounds: int = 3, seed: int = 0, lp_time_limit: int = 1000,
+                      repair_time_limit: int = 1000, round_time_limit: int = None) -> Dict[str, object]:
+        """
+        LP松弛给出加权目标的严格下界，随机取整、构造工位分配并修复得到可行解与gap，用于判断是否值得完整求解
+        LP没有在时限内求出时仍按等概率取整构造可行解，只是没有下界
+        :param rounds: 取整次数
+        :param seed: 随机种子
+        :param lp_time_limit: LP时间上限（毫秒）
+        :param repair_time_limit: 每次修复的时间上限（毫秒）
+        :param round_time_limit: 取整与修复的总时间上限（毫秒），None表示不限制
+        :return: 下界、可行解目标值与gap
+        """
+        return relax_and_round(self, rounds, seed, lp_time_limit, repair_time_limit,
+                               round_time_limit=round_time_limit)
+
+    def solveLNS(self, time_limit: int = 60000, sub_time_limit: int = 5000, seed: int = 0,
+                 init_time_limit: int = None) -> Dict[str, object]:
+        """
+        大邻域搜索：从可行解出发，反复释放一个邻域并限时求解子MIP
+        :param time_limit: 总时间上限（毫秒）
+        :param sub_time_limit: 每个子问题的时间上限（毫秒）
+        :param seed: 随机种子
+        :param init_time_limit: 没有可行解时寻找初始解的时间上限（毫秒）
+        :return: 最好目标值与迭代历史
+        """
+        return run_lns(self, time_limit, sub_time_limit, seed, init_time_limit)
+
+    def solveBenders(self, time_limit: int = 60000, sub_time_limit: int = 10000) -> Dict[str, object]:
+        """
+        基于逻辑的Benders分解：主问题放置设备与工人（w、y），子问题固定放置后分配工序并回传割
+        :param time_limit: 总时间上限（毫秒）
+        :param sub_time_limit: 每个子问题的时间上限（毫秒）
+        :return: 上界、下界（不超过上界）、gap、迭代次数与是否证明最优
+        """
+        return run_benders(self, time_limit, sub_time_limit)
+
+    def modelStats(self) -> Dict[str, Dict[str, object]]:
+        """
+        各约束族的变量数、约束数、非零元数、系数范围与构建耗时，以及求解器统计
+        :return:
+        """
+        return model_stats(self)
+
+    def printModelStats(self):
+        print_stats(self.modelStats())
+
+    def buildModel(self, low_memory: bool = False, memory_budget: float = None, circle: str = None,
+                   processes: int = None):
+        """
+        按默认顺序构建变量、约束与目标（加权模式）
+        :param low_memory: 低内存模式：使用compact形式（不建var变量），每族之后gc并记录该族的峰值内存；
+            节省的内存几乎全部来自compact形式（big算例构建峰值284MB -> 219MB），每族之后的gc只降低约1%，
+            变量字典与tt等中间结构在构建后仍保留（求解与结果读取需要）
+        :param memory_budget: 内存预算（MB），隐含低内存模式；预估full形式不超出预算时仍用full形式，
+            两种形式都超出时提前抛出MemoryError，构建中超出预算时也抛出MemoryError（没有分解形式的兜底）
+        :param circle: 圈数约束形式（index / position），默认保持self.circle_form
+        :param processes: 大于1时多进程分片构建约束（见sharded.build_sharded），不与低内存模式同时使用；
+            进程数不超过CPU核数，单核时退回串行构建
+        :return:
+        """
+        if circle is not None:
+            self.circle_form = circle
+        if memory_budget is not None:
+            self.formulation = choose_formulation(self.data_loader, memory_budget)
+        elif low_memory:
+            self.formulation = "compact"
+        low_memory = low_memory or memory_budget is not None
+        self.track_peak_rss = low_memory
+        processes = usable_processes(processes)
+        if processes > 1:
+            build_sharded(self, processes)
+            self.minObj()
+            return
+        families = [
+            # 构建变量
+            self.allocStToMach, self.allocOpToWks, self.allocWkToSts, self.allocOpToSts, self.create_var,
+            # 添加约束
+            self.addVarConstr, self.addFixedConstr, self.addCircleConstr, self.addRevisitedStConstr,
+            # 设置目标
+            self.addObj1, self.addObj2
+        ]
+        for family in families:
+            family()
+            if low_memory:
+                gc.collect()
+                check_budget(family.__name__, memory_budget)
+        self.minObj()
+
+    def solutionSupport(self, vals: np.ndarray = None) -> List[Tuple[Tuple[str, str], str, str]]:
+        """
+        最终的（工序，工人，工位）分配
+        一次性读取所有变量取值，只在取1的x、y变量范围内检查var变量
+        :param vals: 按变量index排列的取值（如场景子进程的解），默认为求解器当前的解
+        :return: 求解器没有解时为空
+        """
+        if vals is None:
+            if not self.HasSolution:
+                return []
+            vals = self.SolutionValues
+        if self.formulation == "compact":
+            return self.compactSupport(vals)
+        listX = [(op, w) for op in self.x for w in self.x[op]]
+        idxX = np.fromiter((self.x[op][w].index() for op, w in listX), dtype=np.int64, count=len(listX))
+        listY = [(w, s) for w in self.y for s in self.y[w]]
+        idxY = np.fromiter((self.y[w][s].index() for w, s in listY), dtype=np.int64, count=len(listY))
+        wkToSts = {}
+        for i in np.flatnonzero(vals[idxY] > 0.5):
+            w, s = listY[i]
+            wkToSts.setdefault(w, []).append(s)
+        data = []
+        for i in np.flatnonzero(vals[idxX] > 0.5):
+            op, w = listX[i]
+            for s in wkToSts.get(w, []):
+                var = self.var[op][w].get(s)
+                if var is not None and vals[var.index()] > 0.5:
+                    data.append((op, w, s))
+        return data
+
+    def compactSupport(self, vals: np.ndarray) -> List[Tuple[Tuple[str, str], str, str]]:
+        """
+        compact形式下由x与v（工序所在工位）得到分配
+        :param vals: 变量取值
+        :return:
+        """
+        data = []
+        for op in self.x:
+            list_s = [s for s, y in self.v.get(op, {}).items() if vals[y.index()] > 0.5]
+            list_w = [w for w, x in self.x[op].items() if vals[x.index()] > 0.5]
+            if list_s and list_w:
+                data.append((op, list_w[0], list_s[0]))
+        return data
+
+    def get_solution(self, path: str = None) -> pl.DataFrame:
+        """
+        求解结果
+        :param path: csv输出路径，None表示不输出
+        :return: 没有解时为空表
+        """
+        opToIdx = self.opToIdx
+        opToPart = self.data_loader.opToPart
+        stToLine = self.data_loader.stToLine
+        data = [[stToLine[s], s, w, op[1], opToIdx[op[1]], opToPart[op[1]]] for op, w, s in self.solutionSupport()]
+        schema = [("line_id", pl.Int64), ("station_code", pl.Utf8), ("worker_code", pl.Utf8),
+                  ("operation", pl.Utf8), ("operation_number", pl.Int64), ("part_code", pl.Utf8)]
+        df = pl.DataFrame(data=data, schema=schema, orient="row") \
+            .sort(by=["operation_number", "line_id"])
+        if path is not None:
+            df.write_csv(path)
         return df
+
+    def get_dispatch_results(self) -> Dict[str, List[Dict[str, object]]]:
+        """
+        输出示例中的dispatch_results格式：工位 -> 工人 -> 按加工顺序排列的工序列表
+        :return: 没有解时dispatch_results为空列表
+        """
+        opToIdx = self.opToIdx
+        opToNum = self.data_loader.opToNum
+        dispatch = {}
+        for op, w, s in self.solutionSupport():
+            dispatch.setdefault((s, w), []).append(op[1])
+        results = []
+        for s, w in sorted(dispatch, key=lambda k: self.data_loader.stToIdx[k[0]]):
+            list_ops = sorted(dispatch[(s, w)], key=lambda op: opToIdx[op])
+            results.append({
+                "station_code": s,
+                "worker_code": w,
+                "operation_list": [{"operation": op, "operation_number": opToNum[op]} for op in list_ops]
+            })
+        return {"dispatch_results": results}
+
+    def write_dispatch_results(self, path: str):
+        """
+        输出dispatch_results到指定路径
+        :param path: 输出路径
+        :return:
+        """
+        dump_data(self.get_dispatch_results(), path)
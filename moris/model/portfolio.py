@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import time
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional
+
+from .model import Model, SolverStatus, pywraplp, linear_solver_pb2, reset_solver
+
+
+EPSILON = 1e-6
+# 时间片用时低于时间上限的此比例且没有解时，视为求解器立即返回
+IMMEDIATE_RATIO = 0.05
+# 到达时间上限后等待子进程响应中断的时间（秒），超过则强制结束
+GRACE = 1.0
+
+
+class PortfolioConfig:
+    """
+    组合求解中单个求解配置
+    """
+    __slots__ = ["name", "backend", "mode", "seed", "presolve", "symmetry"]
+
+    def __init__(self, name: str, backend: str = "SCIP", mode: str = "weighted", seed: int = 0,
+                 presolve: bool = True, symmetry: bool = True):
+        self.name = name
+        self.backend = backend
+        self.mode = mode
+        self.seed = seed
+        self.presolve = presolve
+        self.symmetry = symmetry
+
+    def __repr__(self):
+        return "PortfolioConfig({0}: {1}, {2}, seed={3}, presolve={4}, symmetry={5})".format(
+            self.name, self.backend, self.mode, self.seed, self.presolve, self.symmetry)
+
+    @property
+    def SolverSpecificParams(self) -> str:
+        if self.backend == "SCIP":
+            params = ["randomization/randomseedshift = {0}".format(self.seed)]
+            if not self.symmetry:
+                params.append("propagating/symmetry/freq = -1")
+            return "\n".join(params)
+        params = ["random_seed:{0}".format(self.seed)]
+        if not self.symmetry:
+            params.append("symmetry_level:0")
+        return ",".join(params)
+
+    @property
+    def Exact(self) -> bool:
+        """
+        CP-SAT会把连续变量（max_tt、波动率）缩放取整，其最优性与下界只对取整后的模型成立
+        :return:
+        """
+        return self.backend == "SCIP"
+
+    @property
+    def SolverParams(self) -> pywraplp.MPSolverParameters:
+        params = pywraplp.MPSolverParameters()
+        presolve = params.PRESOLVE_ON if self.presolve else params.PRESOLVE_OFF
+        params.SetIntegerParam(params.PRESOLVE, presolve)
+        return params
+
+
+DefaultPortfolio = [
+    PortfolioConfig("scip", "SCIP"),
+    PortfolioConfig("scip-lexico", "SCIP", mode="lexico"),
+    PortfolioConfig("scip-seed1-nosym", "SCIP", seed=1, symmetry=False),
+    PortfolioConfig("cpsat", "CP_SAT"),
+    PortfolioConfig("cpsat-seed1-nopresolve", "CP_SAT", seed=1, presolve=False),
+    PortfolioConfig("cpsat-lexico", "CP_SAT", mode="lexico"),
+]
+
+
+def weighted_obj(solver: pywraplp.Solver, W1: float, W2: float) -> float:
+    """
+    由变量取值计算加权目标值（与各配置的目标模式无关）
+    :return:
+    """
+    vol = sum([var.solution_value() for var in solver.variables() if var.name().startswith("obj_")])
+    return W1 * solver.LookupVariable("max_tt").solution_value() + W2 * vol
+
+
+class PortfolioRunner:
+    """
+    子进程内的单个求解配置：分时间片求解，时间片之间与其他配置交换当前最好解
+    """
+    def __init__(self, config: PortfolioConfig, shm_name: str, size: int, shared, lock, stop,
+                 W1: float, W2: float, deadline: float, target_gap: float, slice_ms: int):
+        self.config = config
+        self.shared = shared
+        self.lock = lock
+        self.stop = stop
+        self.W1 = W1
+        self.W2 = W2
+        self.deadline = deadline
+        self.target_gap = target_gap
+        self.slice_ms = slice_ms
+        self.stage = 1
+        # 本配置最好解的变量取值（按index），每个时间片以其热启动
+        self.values: Optional[List[float]] = None
+        # 直接从共享内存缓冲区解析模型（不复制序列化数据，也不经过管道传输）；每个进程仍各自解析出一份模型
+        shm = shared_memory.SharedMemory(name=shm_name)
+        buf = shm.buf[:size]
+        proto = linear_solver_pb2.MPModelProto()
+        try:
+            proto.ParseFromString(buf)
+        finally:
+            buf.release()
+            shm.close()
+        self.solver = pywraplp.Solver.CreateSolver(config.backend)
+        self.solver.LoadModelFromProtoKeepNames(proto)
+        self.solver.SetSolverSpecificParametersAsString(config.SolverSpecificParams)
+        self.max_tt = self.solver.LookupVariable("max_tt")
+        self.list_vol = [var for var in self.solver.variables() if var.name().startswith("obj_")]
+        if config.mode == "lexico":
+            self.setObjective([self.max_tt])
+
+    def setObjective(self, list_var):
+        objective = self.solver.Objective()
+        objective.Clear()
+        for var in list_var:
+            objective.SetCoefficient(var, 1)
+        objective.SetMinimization()
+
+    def hint(self, own_obj: Optional[float]):
+        """
+        以本配置与其他配置中更好的解作为热启动解
+        :param own_obj: 本配置当前最好加权目标值
+        :return:
+        """
+        values = self.values
+        with self.lock:
+            best_obj = self.shared.get("obj")
+            if best_obj is not None and (own_obj is None or own_obj > best_obj):
+                values = self.shared["values"]
+        if values is None:
+            return
+        list_var = self.solver.variables()
+        self.solver.SetHint(list_var, [values[i] for i in range(len(list_var))])
+
+    def publish(self, obj: float, bound: Optional[float], status: int):
+        response = linear_solver_pb2.MPSolutionResponse()
+        self.solver.FillSolutionResponseProto(response)
+        # 字典序配置的目标值是最大节拍或波动率，统一为由变量取值计算的加权目标，载入后ObjValue才可比较
+        response.objective_value = obj
+        with self.lock:
+            if bound is not None:
+                self.shared["bound"] = max(self.shared.get("bound", -self.solver.infinity()), bound)
+            if self.shared.get("obj") is None or obj < self.shared["obj"] - EPSILON:
+                self.shared["obj"] = obj
+                self.shared["config"] = self.config.name
+                # 字典序配置的最优只针对其自身目标，对加权目标而言只是可行解
+                optimal = self.proves(status)
+                self.shared["status"] = status if optimal else pywraplp.Solver.FEASIBLE
+                self.shared["values"] = [var.solution_value() for var in self.solver.variables()]
+                self.shared["response"] = response.SerializeToString()
+
+    def proves(self, status: int) -> bool:
+        return self.config.Exact and self.config.mode == "weighted" and status == pywraplp.Solver.OPTIMAL
+
+    def watch(self):
+        # 其他配置触发停止时，中断当前求解
+        self.stop.wait()
+        self.solver.InterruptSolve()
+
+    def run(self):
+        threading.Thread(target=self.watch, daemon=True).start()
+        own_obj = None
+        slice_ms = self.slice_ms
+        while not self.stop.is_set():
+            remaining = (self.deadline - time.time()) * 1000
+            if remaining <= 0:
+                break
+            # 释放上一时间片的变换问题，否则SCIP不接受新的热启动解且按累计时间计算时间上限
+            reset_solver(self.solver)
+            self.hint(own_obj)
+            limit = min(slice_ms, remaining)
+            self.solver.SetTimeLimit(int(limit))
+            s_t = time.time()
+            status = self.solver.Solve(self.config.SolverParams)
+            took = (time.time() - s_t) * 1000
+            if status not in [pywraplp.Solver.FEASIBLE, pywraplp.Solver.OPTIMAL]:
+                if status == pywraplp.Solver.INFEASIBLE:
+                    self.stop.set()
+                if status != pywraplp.Solver.NOT_SOLVED or took < IMMEDIATE_RATIO * limit:
+                    # 求解器异常或立即返回：本配置不再继续
+                    break
+                # 时间片内没有找到解：加长下一时间片
+                slice_ms *= 2
+                continue
+            obj = weighted_obj(self.solver, self.W1, self.W2)
+            if own_obj is None or obj < own_obj:
+                own_obj = obj
+                self.values = [var.solution_value() for var in self.solver.variables()]
+            # 只有精确求解器在加权模式下的界才是加权目标的下界
+            exact = self.config.Exact and self.config.mode == "weighted"
+            bound = self.solver.Objective().BestBound() if exact else None
+            self.publish(obj, bound, status)
+            if self.proves(status):
+                self.stop.set()
+                break
+            if self.config.mode == "weighted" and status == pywraplp.Solver.OPTIMAL:
+                # 非精确求解器已无法继续改进
+                break
+            if self.config.mode == "lexico" and status == pywraplp.Solver.OPTIMAL:
+                if self.stage == 2:
+                    break
+                # 字典序第二阶段：固定最大节拍，最小化波动率
+                self.stage = 2
+                self.max_tt.SetUb(self.max_tt.solution_value() * (1 + 1e-4) + EPSILON)
+                self.setObjective(self.list_vol)
+                list_var = self.solver.variables()
+                self.solver.SetHint(list_var, [var.solution_value() for var in list_var])
+            with self.lock:
+                best_obj, best_bound = self.shared.get("obj"), self.shared.get("bound")
+            if best_obj is not None and best_bound is not None:
+                gap = (best_obj - best_bound) / max(abs(best_obj), EPSILON)
+                if gap <= self.target_gap:
+                    self.stop.set()
+
+
+def _run_config(config, shm_name, size, shared, lock, stop, W1, W2, deadline, target_gap, slice_ms):
+    runner = PortfolioRunner(config, shm_name, size, shared, lock, stop, W1, W2, deadline, target_gap, slice_ms)
+    runner.run()
+
+
+def run_portfolio(model: Model, configs: List[PortfolioConfig] = None, time_limit: int = 60000,
+                  target_gap: float = 0.0, slice_ms: int = 5000) -> Dict[str, object]:
+    """
+    多进程并行运行多个求解配置，任一配置证明最优、达到目标gap或到达时间上限时全部停止
+    最好解回写到model的求解器中，可直接调用get_solution；回写后求解器的目标值为加权目标（与产生该解的配置无关）
+    :param model: 已构建的模型
+    :param configs: 求解配置，默认DefaultPortfolio
+    :param time_limit: 总时间上限（毫秒）
+    :param target_gap: 目标gap（相对）
+    :param slice_ms: 配置之间交换最好解的时间间隔（毫秒）
+    :return: 最好解的目标值、下界、状态与配置名
+    """
+    configs = DefaultPortfolio if configs is None else configs
+    proto = linear_solver_pb2.MPModelProto()
+    model.solver.ExportModelToProto(proto)
+    data = proto.SerializeToString()
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    # polars与OR-Tools已加载（内部线程池），fork可能死锁
+    ctx = mp.get_context("spawn")
+    manager = ctx.Manager()
+    shared = manager.dict()
+    lock = manager.Lock()
+    stop = manager.Event()
+    deadline = time.time() + time_limit / 1000
+    procs = []
+    try:
+        for config in configs:
+            p = ctx.Process(target=_run_config,
+                            args=(config, shm.name, len(data), shared, lock, stop,
+                                  model.W1, model.W2, deadline, target_gap, slice_ms))
+            p.start()
+            procs.append(p)
+        for p in procs:
+            p.join(timeout=max(deadline - time.time(), 0))
+        # 到达时间上限：中断仍在求解的配置，短暂等待其返回后强制结束
+        stop.set()
+        for p in procs:
+            p.join(timeout=GRACE)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        result = dict(shared)
+    finally:
+        manager.shutdown()
+        shm.close()
+        shm.unlink()
+    res = {"config": result.get("config"), "obj": result.get("obj"), "bound": result.get("bound"), "status": None}
+    if result.get("response") is not None:
+        response = linear_solver_pb2.MPSolutionResponse()
+        response.ParseFromString(result["response"])
+        model.solver.LoadSolutionFromProto(response)
+        model.status = result["status"]
+        model.incumbent = model.Incumbent
+        res["status"] = SolverStatus.get(model.status, str(model.status))
+    print("portfolio best: config={0}, obj={1}, bound={2}".format(res["config"], res["obj"], res["bound"]))
+    return res
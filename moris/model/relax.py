@@ -0,0 +1,622 @@
+from __future__ import annotations
+
+import time
+import random
+from typing import Dict, List, Optional, Tuple, Callable
+
+from .model import SolverStatus, pywraplp, linear_solver_pb2, np
+
+
+INF = 1e20
+
+
+def weighted_proto(model) -> linear_solver_pb2.MPModelProto:
+    """
+    导出模型，目标统一为加权目标（与当前目标模式无关）
+    :param model: 已构建的OptModel
+    :return:
+    """
+    proto = linear_solver_pb2.MPModelProto()
+    model.solver.ExportModelToProto(proto)
+    for var in proto.variable:
+        var.objective_coefficient = 0
+    proto.objective_offset = 0
+    proto.maximize = False
+    proto.variable[model.max_tt.index()].objective_coefficient = model.W1
+    for var in model.obj:
+        proto.variable[var.index()].objective_coefficient = model.W2
+    return proto
+
+
+def proto_arrays(proto: linear_solver_pb2.MPModelProto) -> Dict[str, np.ndarray]:
+    """
+    稀疏约束矩阵（COO）与上下界
+    :param proto: MPModelProto
+    :return:
+    """
+    rows, cols, coefs = [], [], []
+    for i, constr in enumerate(proto.constraint):
+        rows.extend([i] * len(constr.var_index))
+        cols.extend(constr.var_index)
+        coefs.extend(constr.coefficient)
+    return {
+        "rows": np.asarray(rows, dtype=np.int64),
+        "cols": np.asarray(cols, dtype=np.int64),
+        "coefs": np.asarray(coefs, dtype=np.float64),
+        "row_lb": np.asarray([c.lower_bound for c in proto.constraint], dtype=np.float64),
+        "row_ub": np.asarray([c.upper_bound for c in proto.constraint], dtype=np.float64),
+        "lb": np.asarray([v.lower_bound for v in proto.variable], dtype=np.float64),
+        "ub": np.asarray([v.upper_bound for v in proto.variable], dtype=np.float64),
+        "obj": np.asarray([v.objective_coefficient for v in proto.variable], dtype=np.float64),
+    }
+
+
+def lagrangian_bound(arrays: Dict[str, np.ndarray], duals: np.ndarray) -> float:
+    """
+    由任意对偶乘子计算的下界：L(y) = sum(y_i * b_i) + sum_j min_{l_j<=x_j<=u_j} (c_j - A_j^T y) * x_j
+    对任意y都成立，因此近似求解（如PDLP）得到的对偶值也能给出严格的下界
+    y_i > 0 对应约束下界，y_i < 0 对应约束上界；对应的界为无穷时该乘子取0
+    :param arrays: proto_arrays的结果
+    :param duals: 约束的对偶乘子
+    :return:
+    """
+    y = np.asarray(duals, dtype=np.float64).copy()
+    lb, ub = arrays["row_lb"], arrays["row_ub"]
+    y[(y > 0) & (lb <= -INF)] = 0
+    y[(y < 0) & (ub >= INF)] = 0
+    b = np.where(y > 0, lb, np.where(y < 0, ub, 0))
+    rc = arrays["obj"].copy()
+    np.subtract.at(rc, arrays["cols"], arrays["coefs"] * y[arrays["rows"]])
+    # 所有变量都有有限上下界（0-1变量、max_tt与波动变量以大M为上界）
+    x = np.where(rc > 0, arrays["lb"], arrays["ub"])
+    return float(np.dot(y, b) + np.dot(rc, x))
+
+
+def solve_relaxation(proto: linear_solver_pb2.MPModelProto, backend: str = "PDLP",
+                     time_limit: int = None) -> Dict[str, object]:
+    """
+    求解LP松弛
+    :param proto: 加权目标的模型
+    :param backend: LP求解器，默认PDLP（一阶方法，大规模时远快于单纯形法）
+    :param time_limit: 时间上限（毫秒）
+    :return: 状态、LP目标值、严格下界、变量取值
+    """
+    lp_proto = linear_solver_pb2.MPModelProto()
+    lp_proto.CopyFrom(proto)
+    for var in lp_proto.variable:
+        var.is_integer = False
+    solver = pywraplp.Solver.CreateSolver(backend)
+    solver.LoadModelFromProtoKeepNames(lp_proto)
+    if time_limit is not None:
+        solver.SetTimeLimit(int(time_limit))
+    status = solver.Solve()
+    res = {"status": SolverStatus.get(status, str(status)), "lp_obj": None, "bound": None, "values": None}
+    if status == pywraplp.Solver.INFEASIBLE:
+        res["bound"] = np.inf
+        return res
+    if status not in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+        return res
+    response = linear_solver_pb2.MPSolutionResponse()
+    solver.FillSolutionResponseProto(response)
+    res["lp_obj"] = response.objective_value
+    res["values"] = np.asarray(response.variable_value, dtype=np.float64)
+    bounds = [lagrangian_bound(proto_arrays(lp_proto), sign * np.asarray(response.dual_value))
+              for sign in (1, -1)]
+    res["bound"] = max(bounds)
+    return res
+
+
+def worker_load(model, assign: Dict[tuple, str]) -> Dict[str, float]:
+    """
+    各工人的节拍（所分配工序的工时之和）
+    :param model: OptModel
+    :param assign: 工序 -> 工人
+    :return:
+    """
+    load = {w: 0.0 for w in model.data_loader.listWorkers}
+    for op, w in assign.items():
+        load[w] += model.timeMap[(op, w)]
+    return load
+
+
+def balanced(model, load: Dict[str, float]) -> bool:
+    """
+    各工人节拍是否满足波动率约束 |t_w - avg| <= vol_rate * avg；不满足时固定x的修复必然不可行
+    :param model: OptModel
+    :param load: 各工人的节拍
+    :return:
+    """
+    rate = model.data_loader.conf["vol_rate"]
+    avg = sum(load.values()) / max(len(load), 1)
+    return all([abs(t - avg) <= rate * avg + 1e-6 for t in load.values()])
+
+
+def station_needs(model) -> Dict[tuple, List[str]]:
+    """
+    只能在固定设备所在工位上做的工序 -> 这些工位
+    :param model: OptModel
+    :return:
+    """
+    fixSts = set(model.data_loader.listFixSt)
+    return {op: list(sts) for op, sts in model.v.items() if sts and all([s in fixSts for s in sts])}
+
+
+def balance(model, assign: Dict[tuple, str], movable: Callable[[tuple, str], bool] = None, max_iter: int = 200):
+    """
+    工时均衡：工时超出区间的工人把工序移给可做该工序且工时最小的工人；
+    工时低于区间的工人（包括空闲工人）从工时最大的、有其可做工序的工人处接过一道工序
+    :param model: OptModel
+    :param assign: 工序 -> 工人，原地修改
+    :param movable: 工序能否移给某个工人，默认都可以
+    :param max_iter: 最大移动次数
+    :return:
+    """
+    rate = model.data_loader.conf["vol_rate"]
+    movable = (lambda op, w: True) if movable is None else movable
+    load = worker_load(model, assign)
+    for _ in range(max_iter):
+        avg = sum(load.values()) / max(len(load), 1)
+        w_max = max(load, key=load.get)
+        w_min = min(load, key=load.get)
+        over, under = load[w_max] - (1 + rate) * avg, (1 - rate) * avg - load[w_min]
+        if over <= 0 and under <= 0:
+            break
+        best = None
+        if over >= under:
+            # 工时最大工人的工序中，移到目标工人后两者差距缩小最多的一道
+            for op in [op for op, w in assign.items() if w == w_max]:
+                cands = [w for w in model.x[op] if w != w_max and movable(op, w)]
+                if not cands:
+                    continue
+                w_to = min(cands, key=load.get)
+                gap = max(load[w_max] - model.timeMap[(op, w_max)], load[w_to] + model.timeMap[(op, w_to)])
+                if gap < load[w_max] and (best is None or gap < best[0]):
+                    best = (gap, op, w_max, w_to)
+        else:
+            # 工时最小工人可做的工序中，从工时最大的工人处移来
+            # 移动后接收方的工时不超过原工人移出后的工时
+            for op, w_from in assign.items():
+                if w_from == w_min or w_min not in model.x[op] or not movable(op, w_min):
+                    continue
+                if load[w_min] + model.timeMap[(op, w_min)] > load[w_from] - model.timeMap[(op, w_from)]:
+                    continue
+                if best is None or load[w_from] > best[0]:
+                    best = (load[w_from], op, w_from, w_min)
+        if best is None and over > 0:
+            # 工时最大的工人无法再减少（如只剩一道长工序）：把其它工人的工序移给做得更慢的工人，提高平均工时，
+            # 移动后接收方不超过最大工时，移出方不低于最小工时与新的区间下界中的较小者
+            n = max(len(load), 1)
+            for op, w_from in assign.items():
+                if w_from == w_max:
+                    continue
+                t_from = model.timeMap[(op, w_from)]
+                for w_to in model.x[op]:
+                    inc = model.timeMap[(op, w_to)] - t_from
+                    if w_to in [w_from, w_max] or inc <= 0 or not movable(op, w_to):
+                        continue
+                    if load[w_to] + inc + t_from > load[w_max]:
+                        continue
+                    if load[w_from] - t_from < min(load[w_min], (1 - rate) * (avg + inc / n)):
+                        continue
+                    if best is None or inc > best[0]:
+                        best = (inc, op, w_from, w_to)
+        if best is None:
+            break
+        _, op, w_from, w_to = best
+        load[w_from] -= model.timeMap[(op, w_from)]
+        load[w_to] += model.timeMap[(op, w_to)]
+        assign[op] = w_to
+
+
+def rebalance(model, assign: Dict[tuple, str], movable: Callable[[tuple, str], bool],
+              time_limit: int = 1000) -> bool:
+    """
+    工时均衡启发式失败时（如平均工时需要整体提高），求解只含x的小MIP：满足波动率约束、移动的工序最少
+    :param model: OptModel
+    :param assign: 工序 -> 工人，成功时原地修改
+    :param movable: 工序能否移给某个工人
+    :param time_limit: 时间上限（毫秒）
+    :return: 是否找到满足波动率约束的分配
+    """
+    rate = model.data_loader.conf["vol_rate"]
+    listWks = model.data_loader.listWorkers
+    solver = pywraplp.Solver.CreateSolver("SCIP")
+    x = {}
+    for op, w0 in assign.items():
+        x[op] = {w: solver.BoolVar("") for w in model.x[op] if w == w0 or movable(op, w)}
+        solver.Add(solver.Sum(list(x[op].values())) == 1)
+    load = {w: solver.Sum([model.timeMap[(op, w)] * xs[w] for op, xs in x.items() if w in xs]) for w in listWks}
+    avg = solver.Sum(list(load.values())) / max(len(listWks), 1)
+    for w in listWks:
+        solver.Add(load[w] - avg <= rate * avg)
+        solver.Add(avg - load[w] <= rate * avg)
+    solver.Minimize(solver.Sum([1 - x[op][w] for op, w in assign.items()]))
+    solver.SetTimeLimit(int(time_limit))
+    if solver.Solve() not in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+        return False
+    for op, xs in x.items():
+        assign[op] = max(xs, key=lambda w: xs[w].solution_value())
+    return True
+
+
+def round_assignment(model, values: Optional[np.ndarray],
+                     rnd: random.Random) -> Optional[Tuple[Dict[tuple, str], Dict[str, str]]]:
+    """
+    随机取整：每道工序按x的LP取值为概率选择一个工人（没有LP解时等概率），再做工时均衡
+    固定设备工位只能有一个工人：只能在同一个固定设备工位上做的工序由同一个工人做，先在这些工序共同的工人中选择，
+    选中的工人占用该工位；之后这些工序只在占用了所需工位的工人之间移动，固定分配的工序不移动
+    :param model: OptModel
+    :param values: LP松弛的变量取值，None表示没有LP解
+    :param rnd: 随机数
+    :return: (工序 -> 工人, 工位 -> 占用的工人)；固定设备工位没有可占用的工人、或均衡后仍不满足波动率约束时为None
+    """
+    fixed_alloc = model.data_loader.fixed_alloc
+    pinned = {(m, op): w for m, op, w, _ in fixed_alloc}
+    owner = {s: w for _, _, w, s in fixed_alloc}
+    needs = station_needs(model)
+
+    def weight(op, w):
+        return (1.0 if values is None else max(values[model.x[op][w].index()], 0)) + 1e-6
+
+    assign = dict(pinned)
+    stToOps = {}
+    for op, sts in needs.items():
+        if len(sts) == 1:
+            stToOps.setdefault(sts[0], []).append(op)
+    for s, ops in stToOps.items():
+        list_w = [w for w in model.x[ops[0]] if s in model.y.get(w, {}) and all([w in model.x[op] for op in ops])]
+        if s in owner:
+            list_w = [w for w in list_w if w == owner[s]]
+        if not list_w:
+            return None
+        owner[s] = rnd.choices(list_w, weights=[sum([weight(op, w) for op in ops]) for w in list_w])[0]
+        for op in ops:
+            assign.setdefault(op, owner[s])
+    for op, wks in model.x.items():
+        if op in assign:
+            continue
+        list_w = list(wks.keys())
+        if op in needs:
+            list_w = [w for w in list_w if any([owner.get(s, w) == w and s in model.y.get(w, {})
+                                                for s in needs[op]])]
+            if not list_w:
+                return None
+        w = rnd.choices(list_w, weights=[weight(op, w) for w in list_w])[0]
+        assign[op] = w
+        if op in needs and not any([owner.get(s) == w for s in needs[op]]):
+            s = [s for s in needs[op] if s not in owner and s in model.y[w]][0]
+            owner[s] = w
+
+    def movable(op, w):
+        return op not in pinned and (op not in needs or any([owner.get(s) == w for s in needs[op]]))
+
+    balance(model, assign, movable)
+    if not balanced(model, worker_load(model, assign)) and not rebalance(model, assign, movable):
+        return None
+    return assign, owner
+
+
+class Placement:
+    """
+    构造式工位分配：在取整的（工序 -> 工人）下确定工人的工位、工位的设备与工序的工位
+    1.固定设备工位与固定分配的工位归占用它的工人，需要这些工位的工序放在其上
+    2.其余工序按设备类型分组：独占设备单独一组，其它设备按其工序在工件中的平均相对位置排序后每max_m_per_st个一组；
+      工人还有工位余量且有空闲工位时，把最大的组拆开，使前后相距较远的工序可以放在不同工位上
+    3.所有组按平均相对位置排序，依次放到产线上最靠前的、工人可去且能放下这些设备的空闲工位，
+      使工件的工序大体沿产线向后流动
+    4.局部搜索：交换两个组的工位或把组移到空闲工位，减少超出上限的绕圈数与重复入站数
+    """
+    def __init__(self, model, assign: Dict[tuple, str], owner: Dict[str, str]):
+        """
+        :param model: OptModel
+        :param assign: 工序 -> 工人
+        :param owner: 工位 -> 占用的工人
+        """
+        self.model = model
+        self.assign = assign
+        self.owner = owner
+        dl = model.data_loader
+        self.max_cycle = max(1, dl.conf["max_cycle_cnt"] - 1)
+        self.stToIdx = dl.stToIdx
+        self.fixSts = set(dl.listFixSt)
+        # 与约束一致：圈数按工件的工序顺序，重复入站按z变量的工序顺序统计，只统计工件图中的工件
+        self.parts = [(part, dl.partToOps[part]) for part in model.iterParts()]
+        zOrder = {op: i for i, op in enumerate(model.z)}
+        self.entryOrder = {part: sorted(ops, key=lambda op: zOrder.get(op, -1)) for part, ops in self.parts}
+        # 固定的工序 -> 工位，工位 -> 设备
+        self.opToSt: Dict[tuple, str] = {}
+        self.stToMachs: Dict[str, List[str]] = {}
+        # 设备组：[工人, 设备列表, 工位]
+        self.slots: List[list] = []
+        self.free: List[str] = []
+        self.rest: Dict[str, List[tuple]] = {}
+
+    def build(self) -> bool:
+        """
+        :return: 工位不够或超出工人工位数上限时为False
+        """
+        m, dl = self.model, self.model.data_loader
+        max_st = int(dl.conf["max_st_per_w"])
+        max_m = int(dl.conf["max_m_per_st"])
+        monos = set(dl.listMoveMonoMachs)
+        pinned = {(_m, op): s for _m, op, _, s in dl.fixed_alloc}
+        needs = station_needs(m)
+        pos = {op: (i + 0.5) / len(ops) for ops in dl.partToOps.values() for i, op in enumerate(ops)}
+        wkToSts = {w: [s for s, _w in self.owner.items() if _w == w] for w in dl.listWorkers}
+        for s, _m in dl.fixStMachPair:
+            self.stToMachs.setdefault(s, []).append(_m)
+        self.rest = {w: [] for w in dl.listWorkers}
+        for op, w in self.assign.items():
+            if op in pinned:
+                self.opToSt[op] = pinned[op]
+            elif op in needs:
+                self.opToSt[op] = [s for s in needs[op] if self.owner.get(s) == w][0]
+            else:
+                self.rest[w].append(op)
+                continue
+            if op[0] not in self.stToMachs.setdefault(self.opToSt[op], []):
+                self.stToMachs[self.opToSt[op]].append(op[0])
+        # 每个工人的设备组
+        wkToChunks = {}
+        for w, ops in self.rest.items():
+            typeToPos = {}
+            for op in ops:
+                # 已占用的工位上有该设备时直接放在该工位
+                sts = [s for s in wkToSts[w] if op[0] in self.stToMachs.get(s, []) and s in m.v.get(op, {})]
+                if sts:
+                    self.opToSt[op] = sts[0]
+                else:
+                    typeToPos.setdefault(op[0], []).append(pos[op])
+            self.rest[w] = [op for op in ops if op not in self.opToSt]
+            order = sorted(typeToPos, key=lambda _m: sum(typeToPos[_m]) / len(typeToPos[_m]))
+            chunks = [[_m] for _m in order if _m in monos]
+            other = [_m for _m in order if _m not in monos]
+            n = -(-len(other) // max_m)
+            chunks += [other[i * len(other) // n:(i + 1) * len(other) // n] for i in range(n)]
+            if not chunks and not wkToSts[w]:
+                # 没有工序的工人也要占一个工位
+                chunks = [[]]
+            if len(chunks) + len(wkToSts[w]) > max_st:
+                return False
+            wkToChunks[w] = (chunks, typeToPos)
+        self.free = [s for s in dl.listMoveSt if s not in self.owner]
+        spare = len(self.free) - sum([len(chunks) for chunks, _ in wkToChunks.values()])
+        # 工位余量：依次拆开设备最多的组
+        while spare > 0:
+            cands = [(len(chunk), w, i) for w, (chunks, _) in wkToChunks.items() for i, chunk in enumerate(chunks)
+                     if len(chunk) > 1 and len(chunks) + len(wkToSts[w]) < max_st]
+            if not cands:
+                break
+            _, w, i = max(cands)
+            chunk = wkToChunks[w][0].pop(i)
+            wkToChunks[w][0][i:i] = [chunk[:len(chunk) // 2], chunk[len(chunk) // 2:]]
+            spare -= 1
+        groups = []
+        for w, (chunks, typeToPos) in wkToChunks.items():
+            for chunk in chunks:
+                list_pos = [p for _m in chunk for p in typeToPos[_m]]
+                groups.append((sum(list_pos) / len(list_pos) if list_pos else 1.0, w, chunk))
+        for _, w, chunk in sorted(groups, key=lambda g: g[0]):
+            sts = [s for s in self.free if self.fits(w, chunk, s)]
+            if not sts:
+                return False
+            self.free.remove(sts[0])
+            self.slots.append([w, chunk, sts[0]])
+        return True
+
+    def fits(self, w: str, chunk: List[str], s: str) -> bool:
+        return s in self.model.y[w] and all([_m in self.model.w.get(s, {}) for _m in chunk])
+
+    def stations(self) -> Dict[tuple, str]:
+        """
+        工序 -> 工位
+        :return:
+        """
+        opToSt = dict(self.opToSt)
+        for w, chunk, s in self.slots:
+            for op in self.rest[w]:
+                if op[0] in chunk:
+                    opToSt[op] = s
+        return opToSt
+
+    def violation(self) -> int:
+        """
+        超出上限的绕圈数与重复入站数（为0时构造解满足圈数与重复入站约束）
+        :return:
+        """
+        opToSt = self.stations()
+        idx = self.stToIdx
+        n = 0
+        stToRevisits = {}
+        for part, ops in self.parts:
+            back = sum([1 for a, b in zip(ops, ops[1:]) if idx[opToSt[b]] < idx[opToSt[a]]])
+            n += max(back - self.max_cycle, 0)
+            entries = {}
+            prev = None
+            for op in self.entryOrder[part]:
+                s = opToSt[op]
+                if s != prev:
+                    entries[s] = entries.get(s, 0) + 1
+                prev = s
+            for s, k in entries.items():
+                if k > 1 and s not in self.fixSts:
+                    stToRevisits[s] = stToRevisits.get(s, 0) + 1
+                    # 工序数为N的工件在同一工位至多入站N-2次
+                    n += max(k - (len(ops) - 2), 0)
+        return n + sum([max(k - 2, 0) for k in stToRevisits.values()])
+
+    def improve(self, max_iter: int = 50) -> int:
+        """
+        局部搜索：首次改进地交换两个组的工位、把组移到空闲工位，或把一种设备移到同一工人的另一个组
+        :param max_iter: 最大改进次数
+        :return: 剩余的违反数
+        """
+        best = self.violation()
+        for _ in range(max_iter):
+            if best == 0:
+                break
+            n = self.swapSlots(best)
+            if n is None:
+                n = self.moveMachine(best)
+            if n is None:
+                break
+            best = n
+        return best
+
+    def swapSlots(self, best: int) -> Optional[int]:
+        """
+        :param best: 当前的违反数
+        :return: 改进后的违反数，没有改进时为None
+        """
+        for i, a in enumerate(self.slots):
+            for b in self.slots[i + 1:] + [[None, [], s] for s in self.free]:
+                if not self.fits(a[0], a[1], b[2]) or (b[0] is not None and not self.fits(b[0], b[1], a[2])):
+                    continue
+                a[2], b[2] = b[2], a[2]
+                n = self.violation()
+                if n < best:
+                    if b[0] is None:
+                        self.free[self.free.index(a[2])] = b[2]
+                    return n
+                a[2], b[2] = b[2], a[2]
+        return None
+
+    def moveMachine(self, best: int) -> Optional[int]:
+        """
+        :param best: 当前的违反数
+        :return: 改进后的违反数，没有改进时为None
+        """
+        max_m = int(self.model.data_loader.conf["max_m_per_st"])
+        monos = set(self.model.data_loader.listMoveMonoMachs)
+        for a in self.slots:
+            for _m in [_m for _m in a[1] if _m not in monos and len(a[1]) > 1]:
+                for b in self.slots:
+                    if b is a or b[0] != a[0] or len(b[1]) >= max_m or any([x in monos for x in b[1]]) \
+                            or not self.fits(b[0], [_m], b[2]):
+                        continue
+                    a[1].remove(_m)
+                    b[1].append(_m)
+                    n = self.violation()
+                    if n < best:
+                        return n
+                    b[1].remove(_m)
+                    a[1].append(_m)
+        return None
+
+    def values(self) -> Dict[str, float]:
+        """
+        构造解中决策变量（x、y、z、w）的取值
+        :return: 变量名 -> 取值
+        """
+        m = self.model
+        opToSt = self.stations()
+        wkToSts = {}
+        stToMachs = {s: list(machs) for s, machs in self.stToMachs.items()}
+        for s, w in self.owner.items():
+            wkToSts.setdefault(w, []).append(s)
+        for w, chunk, s in self.slots:
+            wkToSts.setdefault(w, []).append(s)
+            stToMachs[s] = chunk
+        vals = {}
+        for op, wks in m.x.items():
+            for w, var in wks.items():
+                vals[var.name()] = 1 if self.assign.get(op) == w else 0
+        for w, sts in m.y.items():
+            for s, var in sts.items():
+                vals[var.name()] = 1 if s in wkToSts.get(w, []) else 0
+        for op, sts in m.z.items():
+            for s, var in sts.items():
+                vals[var.name()] = 1 if opToSt.get(op) == s else 0
+        for s, machs in m.w.items():
+            for _m, var in machs.items():
+                vals[var.name()] = 1 if _m in stToMachs.get(s, []) else 0
+        return vals
+
+
+def repair(proto: linear_solver_pb2.MPModelProto, fixed: Dict[str, float], hint: Dict[str, float],
+           time_limit: int) -> Tuple[int, Optional[linear_solver_pb2.MPSolutionResponse]]:
+    """
+    修复：固定取整与构造得到的x、y，设备与工序的工位（w、z）及其它变量由限时的子MIP补全，以构造解热启动
+    :param proto: 加权目标的模型
+    :param fixed: 固定的变量取值
+    :param hint: 其余决策变量的初始解
+    :param time_limit: 时间上限（毫秒）
+    :return: 求解状态、可行解（失败时为None）
+    """
+    solver = pywraplp.Solver.CreateSolver("SCIP")
+    solver.LoadModelFromProtoKeepNames(proto)
+    for name, val in fixed.items():
+        solver.LookupVariable(name).SetBounds(val, val)
+    list_var = [solver.LookupVariable(name) for name in hint if name not in fixed]
+    solver.SetHint(list_var, [hint[v.name()] for v in list_var])
+    solver.SetTimeLimit(int(time_limit))
+    status = solver.Solve()
+    if status not in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+        return status, None
+    response = linear_solver_pb2.MPSolutionResponse()
+    solver.FillSolutionResponseProto(response)
+    return status, response
+
+
+def relax_and_round(model, rounds: int = 3, seed: int = 0, lp_time_limit: int = 1000,
+                    repair_time_limit: int = 1000, backend: str = "PDLP",
+                    round_time_limit: int = None) -> Dict[str, object]:
+    """
+    LP松弛下界 + 随机取整、构造式工位分配与修复，快速得到可行解；找到可行解时写回model的求解器
+    下界对LP的近似解同样成立，因此LP只给较短的时间；LP没有解时按等概率取整，只是没有下界
+    每次取整：x由round_assignment得到，y、z、w由Placement构造；构造解满足圈数与重复入站约束时固定全部决策变量，
+    子MIP只补全辅助变量，否则只固定x、y，由子MIP在构造解的热启动下修补工位与设备。
+    均衡后仍不满足波动率约束的取整直接跳过（工人多、工序少的算例可能没有满足波动率约束的分配），
+    某次只固定x、y的修复超时后不再尝试其余取整
+    :param model: 已构建的OptModel
+    :param rounds: 取整次数
+    :param seed: 随机种子
+    :param lp_time_limit: LP时间上限（毫秒）
+    :param repair_time_limit: 每次修复的时间上限（毫秒）
+    :param backend: LP求解器
+    :param round_time_limit: 取整与修复的总时间上限（毫秒），超出后不再开始新的取整，None表示不限制
+    :return: {"bound", "lp_obj", "obj", "gap", "lp_status", "lp_time", "round_time", "constructed"}
+             constructed为不需要子MIP修补工位的取整次数
+    """
+    s_t = time.time()
+    proto = weighted_proto(model)
+    relax = solve_relaxation(proto, backend, lp_time_limit)
+    lp_time = time.time() - s_t
+    res = {"bound": relax["bound"], "lp_obj": relax["lp_obj"], "obj": None, "gap": None,
+           "lp_status": relax["status"], "lp_time": lp_time, "round_time": 0.0, "constructed": 0}
+    if relax["status"] == SolverStatus[pywraplp.Solver.INFEASIBLE]:
+        return res
+    rnd = random.Random(seed)
+    best, best_obj = None, None
+    for _ in range(rounds):
+        if round_time_limit is not None and (time.time() - s_t - lp_time) * 1000 >= round_time_limit:
+            break
+        rounded = round_assignment(model, relax["values"], rnd)
+        if rounded is None:
+            continue
+        placement = Placement(model, *rounded)
+        if not placement.build():
+            continue
+        constructed = placement.improve() == 0
+        res["constructed"] += int(constructed)
+        hint = placement.values()
+        keep = ("x_", "y_", "z_", "w_") if constructed else ("x_", "y_")
+        fixed = {name: val for name, val in hint.items() if name.startswith(keep)}
+        status, response = repair(proto, fixed, hint, repair_time_limit)
+        if response is None:
+            if status == pywraplp.Solver.NOT_SOLVED and not constructed:
+                # 时间上限内既没有找到解也没有证明不可行，其余取整的修复同样难以完成
+                break
+            continue
+        if best_obj is None or response.objective_value < best_obj:
+            best, best_obj = response, response.objective_value
+    res["round_time"] = time.time() - s_t - lp_time
+    if best is None:
+        return res
+    model.solver.LoadSolutionFromProto(best)
+    model.status = pywraplp.Solver.FEASIBLE
+    model.incumbent = model.Incumbent
+    res["obj"] = best_obj
+    if res["bound"] is not None and np.isfinite(res["bound"]):
+        res["gap"] = (best_obj - res["bound"]) / max(abs(best_obj), 1e-9)
+    return res
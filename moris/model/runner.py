@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+import multiprocessing as mp
+from typing import List, Dict, Optional
+
+from .opt import OptModel
+from .model import SolverStatus
+from moris.data.plant import PlantData, SharedPlant, attach_plant, group_by_plant, split_instance
+from moris.data.cache import ResultCache
+from moris.data.analyzer import Analyzer, load_instance
+
+
+def solver_config(backend: str = "SCIP", mode: str = "weighted", time_limit: int = None) -> Dict[str, object]:
+    """
+    参与缓存键的求解配置
+    :return:
+    """
+    return {"backend": backend, "mode": mode, "time_limit": time_limit}
+
+
+def solve_instance(data: Dict, backend: str = "SCIP", mode: str = "weighted", time_limit: int = None,
+                   cache: Optional[ResultCache] = None, warm_start: bool = True,
+                   plant: Optional[PlantData] = None) -> Dict[str, object]:
+    """
+    构建并求解单个算例；命中缓存时直接返回缓存结果，否则可用相近算例的解热启动
+    :param data: 算例原始数据
+    :param backend: 求解后端
+    :param mode: 目标模式
+    :param time_limit: 求解时间上限（毫秒）
+    :param cache: 结果缓存，None表示不使用
+    :param warm_start: 未命中时是否用相近算例的解热启动
+    :param plant: 共享的工厂主数据，此时data可只含算例自身的数据（工序、装配关系、参数）
+    :return: {"dispatch_results", "obj", "status", "cached", "solve_time"}，预检不通过时status为INVALID并附带issues
+    """
+    if plant is not None:
+        data = plant.complete(data)
+    config = solver_config(backend, mode, time_limit)
+    if cache is not None:
+        entry = cache.get(data, config)
+        if entry is not None:
+            return {"dispatch_results": entry["dispatch_results"], "obj": entry["obj"],
+                    "status": entry["status"], "cached": True, "solve_time": 0.0}
+    s_t = time.time()
+    # 预检：无法解析或必然不可行的算例不建模
+    data_loader, errors = load_instance(data, plant)
+    if data_loader is not None:
+        analyzer = Analyzer(data_loader)
+        analyzer.run()
+        errors = analyzer.Errors
+    if errors:
+        return {"dispatch_results": [], "obj": None, "status": "INVALID", "cached": False,
+                "solve_time": time.time() - s_t, "issues": [issue.to_dict() for issue in errors]}
+    model = OptModel(data_loader, backend=backend)
+    model.buildModel()
+    model.minObj(mode=mode)
+    if cache is not None and warm_start:
+        near = cache.nearest(data)
+        if near is not None:
+            model.hintFromDispatch(near["dispatch_results"])
+    status = model.solveModel(time_limit=time_limit)
+    res = {"dispatch_results": [], "obj": None, "status": SolverStatus.get(status, str(status)), "cached": False}
+    if model.HasSolution:
+        res["dispatch_results"] = model.get_dispatch_results()["dispatch_results"]
+        res["obj"] = model.WeightedObjValue
+    res["solve_time"] = time.time() - s_t
+    # 未求得解（如超时）的结果不缓存，避免之后以更长时间求解时命中
+    if cache is not None and model.HasSolution:
+        cache.put(data, config, {k: res[k] for k in ["dispatch_results", "obj", "status"]})
+    return res
+
+
+"""
+批量求解：同一工厂的算例共享主数据，进程池中的子进程从共享内存读取，每个子进程每个工厂只读取一次
+"""
+_PlantHandles: Dict[str, tuple] = {}
+_Plants: Dict[str, PlantData] = {}
+
+
+def _init_batch(handles: Dict[str, tuple]):
+    global _PlantHandles
+    _PlantHandles = handles
+    _Plants.clear()
+
+
+def _solve_guarded(data: Dict, plant: Optional[PlantData], params: Dict[str, object]) -> Dict[str, object]:
+    # 单个算例求解出错时返回ERROR，不影响同一批次的其它算例
+    s_t = time.time()
+    try:
+        return solve_instance(data, plant=plant, **params)
+    except Exception as e:
+        return {"dispatch_results": [], "obj": None, "status": "ERROR", "cached": False,
+                "solve_time": time.time() - s_t, "error": repr(e)}
+
+
+def _solve_batch_item(args) -> Dict[str, object]:
+    key, data, params = args
+    if key not in _Plants:
+        _Plants[key] = attach_plant(_PlantHandles[key])
+    return _solve_guarded(data, _Plants[key], params)
+
+
+def solve_batch(instances: List[Dict], backend: str = "SCIP", mode: str = "weighted", time_limit: int = None,
+                processes: int = None) -> List[Dict[str, object]]:
+    """
+    批量求解多个算例：按主数据的内容哈希分组，每个工厂的工人技能、工位、设备表只解析一次，
+    以共享内存只读共享给进程池，任务中只传输算例自身的数据
+    :param instances: 算例原始数据
+    :param backend: 求解后端
+    :param mode: 目标模式
+    :param time_limit: 每个算例的求解时间上限（毫秒）
+    :param processes: 进程数，默认CPU核数；为1时在当前进程中依次求解
+    :return: 与instances同序的求解结果（同solve_instance），附带plant（主数据哈希）；
+        主数据无法解析的算例status为INVALID并附带issues，求解出错的算例status为ERROR并附带error
+    """
+    keys, plants, issues = group_by_plant(instances)
+    params = {"backend": backend, "mode": mode, "time_limit": time_limit}
+    results: List[Optional[Dict[str, object]]] = [None] * len(instances)
+    for i, errors in issues.items():
+        results[i] = {"dispatch_results": [], "obj": None, "status": "INVALID", "cached": False,
+                      "solve_time": 0.0, "issues": [issue.to_dict() for issue in errors]}
+    todo = [i for i in range(len(instances)) if i not in issues]
+    if processes == 1:
+        for i in todo:
+            results[i] = _solve_guarded(instances[i], plants[keys[i]], params)
+    elif todo:
+        shared = {key: SharedPlant(plant) for key, plant in plants.items()}
+        try:
+            handles = {key: sp.handle for key, sp in shared.items()}
+            jobs = [(keys[i], split_instance(instances[i])[1], params) for i in todo]
+            # polars的线程池在fork后可能死锁，子进程以spawn方式启动
+            ctx = mp.get_context("spawn")
+            with ctx.Pool(processes=processes, initializer=_init_batch, initargs=(handles,)) as pool:
+                for i, res in zip(todo, pool.map(_solve_batch_item, jobs)):
+                    results[i] = res
+        finally:
+            for sp in shared.values():
+                sp.close()
+    for key, res in zip(keys, results):
+        res["plant"] = key
+    return results
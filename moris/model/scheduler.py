@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from typing import List, Dict, Optional
+
+from .model import SolverStatus, pywraplp, linear_solver_pb2
+from .relax import INF
+
+
+EPSILON = 1e-6
+# 首轮每个算例的时间片上限（毫秒）
+INIT_SLICE = 5000
+# 之后时间片的下限、上限（毫秒）
+MIN_SLICE = 2000
+MAX_SLICE = 60000
+# 截止时间前为收集结果预留的时间（秒）
+MARGIN = 2.0
+# 连续未改进时，预期改进量按此比例衰减
+STALE_DECAY = 0.5
+# 首个时间片构造可行解的取整次数上限
+CONSTRUCT_ROUNDS = 10
+
+
+def _warm_up():
+    from .opt import OptModel
+    from .autoconf import extract_features, choose_config
+    from moris.data import Dataset, DataLoader
+    pywraplp.Solver.CreateSolver("SCIP")
+    return OptModel, Dataset, DataLoader, extract_features, choose_config
+
+
+def _slice_worker(conn, backend: str, formulation: Optional[str], max_models: int):
+    """
+    求解进程：按时间片求解，已构建的模型留在进程中，同一算例再次分到本进程时不必重建
+    每个时间片都以调度器传来的最好解热启动（可能来自其他进程）；算例还没有解时，首个时间片先用一小部分时间
+    做LP取整构造（relaxAndRound），构造成功则以其热启动，求解没有找到更好的解时仍返回构造解
+    最好解只包含决策变量x、y、z、w，其余变量由求解器补全
+    接收：(算例名, 算例数据, 时间片毫秒, 最好解, 启发式兜底的随机种子或None, 是否先构造)；发送：时间片结果
+    """
+    OptModel, Dataset, DataLoader, extract_features, choose_config = _warm_up()
+    models: Dict[str, object] = {}
+    conn.send(("ready", None))
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        name, data, slice_ms, incumbent, seed, construct = msg
+        s_t = time.time()
+        try:
+            model = models.pop(name, None)
+            if model is None:
+                data_loader = DataLoader(Dataset.from_data(data))
+                model = OptModel(data_loader, backend=backend)
+                circle = None
+                if formulation is None:
+                    # 模型形式与圈数约束形式按自动配置规则选择
+                    config = choose_config(extract_features(data_loader, model.graph))
+                    model.formulation, circle = config["formulation"], config["circle"]
+                else:
+                    model.formulation = formulation
+                model.buildModel(circle=circle)
+            # 最近使用的模型放在最后，超出上限时丢弃最早的
+            models[name] = model
+            while len(models) > max_models:
+                models.pop(next(iter(models)))
+            remaining = slice_ms - (time.time() - s_t) * 1000
+            # 每个时间片从头求解，才能接受新的初始解并按本时间片计时
+            model.resetSolve()
+            bound, constructed, built = None, None, None
+            if seed is not None:
+                # 多个时间片都未找到可行解：LP松弛取整修复（每次换随机种子），同时得到严格下界
+                res = model.relaxAndRound(seed=seed, lp_time_limit=max(remaining / 2, 1000),
+                                          repair_time_limit=max(remaining / 6, 1000))
+                bound = res["bound"]
+                status = model.status if model.HasSolution else pywraplp.Solver.NOT_SOLVED
+            else:
+                if construct and not incumbent:
+                    # 首个时间片先构造可行解：工位分配与回路约束较紧时子MIP可能在整个时间片内都找不到解
+                    # 修复不可行时很快返回，多次短的取整比一次长的修复更容易得到可行解
+                    res = model.relaxAndRound(rounds=CONSTRUCT_ROUNDS, lp_time_limit=max(remaining / 5, 500),
+                                              repair_time_limit=500, round_time_limit=max(remaining / 2, 1000))
+                    bound = res["bound"]
+                    constructed = res["obj"] is not None
+                    if constructed:
+                        built = linear_solver_pb2.MPSolutionResponse()
+                        model.solver.FillSolutionResponseProto(built)
+                        incumbent = model.DecisionIncumbent
+                    remaining = slice_ms - (time.time() - s_t) * 1000
+                if incumbent:
+                    model.SetHint(incumbent)
+                status = model.solveModel(max(remaining, 1000))
+                if backend == "SCIP" and status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
+                    # SCIP没有下界时返回-INF
+                    bounds = [b for b in [bound, model.solver.Objective().BestBound()]
+                              if b is not None and abs(b) < INF]
+                    bound = max(bounds) if bounds else None
+                if not model.HasSolution and built is not None:
+                    # 求解没有找到解：返回构造解
+                    model.solver.LoadSolutionFromProto(built)
+                    status = model.status = pywraplp.Solver.FEASIBLE
+            res = {"status": status, "bound": bound, "obj": None, "incumbent": None, "dispatch_results": None,
+                   "constructed": constructed}
+            if model.HasSolution:
+                res["obj"] = model.WeightedObjValue
+                res["incumbent"] = model.DecisionIncumbent
+                res["dispatch_results"] = model.get_dispatch_results()["dispatch_results"]
+            res["time"] = (time.time() - s_t) * 1000
+            conn.send(("done", res))
+        except Exception as e:
+            models.pop(name, None)
+            conn.send(("failed", repr(e)))
+
+
+class BudgetJob:
+    """
+    单个算例的调度状态：当前最好解、下界、已用时间与改进历史
+    """
+    __slots__ = ["name", "data", "status", "obj", "bound", "incumbent", "dispatch_results", "used", "slices",
+                 "stale", "misses", "done", "error", "last_worker", "constructed", "history"]
+
+    def __init__(self, name: str, data: Dict):
+        self.name = name
+        self.data = data
+        self.status = None
+        self.obj: Optional[float] = None
+        self.bound: Optional[float] = None
+        self.incumbent: Dict[str, float] = {}
+        self.dispatch_results = None
+        # 已用时间（毫秒）
+        self.used = 0.0
+        self.slices = 0
+        # 连续未改进的时间片数
+        self.stale = 0
+        # 连续未找到可行解的时间片数
+        self.misses = 0
+        self.done = False
+        self.error = None
+        self.last_worker = None
+        # 首个时间片的LP取整构造是否得到可行解（None表示没有构造，如已有热启动解）
+        self.constructed: Optional[bool] = None
+        self.history: List[Dict[str, object]] = []
+
+    @property
+    def Gap(self) -> Optional[float]:
+        if self.obj is None or self.bound is None:
+            return None
+        return max(self.obj - self.bound, 0.0) / max(abs(self.obj), EPSILON)
+
+    @property
+    def ExpectedGain(self) -> float:
+        """
+        下一时间片的预期改进量：与最好解的绝对gap成正比，连续未改进时衰减
+        没有下界（如CP-SAT）时以目标值本身作为gap
+        :return:
+        """
+        if self.obj is None:
+            return float("inf")
+        gap = self.obj - (self.bound if self.bound is not None else 0.0)
+        return max(gap, 0.0) * STALE_DECAY ** self.stale
+
+    def update(self, res: Dict[str, object]):
+        self.used += res["time"]
+        self.slices += 1
+        if res.get("constructed") is not None:
+            self.constructed = res["constructed"]
+        status = res["status"]
+        improved = False
+        if res["obj"] is not None and (self.obj is None or res["obj"] < self.obj - EPSILON):
+            self.obj = res["obj"]
+            self.incumbent = res["incumbent"]
+            self.dispatch_results = res["dispatch_results"]
+            improved = True
+        if res["bound"] is not None:
+            self.bound = res["bound"] if self.bound is None else max(self.bound, res["bound"])
+        self.stale = 0 if improved else self.stale + 1
+        self.misses = 0 if self.obj is not None else self.misses + 1
+        # 证明最优、不可行，或最好解已达到下界时不再调度
+        if status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.INFEASIBLE]:
+            self.done = True
+        elif self.obj is not None and self.bound is not None and self.obj - self.bound <= EPSILON:
+            self.done = True
+        if self.obj is None:
+            self.status = status
+        else:
+            self.status = pywraplp.Solver.OPTIMAL if self.done else pywraplp.Solver.FEASIBLE
+        self.history.append({"slice": self.slices, "obj": self.obj, "bound": self.bound, "time": self.used,
+                             "status": SolverStatus.get(status, str(status))})
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"name": self.name, "status": SolverStatus.get(self.status, str(self.status)) if self.error is None
+                else "ERROR", "obj": self.obj, "bound": self.bound, "gap": self.Gap, "time": self.used,
+                "slices": self.slices, "dispatch_results": self.dispatch_results, "error": self.error,
+                "constructed": self.constructed, "history": self.history}
+
+
+class SliceWorker:
+    """
+    调度器的求解子进程；超过截止时间仍未返回时直接结束
+    """
+    def __init__(self, ctx, idx: int, backend: str, formulation: Optional[str], max_models: int):
+        self.ctx = ctx
+        self.idx = idx
+        self.backend = backend
+        self.formulation = formulation
+        self.max_models = max_models
+        self.proc = None
+        self.conn = None
+        self.job: Optional[BudgetJob] = None
+        self.started = None
+        self.slice_ms = 0.0
+
+    def start(self):
+        self.conn, child = self.ctx.Pipe()
+        self.proc = self.ctx.Process(target=_slice_worker,
+                                     args=(child, self.backend, self.formulation, self.max_models), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def wait_ready(self):
+        self.conn.recv()
+
+    def submit(self, job: BudgetJob, slice_ms: float, seed: Optional[int]):
+        self.job = job
+        self.started = time.time()
+        self.slice_ms = slice_ms
+        job.last_worker = self.idx
+        self.conn.send((job.name, job.data, slice_ms, job.incumbent, seed, job.slices == 0))
+
+    def stop(self, force: bool = False):
+        if self.proc is None:
+            return
+        if not force:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+        self.proc = None
+
+
+class BudgetScheduler:
+    """
+    截止时间约束下多个算例的时间分配：
+    1.首轮每个算例一个短时间片，先做LP取整构造再以构造解热启动求解（所有算例尽早有可行解）；
+      构造不保证成功（没有满足波动率约束的分配，或构造违反圈数/重复入站约束且子MIP修补超时），
+      失败时结果中constructed为False，首个可行解只能来自之后的时间片
+    2.之后按实时的最好解、下界与gap，把剩余的核时间分给预期改进量最大的算例；没有可行解的算例优先，
+      连续多个时间片仍无可行解时，加倍的时间片与LP松弛取整修复（每次换随机种子）交替进行
+    3.算例以时间片为单位抢占，再次调度时以最好解热启动（优先分回已构建其模型的进程）
+    4.时间片不超过截止时间；截止时间到达时仍未返回的进程被终止，算例保留之前的最好解
+    """
+    def __init__(self, instances: Dict[str, Dict], deadline: float, cores: int = None, backend: str = "SCIP",
+                 formulation: str = None, init_slice: int = INIT_SLICE, max_models: int = 4, fallback_after: int = 2):
+        """
+        :param instances: 算例名 -> 算例原始数据
+        :param deadline: 截止时间（time.time()的时间戳）
+        :param cores: 并行求解进程数，默认CPU核数
+        :param backend: 求解后端
+        :param formulation: 模型形式（full/compact），None时按自动配置规则（autoconf.DefaultRules）逐算例选择
+        :param init_slice: 首轮时间片上限（毫秒）
+        :param max_models: 每个进程保留的已构建模型数
+        :param fallback_after: 连续多少个时间片无可行解后改用启发式兜底
+        """
+        self.jobs = [BudgetJob(name, data) for name, data in instances.items()]
+        self.deadline = deadline
+        self.cores = max(1, min(cores or mp.cpu_count(), len(self.jobs)))
+        self.backend = backend
+        self.formulation = formulation
+        self.init_slice = init_slice
+        self.max_models = max_models
+        self.fallback_after = fallback_after
+        self.workers: List[SliceWorker] = []
+
+    @property
+    def Remaining(self) -> float:
+        # 剩余可分配时间（毫秒）
+        return max(self.deadline - MARGIN - time.time(), 0.0) * 1000
+
+    def running(self) -> List[BudgetJob]:
+        return [w.job for w in self.workers if w.job is not None]
+
+    def pick(self) -> Optional[BudgetJob]:
+        """
+        下一个时间片分给：未运行过的算例 > 没有可行解的算例 > 预期改进量最大的算例
+        :return:
+        """
+        running = self.running()
+        candidates = [job for job in self.jobs if not job.done and job not in running]
+        if not candidates:
+            return None
+        fresh = [job for job in candidates if job.slices == 0]
+        if fresh:
+            return fresh[0]
+        return max(candidates, key=lambda job: (job.obj is None, job.ExpectedGain))
+
+    def sliceFor(self, job: BudgetJob) -> float:
+        """
+        时间片长度：首轮把剩余核时间均分给尚未运行的算例（不超过init_slice）；
+        之后连续未改进时加倍（避免每次重启都在同一处截断搜索），并均分剩余核时间的上限
+        :param job: 算例
+        :return: 毫秒
+        """
+        remaining = self.Remaining
+        active = max(len([j for j in self.jobs if not j.done]), 1)
+        if job.slices == 0:
+            fresh = max(len([j for j in self.jobs if j.slices == 0]), 1)
+            share = remaining * self.cores / fresh
+            return min(self.init_slice, share, remaining)
+        share = remaining * self.cores / active
+        return min(max(MIN_SLICE * 2 ** job.stale, MIN_SLICE), MAX_SLICE, max(share, MIN_SLICE), remaining)
+
+    def assign(self, worker: SliceWorker) -> bool:
+        job = self.pick()
+        if job is None:
+            return False
+        # 同一算例优先分回已构建其模型的空闲进程
+        original = None
+        if job.last_worker is not None and job.last_worker != worker.idx:
+            idle = [w for w in self.workers if w.job is None and w.idx == job.last_worker]
+            if idle:
+                original, worker = worker, idle[0]
+        slice_ms = self.sliceFor(job)
+        if slice_ms < MIN_SLICE / 2 and job.slices > 0:
+            return False
+        seed = None
+        if job.obj is None and job.misses >= self.fallback_after and (job.misses - self.fallback_after) % 2 == 0:
+            seed = job.misses
+        worker.submit(job, slice_ms, seed)
+        if original is not None:
+            # 原进程仍空闲，继续为其分配下一个算例
+            self.assign(original)
+        return True
+
+    def collect(self, worker: SliceWorker):
+        job = worker.job
+        try:
+            kind, res = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            kind, res = "failed", repr(e)
+        if kind == "done":
+            job.update(res)
+        else:
+            job.used += (time.time() - worker.started) * 1000
+            job.slices += 1
+            job.error = res
+            job.done = True
+        worker.job = None
+
+    def run(self) -> List[Dict[str, object]]:
+        """
+        :return: 每个算例的最好解、下界、gap、已用时间与派工结果（与instances同序）
+        """
+        ctx = mp.get_context("spawn")
+        self.workers = [SliceWorker(ctx, i, self.backend, self.formulation, self.max_models) for i in range(self.cores)]
+        try:
+            for worker in self.workers:
+                worker.start()
+            for worker in self.workers:
+                worker.wait_ready()
+            while True:
+                for worker in self.workers:
+                    if worker.job is None and self.Remaining > 0:
+                        if not self.assign(worker):
+                            break
+                busy = [w for w in self.workers if w.job is not None]
+                if not busy:
+                    break
+                timeout = max(self.deadline - time.time(), 0.0)
+                ready = wait([w.conn for w in busy], timeout=timeout)
+                for worker in busy:
+                    if worker.conn in ready:
+                        self.collect(worker)
+                if time.time() >= self.deadline:
+                    # 截止时间已到：终止仍在运行的时间片，算例保留之前的最好解
+                    for worker in self.workers:
+                        if worker.job is not None:
+                            worker.job.used += (time.time() - worker.started) * 1000
+                            worker.job = None
+                            worker.stop(force=True)
+                    break
+        finally:
+            for worker in self.workers:
+                worker.stop()
+        return [job.to_dict() for job in self.jobs]
+
+
+def schedule_instances(instances: Dict[str, Dict], deadline: float, cores: int = None, backend: str = "SCIP",
+                       formulation: str = None, init_slice: int = INIT_SLICE) -> List[Dict[str, object]]:
+    """
+    在截止时间前求解一批算例：按实时gap把核时间分给预期改进最大的算例，时间片之间抢占并热启动
+    :param instances: 算例名 -> 算例原始数据
+    :param deadline: 截止时间（time.time()的时间戳）
+    :param cores: 并行求解进程数，默认CPU核数
+    :param backend: 求解后端
+    :param formulation: 模型形式，None时逐算例按自动配置规则选择
+    :param init_slice: 首轮时间片上限（毫秒）
+    :return: 每个算例的结果
+    """
+    return BudgetScheduler(instances, deadline, cores, backend, formulation, init_slice).run()
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import time
+import multiprocessing as mp
+from typing import List, Dict, Tuple
+
+from .model import pywraplp, linear_solver_pb2, np, tpl_to_str
+from moris.data import Dataset, DataLoader
+
+
+class Shard:
+    """
+    分片：在子进程中调用的约束族构建方法及其参数
+    cost为预估的构建量（用于分配到子进程）
+    """
+    __slots__ = ["family", "method", "kwargs", "cost"]
+
+    def __init__(self, family: str, method: str, kwargs: Dict[str, object] = None, cost: float = 1.0):
+        self.family = family
+        self.method = method
+        self.kwargs = {} if kwargs is None else kwargs
+        self.cost = cost
+
+    def __repr__(self):
+        return "Shard({0}.{1}, cost={2})".format(self.family, self.method, self.cost)
+
+
+def build_vars(model):
+    """
+    构建全部基础变量（w、x、y、z、var）及其自身的约束
+    :param model: OptModel
+    :return:
+    """
+    for family in [model.allocStToMach, model.allocOpToWks, model.allocWkToSts, model.allocOpToSts,
+                   model.create_var]:
+        family()
+
+
+def chunks(items: List[object], costs: List[float], n: int) -> List[Tuple[List[object], float]]:
+    """
+    按顺序将items切成n段，使每段的cost之和接近
+    :return: [(子列表, cost之和)]
+    """
+    total = sum(costs)
+    res, cur, acc = [], [], 0.0
+    for item, cost in zip(items, costs):
+        cur.append(item)
+        acc += cost
+        if acc >= total / n and len(res) < n - 1:
+            res.append((cur, acc))
+            cur, acc = [], 0.0
+    if cur:
+        res.append((cur, acc))
+    return res
+
+
+def make_shards(model, n: int) -> List[Shard]:
+    """
+    将基础变量之外的约束族切分为分片
+    1.变量关系约束（addVarConstr）按工序切分，工人层级平衡约束单独一个分片
+    2.圈数约束按工件切分（工件之间不共享工序）
+    3.重复入站约束按工位切分
+    目标（节拍、波动率）与固定分配依赖合并后的变量，在主进程中构建
+    :param model: OptModel（只用到数据与工件图，不需要已构建的变量）
+    :param n: 每个约束族的分片数
+    :return:
+    """
+    m = model
+    dl = m.data_loader
+    shards = []
+    opToWks, opToSts = dl.opToAvailWks, dl.opToAvailSts
+    ops = list(dict.fromkeys(list(opToWks) + list(opToSts)))
+    # 工序不限工位时var覆盖所有工位（见create_var）
+    n_sts = {op: len(opToSts.get(op, dl.listStations)) for op in ops}
+    if m.formulation == "compact":
+        costs = [n_sts[op] * (1 + len(opToWks.get(op, []))) for op in ops]
+    else:
+        costs = [n_sts[op] * (1 + 4 * len(opToWks.get(op, []))) for op in ops]
+        n_var = sum([n_sts[op] * len(opToWks[op]) for op in opToWks])
+        shards.append(Shard("addVarConstr", "addBalanceConstr", cost=n_var * dl.WkCnt / 50))
+    shards += [Shard("addVarConstr", "addVarConstr", {"ops": chunk}, cost)
+               for chunk, cost in chunks(ops, costs, n)]
+    parts = list(m.iterParts())
+    costs = [len(m.data_loader.partToOps[part]) for part in parts]
+    shards += [Shard("addCircleConstr", "addCircleConstr", {"parts": chunk}, cost)
+               for chunk, cost in chunks(parts, costs, n)]
+    stations = [s for s in m.data_loader.listStations if s not in m.data_loader.listFixSt]
+    cost = len(ops) + len(parts)
+    shards += [Shard("addRevisitedStConstr", "addRevisitedStConstr", {"stations": chunk}, c)
+               for chunk, c in chunks(stations, [cost] * len(stations), n)]
+    return shards
+
+
+def assign(shards: List[Shard], n: int) -> List[List[Shard]]:
+    """
+    最长处理时间优先（LPT）：按cost从大到小依次分给当前负载最小的进程
+    :return: 每个进程的分片
+    """
+    loads = [0.0] * n
+    groups = [[] for _ in range(n)]
+    for shard in sorted(shards, key=lambda x: -x.cost):
+        k = int(np.argmin(loads))
+        groups[k].append(shard)
+        loads[k] += shard.cost
+    return [group for group in groups if group]
+
+
+def fragment(solver: pywraplp.Solver, n_base: int, c_base: int, names: List[str], offset: int) -> bytes:
+    """
+    导出子进程中新增的变量与约束，并把变量index换成合并后模型中的index
+    基础变量按名称对应到主进程的index（各进程中polars去重后的顺序不保证一致），新增变量从offset开始编号
+    :param solver: 子进程的求解器
+    :param n_base: 基础变量数
+    :param c_base: 基础约束数
+    :param names: 主进程中基础变量的名称（按index）
+    :param offset: 新增变量在合并后模型中的起始index
+    :return: 序列化的MPModelProto片段
+    """
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    nameToIdx = {name: i for i, name in enumerate(names)}
+    index = [nameToIdx[proto.variable[i].name] for i in range(n_base)] + \
+        list(range(offset, offset + len(proto.variable) - n_base))
+    # 原地删除基础变量与基础约束后改写index，比逐行新建约束快数倍
+    del proto.variable[:n_base]
+    del proto.constraint[:c_base]
+    for constr in proto.constraint:
+        constr.var_index[:] = [index[i] for i in constr.var_index]
+        # 导出时未命名的约束被自动命名为auto_c_<index>，合并后会重名
+        if constr.name.startswith("auto_c_"):
+            constr.ClearField("name")
+    return proto.SerializeToString()
+
+
+def _build_shards(conn, data: Dict, options: Dict[str, object], shards: List[Shard]):
+    """
+    子进程：重建基础变量，构建分片，按主进程给定的编号导出片段
+    通信：发送各分片的（约束族，新增变量数，新增约束数，耗时）-> 接收（主进程基础变量名，起始index）-> 发送片段
+    """
+    data_loader = DataLoader(Dataset.from_data(data))
+    from .opt import OptModel
+    model = OptModel(data_loader, backend=options["backend"])
+    model.formulation = options["formulation"]
+    model.circle_form = options["circle_form"]
+    build_vars(model)
+    solver = model.solver
+    n_base, c_base = solver.NumVariables(), solver.NumConstraints()
+    records = []
+    for shard in shards:
+        v0, c0 = solver.NumVariables(), solver.NumConstraints()
+        s_t = time.time()
+        getattr(model, shard.method)(**shard.kwargs)
+        records.append((shard.family, solver.NumVariables() - v0, solver.NumConstraints() - c0,
+                        time.time() - s_t))
+    conn.send(records)
+    names, offset = conn.recv()
+    conn.send_bytes(fragment(solver, n_base, c_base, names, offset))
+    conn.close()
+
+
+def rebind(model, solver: pywraplp.Solver):
+    """
+    模型的变量字典改为指向合并后求解器中的变量：基础变量index不变，v变量按名称查找
+    :param model: OptModel
+    :param solver: 载入合并模型的求解器
+    :return:
+    """
+    m = model
+    variables = solver.variables()
+    for d in [m.x, m.y, m.z, m.w]:
+        for key in d:
+            for k, var in d[key].items():
+                d[key][k] = variables[var.index()]
+    for op in m.var:
+        for w in m.var[op]:
+            for s, var in m.var[op][w].items():
+                m.var[op][w][s] = variables[var.index()]
+    m.solver = solver
+    m.v = {}
+    for op in m.z:
+        for s in m.z[op]:
+            var = solver.LookupVariable("constr_eq_{0}_{1}".format(tpl_to_str(op), s))
+            if var is not None:
+                m.v.setdefault(op, {})
+                m.v[op][s] = var
+
+
+def usable_processes(processes: int = None) -> int:
+    """
+    分片构建实际使用的子进程数：不超过CPU核数
+    子进程需各自重新解析算例并重建基础变量，核数不足以并行时分片构建比串行构建更慢
+    :param processes: 请求的子进程数
+    :return: 不大于1时应串行构建
+    """
+    if processes is None:
+        return 1
+    return min(processes, mp.cpu_count())
+
+
+def build_sharded(model, processes: int = 4):
+    """
+    多进程分片构建：子进程各自重建基础变量后并行构建约束分片，得到共享变量编号的模型片段，
+    主进程按顺序拼接成一个MPModelProto并载入新的求解器；目标与固定分配在合并后构建
+    :param model: 未构建的OptModel
+    :param processes: 子进程数
+    :return:
+    """
+    m = model
+    ctx = mp.get_context("spawn")
+    options = {"backend": m.backend, "formulation": m.formulation, "circle_form": m.circle_form}
+    groups = assign(make_shards(m, processes), processes)
+    procs, conns = [], []
+    for group in groups:
+        parent, child = ctx.Pipe()
+        p = ctx.Process(target=_build_shards, args=(child, m.data_loader.dataset.data, options, group),
+                        daemon=True)
+        p.start()
+        child.close()
+        procs.append(p)
+        conns.append(parent)
+    try:
+        # 子进程启动的同时在主进程中构建基础变量
+        build_vars(m)
+        solver = m.solver
+        names = [var.name() for var in solver.variables()]
+        n_base, c_base = len(names), solver.NumConstraints()
+        reports = [conn.recv() for conn in conns]
+        s_t = time.time()
+        offset, c_offset = n_base, c_base
+        for conn, records in zip(conns, reports):
+            conn.send((names, offset))
+            # 记录各约束族在合并后模型中的变量、约束区间
+            for family, dv, dc, t in records:
+                stats = m.stats.family(family)
+                stats.build_time += t
+                if dv:
+                    stats.var_ranges.append((offset, offset + dv))
+                if dc:
+                    stats.constr_ranges.append((c_offset, c_offset + dc))
+                offset += dv
+                c_offset += dc
+        proto = linear_solver_pb2.MPModelProto()
+        solver.ExportModelToProto(proto)
+        # 序列化的proto拼接即为repeated字段的拼接
+        buf = [proto.SerializeToString()] + [conn.recv_bytes() for conn in conns]
+    finally:
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for conn in conns:
+            conn.close()
+    merged = linear_solver_pb2.MPModelProto()
+    merged.ParseFromString(b"".join(buf))
+    solver = m.init_solver(m.backend)
+    error = solver.LoadModelFromProtoKeepNames(merged)
+    if error:
+        raise RuntimeError("failed to load merged model: {0}".format(error))
+    rebind(m, solver)
+    m.stats.family("mergeShards").build_time += time.time() - s_t
+    for family in [m.addFixedConstr, m.addObj1, m.addObj2]:
+        family()
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import time
+from functools import wraps
+from typing import List, Dict, Tuple, Optional
+
+from moris.utils import LazyModule, rss_mb, peak_rss_mb, reset_peak_rss
+
+
+np = LazyModule("numpy")
+linear_solver_pb2 = LazyModule("ortools.linear_solver.linear_solver_pb2")
+
+
+class FamilyStats:
+    """
+    单个约束族的构建记录：新增变量/约束的index区间与构建耗时
+    """
+    __slots__ = ["name", "var_ranges", "constr_ranges", "build_time", "rss_after", "peak_rss"]
+
+    def __init__(self, name: str):
+        self.name = name
+        self.var_ranges: List[Tuple[int, int]] = []
+        self.constr_ranges: List[Tuple[int, int]] = []
+        self.build_time = 0.0
+        # 构建后的常驻内存与构建过程中的峰值（MB）；峰值只在低内存/有预算的构建中记录
+        self.rss_after = 0.0
+        self.peak_rss: Optional[float] = None
+
+    @property
+    def NumVars(self) -> int:
+        return sum([e - s for s, e in self.var_ranges])
+
+    @property
+    def NumConstrs(self) -> int:
+        return sum([e - s for s, e in self.constr_ranges])
+
+
+class ModelStats:
+    """
+    模型规模统计：各约束族的规模与构建耗时，以及求解器统计
+    """
+    def __init__(self):
+        self.families: Dict[str, FamilyStats] = {}
+        # 累计求解耗时（毫秒）
+        self.solve_time = 0.0
+        # 第一次返回可行解的求解调用结束时的累计求解耗时（毫秒）：
+        # pywraplp没有求解回调，取不到调用内部找到首个可行解的时刻，因此这是该时刻的上界，
+        # 只有把求解切成较短的时间片（如调度器、检查点续解）时才接近首个可行解的时间
+        self.first_solved_call_time: Optional[float] = None
+
+    def family(self, name: str) -> FamilyStats:
+        if name not in self.families:
+            self.families[name] = FamilyStats(name)
+        return self.families[name]
+
+    @property
+    def PeakRss(self) -> float:
+        return max([f.peak_rss for f in self.families.values() if f.peak_rss is not None], default=0.0)
+
+    def record_solve(self, wall_time: float, has_solution: bool):
+        self.solve_time += wall_time
+        if has_solution and self.first_solved_call_time is None:
+            self.first_solved_call_time = self.solve_time
+
+
+def build_stats(family: str = None):
+    """
+    记录约束族构建前后的变量数、约束数、耗时与内存
+    峰值内存需要在每族之前重置进程的峰值（写/proc/self/clear_refs，会清除所有页的引用位），
+    因此只在模型的track_peak_rss为True（低内存/有预算的构建）时记录
+    :param family: 约束族名称，默认使用方法名
+    :return:
+    """
+    def inner(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            solver = self.solver
+            v0, c0 = solver.NumVariables(), solver.NumConstraints()
+            track = getattr(self, "track_peak_rss", False)
+            if track:
+                # 重置峰值，使记录的是本阶段内的峰值
+                reset_peak_rss()
+            s_t = time.time()
+            res = func(self, *args, **kwargs)
+            stats = self.stats.family(family or func.__name__)
+            stats.build_time += time.time() - s_t
+            stats.rss_after = rss_mb()
+            if track:
+                stats.peak_rss = max(stats.peak_rss or 0.0, peak_rss_mb())
+            v1, c1 = solver.NumVariables(), solver.NumConstraints()
+            if v1 > v0:
+                stats.var_ranges.append((v0, v1))
+            if c1 > c0:
+                stats.constr_ranges.append((c0, c1))
+            return res
+        return wrapper
+    return inner
+
+
+def coef_summary(proto, ranges: List[Tuple[int, int]]) -> Dict[str, float]:
+    """
+    约束区间内的非零元数、系数绝对值范围与右端项绝对值上限（用于发现过大的大M）
+    :param proto: MPModelProto
+    :param ranges: 约束index区间
+    :return:
+    """
+    nnz, coefs, rhs = 0, [], []
+    for s, e in ranges:
+        for i in range(s, e):
+            constr = proto.constraint[i]
+            nnz += len(constr.var_index)
+            coefs.extend(constr.coefficient)
+            rhs.extend([b for b in (constr.lower_bound, constr.upper_bound) if abs(b) < 1e30])
+    coefs = np.abs(np.asarray(coefs, dtype=np.float64))
+    coefs = coefs[coefs > 0]
+    rhs = np.abs(np.asarray(rhs, dtype=np.float64))
+    return {
+        "nonzeros": nnz,
+        "coef_min": float(coefs.min()) if len(coefs) else None,
+        "coef_max": float(coefs.max()) if len(coefs) else None,
+        "rhs_max": float(rhs.max()) if len(rhs) else None
+    }
+
+
+def model_stats(model) -> Dict[str, Dict[str, object]]:
+    """
+    模型统计报告
+    :param model: 已构建（可已求解）的模型
+    :return: {"families": {族: {...}}, "total": {...}, "solver": {...}}
+             solver中的first_solved_call_time是第一次返回可行解的求解调用结束时的累计求解耗时（毫秒），
+             不是求解器内部找到首个可行解的时刻
+    """
+    proto = linear_solver_pb2.MPModelProto()
+    model.solver.ExportModelToProto(proto)
+    families = {}
+    for name, stats in model.stats.families.items():
+        d = {"vars": stats.NumVars, "constrs": stats.NumConstrs, "build_time": stats.build_time,
+             "rss_after": stats.rss_after, "peak_rss": stats.peak_rss}
+        d.update(coef_summary(proto, stats.constr_ranges))
+        families[name] = d
+    total = {"vars": len(proto.variable), "constrs": len(proto.constraint),
+             "build_time": sum([d["build_time"] for d in families.values()]),
+             "rss_after": rss_mb(), "peak_rss": max([d["peak_rss"] for d in families.values() if d["peak_rss"] is not None], default=None)}
+    total.update(coef_summary(proto, [(0, len(proto.constraint))]))
+    solver = {"status": None, "nodes": None, "iterations": None, "obj": None, "bound": None, "gap": None,
+              "solve_time": model.stats.solve_time, "first_solved_call_time": model.stats.first_solved_call_time}
+    if model.status is not None:
+        solver["status"] = model.status
+        solver["nodes"] = model.solver.nodes()
+        solver["iterations"] = model.solver.iterations()
+    if model.HasSolution:
+        obj = model.ObjValue
+        bound = model.solver.Objective().BestBound()
+        solver["obj"] = obj
+        solver["bound"] = bound
+        solver["gap"] = abs(obj - bound) / max(abs(obj), 1e-9)
+    return {"families": families, "total": total, "solver": solver}
+
+
+def print_stats(report: Dict[str, Dict[str, object]]):
+    """
+    以表格形式打印模型统计报告
+    :param report: model_stats的结果
+    :return:
+    """
+    def fmt(x):
+        if x is None:
+            return "-"
+        if isinstance(x, float):
+            return "{0:.4g}".format(x)
+        return str(x)
+
+    columns = ["vars", "constrs", "nonzeros", "coef_min", "coef_max", "rhs_max", "build_time", "peak_rss"]
+    print("{0:<22}".format("family") + "".join(["{0:>12}".format(c) for c in columns]))
+    rows = list(report["families"].items()) + [("total", report["total"])]
+    for name, d in rows:
+        print("{0:<22}".format(name) + "".join(["{0:>12}".format(fmt(d.get(c))) for c in columns]))
+    print("solver: " + ", ".join(["{0}={1}".format(k, fmt(v)) for k, v in report["solver"].items()]))
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import time
+import multiprocessing as mp
+from copy import deepcopy
+from typing import List, Dict, Tuple, Set, Optional
+
+from .model import Model, SolverStatus, pywraplp, linear_solver_pb2, np
+from moris.data.analyzer import Issue, InstanceError
+
+
+"""
+对求解器的编辑，均以变量名/约束名表示，便于在子进程中对同一模型副本重放
+("var_bounds", var_name, lb, ub)
+("row_bounds", row_name, lb, ub)
+("coef", row_name, var_name, value)
+"""
+Edit = Tuple
+
+
+class Scenario:
+    """
+    what-if场景：一组按顺序执行的变更
+    """
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.actions = []
+
+    def removeWorker(self, w: str):
+        self.actions.append(("removeWorker", (w,)))
+        return self
+
+    def addWorker(self, w: str):
+        self.actions.append(("addWorker", (w,)))
+        return self
+
+    def blockStation(self, s: str):
+        self.actions.append(("blockStation", (s,)))
+        return self
+
+    def unblockStation(self, s: str):
+        self.actions.append(("unblockStation", (s,)))
+        return self
+
+    def changeEfficiency(self, w: str, op: str, e: float):
+        self.actions.append(("changeEfficiency", (w, op, e)))
+        return self
+
+    def addFixedAssignment(self, op: str, w: str, s: str):
+        self.actions.append(("addFixedAssignment", (op, w, s)))
+        return self
+
+    def __repr__(self):
+        return "Scenario({0}, {1} actions)".format(self.name, len(self.actions))
+
+
+class WhatIfState:
+    """
+    相对原始模型的变更状态
+    """
+    __slots__ = ["absentWks", "blockedSts", "timeMap", "fixed"]
+
+    def __init__(self):
+        # 缺勤的工人
+        self.absentWks: Set[str] = set()
+        # 不可用的工位
+        self.blockedSts: Set[str] = set()
+        # 修改过的做工时间 (op, w) -> t
+        self.timeMap: Dict[Tuple[Tuple[str, str], str], float] = {}
+        # 新增的固定分配 (op, w, s)
+        self.fixed: Set[Tuple[Tuple[str, str], str, str]] = set()
+
+    def copy(self):
+        return deepcopy(self)
+
+
+def time_scale(model: Model, state: WhatIfState) -> float:
+    """
+    修改后的最长做工时间相对原最长做工时间的倍数（不小于1）；
+    最大节拍与节拍波动变量的上界（大M）都与最长做工时间成正比，按此倍数放大
+    :param model: 已构建的模型
+    :param state: 变更状态
+    :return:
+    """
+    return max([1.0] + [t / model.MaxT for t in state.timeMap.values()])
+
+
+class ScenarioBuilder:
+    """
+    根据模型的变量结构，把场景翻译为对求解器的编辑
+    """
+    def __init__(self, model: Model, state: WhatIfState):
+        self.model = model
+        self.state = state
+        self.edits: List[Edit] = []
+
+    def opKey(self, op: str) -> Tuple[str, str]:
+        """
+        工序编码 -> 模型中的工序键 (m, op)
+        :param op: 工序编码或工序键
+        :return:
+        """
+        if isinstance(op, tuple):
+            return op
+        for key in self.model.x:
+            if key[1] == op:
+                return key
+        raise KeyError("unknown operation: {0}".format(op))
+
+    def time(self, op: Tuple[str, str], w: str) -> float:
+        return self.state.timeMap.get((op, w), self.model.timeMap[(op, w)])
+
+    def isFixed(self, op, w=None, s=None) -> bool:
+        for _op, _w, _s in self.state.fixed:
+            if _op == op and (w is None or _w == w) and (s is None or _s == s):
+                return True
+        return False
+
+    def isFixedWkSt(self, w: str, s: str) -> bool:
+        """
+        工人w是否被某个固定分配固定在工位s（不限工序）
+        """
+        return any([_w == w and _s == s for _, _w, _s in self.state.fixed])
+
+    def volUb(self, w: str) -> float:
+        """
+        波动变量的上界：平均节拍按出勤人数计算，缺勤后上界随之放大
+        """
+        m = self.model
+        n = max(len([u for u in m.data_loader.listWorkers if u not in self.state.absentWks]), 1)
+        return max(m.volUb[w], m.M / n) * time_scale(m, self.state)
+
+    def refreshVolUb(self):
+        m = self.model
+        for w in m.volUb:
+            vol = m.LookupVariable("obj_{0}".format(w))
+            if vol is not None and w not in self.state.absentWks:
+                self.setVar(vol, 0, self.volUb(w))
+
+    def setVar(self, var: pywraplp.Variable, lb: float, ub: float):
+        self.edits.append(("var_bounds", var.name(), lb, ub))
+
+    def setRow(self, name: str, lb: float, ub: float):
+        self.edits.append(("row_bounds", name, lb, ub))
+
+    def refreshWorker(self, w: str):
+        """
+        根据当前状态重新设置工人w相关变量与约束的上下界
+        :param w: 工人
+        :return:
+        """
+        m = self.model
+        absent = w in self.state.absentWks
+        for op in m.x:
+            if w in m.x[op]:
+                lb = 1 if self.isFixed(op, w) else 0
+                self.setVar(m.x[op][w], lb, 0 if absent else 1)
+        for s in m.y.get(w, {}):
+            self.refreshWkSt(w, s)
+        inf = m.Inf
+        self.setRow("wk_st_lb_{0}".format(w), 0 if absent else 1, inf)
+        # 缺勤工人不参与节拍波动的统计
+        vol = m.LookupVariable("obj_{0}".format(w))
+        if vol is not None:
+            self.setVar(vol, 0, 0 if absent else self.volUb(w))
+            for row in ["vol_pos_{0}", "vol_neg_{0}", "vol_rate_{0}"]:
+                self.setRow(row.format(w), -inf, inf if absent else 0)
+
+    def refreshWkSt(self, w: str, s: str):
+        m = self.model
+        closed = w in self.state.absentWks or s in self.state.blockedSts
+        lb = 1 if self.isFixedWkSt(w, s) else 0
+        self.setVar(m.y[w][s], lb, 0 if closed else 1)
+        for op in m.var:
+            if w in m.var[op] and s in m.var[op][w]:
+                lb = 1 if self.isFixed(op, w, s) else 0
+                self.setVar(m.var[op][w][s], lb, 0 if closed else 1)
+
+    def refreshStation(self, s: str):
+        """
+        根据当前状态重新设置工位s相关变量与约束的上下界
+        :param s: 工位
+        :return:
+        """
+        m = self.model
+        blocked = s in self.state.blockedSts
+        for op in m.z:
+            if s in m.z[op]:
+                lb = 1 if self.isFixed(op, None, s) else 0
+                self.setVar(m.z[op][s], lb, 0 if blocked else 1)
+                if op in m.v and s in m.v[op]:
+                    self.setVar(m.v[op][s], lb, 0 if blocked else 1)
+        for _m in m.w.get(s, {}):
+            self.setVar(m.w[s][_m], 0, 0 if blocked else 1)
+            # 固定设备所在工位被封锁时，松弛固定设备约束
+            if m.LookupConstraint("fix_mach_{0}_{1}".format(s, _m)) is not None:
+                self.setRow("fix_mach_{0}_{1}".format(s, _m), 0 if blocked else 1, 1)
+        for w in m.y:
+            if s in m.y[w]:
+                self.refreshWkSt(w, s)
+
+    def refreshTaktCoef(self, cols: List[Tuple[Tuple[str, str], str]]):
+        """
+        重新计算节拍相关约束中x[op][w]的系数
+        avg = sum(t) / n，n为出勤人数
+        :param cols: 需要更新的(op, w)列
+        :return:
+        """
+        m = self.model
+        # 工人取自数据而非m.tt（低内存模式构建后m.tt已释放）
+        listWks = [w for w in m.data_loader.listWorkers if w not in self.state.absentWks]
+        n = max(len(listWks), 1)
+        listVolWks = [w for w in listWks if m.LookupConstraint("vol_pos_{0}".format(w)) is not None]
+        vol_rate = m.VolRate
+        for op, w in cols:
+            t = self.time(op, w)
+            name = m.x[op][w].name()
+            self.edits.append(("coef", "tt_{0}".format(w), name, t))
+            for u in listVolWks:
+                c = t * ((1 if u == w else 0) - 1 / n)
+                self.edits.append(("coef", "vol_pos_{0}".format(u), name, c))
+                self.edits.append(("coef", "vol_neg_{0}".format(u), name, -c))
+                self.edits.append(("coef", "vol_rate_{0}".format(u), name, -vol_rate * t / n))
+
+    def allCols(self) -> List[Tuple[Tuple[str, str], str]]:
+        return [(op, w) for op in self.model.x for w in self.model.x[op]]
+
+    def removeWorker(self, w: str):
+        self.state.absentWks.add(w)
+        self.refreshWorker(w)
+        self.refreshTaktCoef(self.allCols())
+        self.refreshVolUb()
+
+    def addWorker(self, w: str):
+        if w not in self.model.y:
+            raise KeyError("worker {0} is not part of the built model, rebuild required".format(w))
+        self.state.absentWks.discard(w)
+        self.refreshWorker(w)
+        self.refreshTaktCoef(self.allCols())
+        self.refreshVolUb()
+
+    def blockStation(self, s: str):
+        self.state.blockedSts.add(s)
+        self.refreshStation(s)
+
+    def unblockStation(self, s: str):
+        self.state.blockedSts.discard(s)
+        self.refreshStation(s)
+
+    def changeEfficiency(self, w: str, op: str, e: float):
+        op = self.opKey(op)
+        if w not in self.model.x[op]:
+            raise KeyError("worker {0} has no skill for {1}".format(w, op[1]))
+        m = self.model
+        self.state.timeMap[(op, w)] = m.opTime[op[1]] / e
+        self.refreshTaktCoef([(op, w)])
+        # 最大节拍与波动变量的上界随最长做工时间变化
+        self.setVar(m.max_tt, 0, m.M * time_scale(m, self.state))
+        self.refreshVolUb()
+
+    def checkFixed(self, op: Tuple[str, str], w: str, s: str):
+        """
+        新增的固定分配必须在可分配关系内（与Analyzer.checkFixedAlloc的检查一致），否则模型必然不可行
+        :return:
+        """
+        m = self.model
+        if w not in m.y or s not in m.data_loader.listStations:
+            code, message = "FIXED_UNKNOWN", "fixed assignment references unknown worker or station"
+        elif s not in m.y[w]:
+            code, message = "FIXED_WORKER_STATION", "fixed station not available to the fixed worker"
+        elif s not in m.v.get(op, {}):
+            code, message = "FIXED_OP_STATION", "fixed station not available to the operation"
+        elif w not in m.x.get(op, {}):
+            code, message = "FIXED_OP_WORKER", "fixed worker cannot do the operation"
+        else:
+            return
+        raise InstanceError([Issue(code, message, [(op[1], w, s)])])
+
+    def addFixedAssignment(self, op: str, w: str, s: str):
+        op = self.opKey(op)
+        self.checkFixed(op, w, s)
+        self.state.fixed.add((op, w, s))
+        self.refreshWorker(w)
+        self.refreshStation(s)
+
+    def build(self, scenario: Scenario) -> List[Edit]:
+        for action, args in scenario.actions:
+            getattr(self, action)(*args)
+        return self.edits
+
+
+def scenario_edits(model: Model, scenario: Scenario,
+                   state: Optional[WhatIfState] = None) -> Tuple[List[Edit], WhatIfState]:
+    """
+    把场景翻译为编辑列表，不修改模型
+    :param model: 已构建的模型
+    :param scenario: 场景
+    :param state: 当前变更状态
+    :return: (编辑列表, 执行场景后的状态)
+    """
+    state = WhatIfState() if state is None else state.copy()
+    builder = ScenarioBuilder(model, state)
+    edits = builder.build(scenario)
+    return edits, state
+
+
+def apply_edits(solver: pywraplp.Solver, edits: List[Edit]):
+    """
+    在求解器上执行编辑
+    :param solver: 求解器
+    :param edits: 编辑列表
+    :return:
+    """
+    for edit in edits:
+        kind = edit[0]
+        if kind == "var_bounds":
+            solver.LookupVariable(edit[1]).SetBounds(edit[2], edit[3])
+        elif kind == "row_bounds":
+            solver.LookupConstraint(edit[1]).SetBounds(edit[2], edit[3])
+        elif kind == "coef":
+            solver.LookupConstraint(edit[1]).SetCoefficient(solver.LookupVariable(edit[2]), edit[3])
+        else:
+            raise ValueError("unknown edit: {0}".format(kind))
+
+
+"""
+并行评估：子进程共享同一个基础模型（MPModelProto）与热启动解
+"""
+_BaseProto = None
+_BaseHint = None
+_Backend = None
+
+
+def _init_worker(proto: bytes, hint: Dict[str, float], backend: str):
+    global _BaseProto, _BaseHint, _Backend
+    _BaseProto = linear_solver_pb2.MPModelProto()
+    _BaseProto.ParseFromString(proto)
+    _BaseHint = hint
+    _Backend = backend
+
+
+def load_solver(proto: linear_solver_pb2.MPModelProto, backend: str) -> pywraplp.Solver:
+    solver = pywraplp.Solver.CreateSolver(backend)
+    solver.LoadModelFromProtoKeepNames(proto)
+    return solver
+
+
+def set_hint(solver: pywraplp.Solver, hint: Dict[str, float]):
+    list_var, list_val = [], []
+    for name, val in hint.items():
+        var = solver.LookupVariable(name)
+        if var is not None:
+            list_var.append(var)
+            list_val.append(val)
+    solver.SetHint(list_var, list_val)
+
+
+def _solve_scenario(args) -> Dict[str, object]:
+    name, edits, time_limit = args
+    s_t = time.time()
+    solver = load_solver(_BaseProto, _Backend)
+    apply_edits(solver, edits)
+    set_hint(solver, _BaseHint)
+    if time_limit is not None:
+        solver.SetTimeLimit(int(time_limit))
+    status = solver.Solve()
+    res = {"scenario": name, "status": SolverStatus.get(status, str(status)), "obj": None, "values": None}
+    if status in [pywraplp.Solver.FEASIBLE, pywraplp.Solver.OPTIMAL]:
+        res["obj"] = solver.Objective().Value()
+        # 变量顺序与基础模型相同，由主进程按模型结构读取分配
+        response = linear_solver_pb2.MPSolutionResponse()
+        solver.FillSolutionResponseProto(response)
+        res["values"] = list(response.variable_value)
+    res["time"] = time.time() - s_t
+    return res
+
+
+def evaluate_scenarios(model: Model, scenarios: List[Scenario], time_limit: int = 1000,
+                       processes: int = None) -> List[Dict[str, object]]:
+    """
+    针对同一个基础模型并行评估多个场景，以基础模型最近一次的解热启动
+    :param model: 已构建（可已求解）的模型
+    :param scenarios: 场景列表
+    :param time_limit: 每个场景的求解时间上限（毫秒）
+    :param processes: 进程数，默认CPU核数
+    :return: 每个场景的求解结果（状态、目标值、（工序编码，工人，工位）分配）
+    """
+    jobs = []
+    for scenario in scenarios:
+        edits, _ = scenario_edits(model, scenario, model.whatIfState)
+        jobs.append((scenario.name, edits, time_limit))
+    proto = linear_solver_pb2.MPModelProto()
+    model.solver.ExportModelToProto(proto)
+    init_args = (proto.SerializeToString(), model.incumbent, model.backend)
+    # polars与OR-Tools已加载（内部线程池），fork可能死锁
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=processes, initializer=_init_worker, initargs=init_args) as pool:
+        results = pool.map(_solve_scenario, jobs)
+    for res in results:
+        vals = res.pop("values")
+        res["assignment"] = [] if vals is None else \
+            [(op[1], w, s) for op, w, s in model.solutionSupport(np.asarray(vals, dtype=np.float64))]
+    return results
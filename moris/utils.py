@@ -1,10 +1,33 @@
 import os
 import json
 import time
+import sys
 import platform
+import importlib
 from functools import wraps
 
 
+__all__ = ["OpStr", "LazyModule", "get_path", "get_base_dir", "DIR", "load_data", "dump_data", "time_it",
+           "rss_mb", "peak_rss_mb", "reset_peak_rss"]
+
+
+class LazyModule:
+    """
+    延迟导入的模块：首次访问属性时才真正导入，避免仅解析算例时也加载求解器等重量级依赖
+    """
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, item):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, item)
+
+    def __repr__(self):
+        return "LazyModule({0})".format(self._name)
+
+
 class OpStr(str):
     @property
     def to_tpl(self):
@@ -25,7 +48,10 @@ def get_base_dir() -> str:
 
 class DIR:
     BaseDir = get_base_dir()
-    DataDir = get_path(BaseDir, "src", "data", "input")
+    DataDir = get_path(BaseDir, "moris", "data", "input")
+    # 训练集与输出示例
+    TrainDir = get_path(BaseDir, "训练集")
+    OutputDir = get_path(BaseDir, "输出示例")
 
 
 def load_data(filepath):
@@ -34,6 +60,11 @@ def load_data(filepath):
     return data
 
 
+def dump_data(data, filepath):
+    with open(file=filepath, mode="w", encoding="utf-8") as fp:
+        json.dump(data, fp, ensure_ascii=False)
+
+
 def time_it(module=None, logger=None):
     def inner(func):
         @wraps(func)
@@ -50,3 +81,51 @@ def time_it(module=None, logger=None):
             return res
         return wrapper
     return inner
+
+
+def _proc_status(key: str):
+    # Linux下/proc/self/status中的内存字段，单位为KB
+    try:
+        with open("/proc/self/status", mode="r") as fp:
+            for line in fp:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def rss_mb() -> float:
+    """
+    当前常驻内存（MB），无法读取时退化为峰值
+    :return:
+    """
+    kb = _proc_status("VmRSS")
+    return kb / 1024 if kb is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """
+    峰值常驻内存（MB）；Linux下读取VmHWM，可由reset_peak_rss重置，从而得到分阶段的峰值
+    :return:
+    """
+    kb = _proc_status("VmHWM")
+    if kb is not None:
+        return kb / 1024
+    import resource
+    # Linux下ru_maxrss单位为KB，macOS下为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    重置进程的峰值常驻内存（Linux 4.0+），不支持时返回False，此时峰值为进程启动以来的峰值
+    :return:
+    """
+    try:
+        with open("/proc/self/clear_refs", mode="w") as fp:
+            fp.write("5")
+        return True
+    except OSError:
+        return False
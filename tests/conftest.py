@@ -0,0 +1,39 @@
+import copy
+
+import pytest
+
+from moris.data.generator import GeneratorConfig, InstanceGenerator
+
+
+# 小规模合成算例：数据处理与预检的测试不需要求解
+SMALL = GeneratorConfig(n_stations=6, n_workers=4, n_parts=3, ops_per_part=3, n_categories=4, n_machines=4,
+                        fixed_ratio=0.25, seed=1)
+# 求解不到1秒的合成算例：求解相关的测试
+TINY = GeneratorConfig(n_stations=6, n_workers=3, n_parts=2, ops_per_part=3, n_categories=3, n_machines=3,
+                       fixed_ratio=0.25, seed=2)
+
+
+@pytest.fixture(scope="session")
+def small_instance():
+    return InstanceGenerator(SMALL).generate()
+
+
+@pytest.fixture
+def instance(small_instance):
+    # 测试可以修改的副本
+    return copy.deepcopy(small_instance)
+
+
+@pytest.fixture(scope="session")
+def tiny_instance():
+    return InstanceGenerator(TINY).generate()
+
+
+@pytest.fixture
+def tiny_model(tiny_instance):
+    # 延迟导入：数据处理的测试不加载求解器
+    from moris.data import Dataset, DataLoader
+    from moris.model import OptModel
+    model = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    model.buildModel()
+    return model
@@ -0,0 +1,59 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.data.analyzer import analyze, load_instance, InstanceError, ERROR
+
+
+def codes(data):
+    return {issue.code: issue for issue in analyze(DataLoader(Dataset.from_data(data)))}
+
+
+def test_generated_instance_has_no_errors(instance):
+    assert [issue for issue in codes(instance).values() if issue.level == ERROR] == []
+
+
+def test_duplicate_worker(instance):
+    instance["worker_list"].append(dict(instance["worker_list"][0]))
+    issue = codes(instance)["DUPLICATE_WORKER"]
+    assert issue.items == [instance["worker_list"][0]["worker_code"]]
+
+
+def test_unknown_machine(instance):
+    instance["process_list"][0]["machine_type"] = "m-unknown"
+    assert codes(instance)["UNKNOWN_MACHINE"].level == ERROR
+
+
+def test_unknown_joint_operation(instance):
+    instance["joint_operation_list"].append({"part_code": instance["process_list"][0]["part_code"],
+                                             "joint_operation": "op-unknown"})
+    assert codes(instance)["JOINT_UNKNOWN_OP"].items == ["op-unknown"]
+
+
+def clone_worker(worker, code):
+    # 工人来自技能列表中的工人编码
+    skills = ["operation_skill_list", "operation_category_skill_list"]
+    clone = {k: v for k, v in worker.items() if k not in skills}
+    clone["worker_code"] = code
+    for key in skills:
+        clone[key] = [dict(skill, worker_code=code) for skill in worker[key]]
+    return clone
+
+
+def test_workers_exceed_stations(instance):
+    worker = instance["worker_list"][0]
+    for i in range(len(instance["station_list"])):
+        instance["worker_list"].append(clone_worker(worker, "w-extra-{0}".format(i)))
+    assert "WORKERS_EXCEED_STATIONS" in codes(instance)
+
+
+def test_parse_error_is_reported():
+    data_loader, issues = load_instance({"process_list": []})
+    assert data_loader is None
+    assert [issue.code for issue in issues] == ["PARSE_ERROR"]
+
+
+def test_raise_on_error(instance):
+    instance["process_list"][0]["machine_type"] = "m-unknown"
+    with pytest.raises(InstanceError) as e:
+        analyze(DataLoader(Dataset.from_data(instance)), raise_on_error=True)
+    assert "UNKNOWN_MACHINE" in [issue.code for issue in e.value.issues]
@@ -0,0 +1,55 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model.autoconf import DefaultRules, extract_features, choose_config, match, tune_rules, save_rules, \
+    load_rules, solve_auto
+
+
+def test_match_bounds():
+    assert match({"triples": [None, 10]}, {"triples": 10})
+    assert not match({"triples": [None, 10]}, {"triples": 11})
+    assert not match({"triples": [5, None]}, {"triples": 4})
+    assert not match({"mono": [0, 1]}, {})
+    assert match({}, {})
+
+
+def test_rule_selection_by_size():
+    assert choose_config({"triples": 500})["rule"] == "small"
+    config = choose_config({"triples": 5000})
+    assert (config["rule"], config["candidate"], config["engine"]) == ("medium", "lns", "lns")
+    assert choose_config({"triples": 10 ** 6})["rule"] == "large"
+    rules = [{"name": "mono", "when": {"mono": [1, None]}, "config": "benders", "override": {"time_limit": 10}}]
+    assert choose_config({"mono": 2}, rules)["time_limit"] == 10
+    with pytest.raises(ValueError):
+        choose_config({"mono": 0}, rules)
+
+
+def test_features_and_auto_solve(tiny_instance):
+    dl = DataLoader(Dataset.from_data(tiny_instance))
+    features = extract_features(dl)
+    assert features["workers"] == 3 and features["stations"] == 6
+    assert features["max_layer"] >= 1 and features["triples"] > 0
+    res = solve_auto(dl, time_limit=10000)
+    assert res["config"]["rule"] == "small"
+    assert res["status"] == "OPTIMAL" and res["obj"] is not None
+
+
+def row(instance, candidate, obj, triples, t=1.0):
+    return {"instance": instance, "candidate": candidate, "features": {"triples": triples}, "obj": obj,
+            "build_time": 0.0, "solve_time": t}
+
+
+def test_tune_rules_prefers_found_rate_then_gap(tmp_path):
+    results = [row("a", "mip", 10.0, 100), row("a", "lns", 11.0, 100, 0.5),
+               row("b", "mip", None, 5000), row("b", "lns", 7.0, 5000), row("b", "heuristic", 8.0, 5000, 0.1)]
+    tuned = tune_rules(results)
+    assert [rule["config"] for rule in tuned] == ["mip", "lns", "heuristic"]
+    assert tuned[1]["score"] == {"found_rate": 1.0, "gap": 0.0, "time": 1.0}
+    path = str(tmp_path / "rules.json")
+    save_rules(tuned, path)
+    assert load_rules(path) == tuned
+    tuned[0]["config"] = "gurobi"
+    save_rules(tuned, path)
+    with pytest.raises(ValueError):
+        load_rules(path)
+    assert DefaultRules[0]["config"] == "mip_position"
@@ -0,0 +1,27 @@
+import pytest
+
+from moris.model.benders import LogicBenders
+
+
+def test_benders_bound_and_gap(tiny_model):
+    res = tiny_model.solveBenders(time_limit=3000, sub_time_limit=1000)
+    assert res["obj"] is not None
+    assert res["bound"] <= res["obj"]
+    assert res["gap"] == pytest.approx((res["obj"] - res["bound"]) / res["obj"])
+    assert all([h["lb"] <= h["ub"] for h in res["history"] if h["ub"] is not None])
+    assert tiny_model.HasSolution
+    assert tiny_model.WeightedObjValue == pytest.approx(res["obj"], rel=1e-6)
+
+
+def test_bound_never_exceeds_incumbent(tiny_model):
+    benders = LogicBenders(tiny_model)
+    benders.lb = 5.0
+    assert benders.Bound == 5.0
+    # nogood割排除了当前最好放置后，主问题的下界可能超过上界
+    benders.ub = 4.0
+    assert benders.Bound == 4.0
+    # 子问题未定论之后主问题的下界不再成立，保留此前的下界
+    benders.lb = 3.0
+    benders.inexact()
+    benders.lb = 3.5
+    assert benders.Bound == 3.0 and not benders.exact
@@ -0,0 +1,61 @@
+import os
+import copy
+
+from moris.data.cache import ResultCache, instance_hash
+
+
+CONFIG = {"backend": "SCIP", "mode": "weighted"}
+RESULT = {"dispatch_results": [{"operation": "op-1"}], "obj": 1.0, "status": "OPTIMAL"}
+
+
+def test_hash_ignores_list_order(instance):
+    shuffled = copy.deepcopy(instance)
+    shuffled["worker_list"].reverse()
+    shuffled["process_list"].reverse()
+    shuffled["worker_list"][0]["operation_skill_list"].reverse()
+    assert instance_hash(shuffled) == instance_hash(instance)
+    shuffled["config_param"]["volatility_rate"] += 0.1
+    assert instance_hash(shuffled) != instance_hash(instance)
+
+
+def test_put_get(tmp_path, instance):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get(instance, CONFIG) is None
+    cache.put(instance, CONFIG, RESULT)
+    entry = cache.get(instance, CONFIG)
+    assert entry["obj"] == 1.0
+    assert entry["dispatch_results"] == RESULT["dispatch_results"]
+    assert cache.get(instance, dict(CONFIG, mode="lexico")) is None
+
+
+def test_evict_least_recently_used(tmp_path, instance):
+    cache = ResultCache(str(tmp_path), max_entries=2)
+    configs = [dict(CONFIG, seed=i) for i in range(3)]
+    cache.put(instance, configs[0], RESULT)
+    cache.put(instance, configs[1], RESULT)
+    # 访问时间即文件修改时间：第0个条目较新
+    os.utime(cache.path(cache.key(instance, configs[1])), (1, 1))
+    os.utime(cache.path(cache.key(instance, configs[0])), (2, 2))
+    cache.put(instance, configs[2], RESULT)
+    assert len(cache.entries()) == 2
+    assert cache.get(instance, configs[1]) is None
+    assert cache.get(instance, configs[0]) is not None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path, instance):
+    cache = ResultCache(str(tmp_path))
+    with open(cache.path(cache.key(instance, CONFIG)), mode="w") as fp:
+        fp.write("{")
+    assert cache.get(instance, CONFIG) is None
+
+
+def test_nearest_same_plant(tmp_path, instance):
+    cache = ResultCache(str(tmp_path))
+    cache.put(instance, CONFIG, RESULT)
+    similar = copy.deepcopy(instance)
+    similar["process_list"] = similar["process_list"][:-1]
+    assert cache.nearest(similar, min_similarity=0.8)["obj"] == 1.0
+    assert cache.nearest(similar, min_similarity=0.95) is None
+    other = copy.deepcopy(instance)
+    other["station_list"] = other["station_list"][:-1]
+    assert cache.nearest(other) is None
@@ -0,0 +1,70 @@
+import json
+import time
+
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+from moris.model.model import Model, pywraplp
+
+
+def read(path):
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def fresh(instance):
+    model = OptModel(DataLoader(Dataset.from_data(instance)))
+    model.buildModel()
+    return model
+
+
+def test_checkpoint_records_best_and_bound(tmp_path, tiny_model):
+    path = str(tmp_path / "ckpt.json")
+    status = tiny_model.solveWithCheckpoint(path, time_limit=10000, interval=2000)
+    assert status == pywraplp.Solver.OPTIMAL
+    data = read(path)
+    assert data["obj"] == pytest.approx(tiny_model.ObjValue)
+    assert data["best_status"] == "OPTIMAL"
+    assert data["bound"] <= data["obj"] + 1e-6
+    assert tiny_model.get_dispatch_results()["dispatch_results"]
+
+
+def test_resume_after_time_limit_loads_best(tmp_path, tiny_instance):
+    path = str(tmp_path / "ckpt.json")
+    model = fresh(tiny_instance)
+    model.solveWithCheckpoint(path, time_limit=10000, interval=2000)
+    data = read(path)
+    # 检查点已用完时间上限：不再求解，直接载入检查点中的解
+    model = fresh(tiny_instance)
+    assert model.solveWithCheckpoint(path, time_limit=int(data["elapsed"] / 2)) == pywraplp.Solver.OPTIMAL
+    assert model.ObjValue == pytest.approx(data["obj"])
+    assert model.WeightedObjValue == pytest.approx(data["obj"])
+    assert len(model.get_dispatch_results()["dispatch_results"]) > 0
+
+
+def test_last_slice_without_solution_keeps_best(tmp_path, tiny_instance, monkeypatch):
+    path = str(tmp_path / "ckpt.json")
+    model = fresh(tiny_instance)
+    model.solveWithCheckpoint(path, time_limit=10000, interval=2000)
+    data = read(path)
+
+    def not_solved(self, time_limit=None):
+        # 时间片用完仍没有解
+        time.sleep(time_limit / 1000)
+        self.status = pywraplp.Solver.NOT_SOLVED
+        return self.status
+
+    monkeypatch.setattr(Model, "solveModel", not_solved)
+    model = fresh(tiny_instance)
+    status = model.solveWithCheckpoint(path, time_limit=int(data["elapsed"]) + 100)
+    assert status == pywraplp.Solver.OPTIMAL
+    assert model.ObjValue == pytest.approx(data["obj"])
+    assert read(path)["slices"] == data["slices"] + 1
+
+
+def test_checkpoint_of_another_instance(tmp_path, tiny_model, small_instance):
+    path = str(tmp_path / "ckpt.json")
+    tiny_model.solveWithCheckpoint(path, time_limit=10000, interval=2000)
+    with pytest.raises(ValueError):
+        fresh(small_instance).solveWithCheckpoint(path, time_limit=10000)
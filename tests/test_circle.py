@@ -0,0 +1,31 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+from moris.model.model import pywraplp
+
+
+@pytest.mark.parametrize("formulation", ["full", "compact"])
+def test_position_and_index_forms_agree(tiny_instance, formulation):
+    objs = {}
+    for circle in ["index", "position"]:
+        model = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+        model.buildModel(circle=circle, low_memory=formulation == "compact")
+        assert model.formulation == formulation
+        assert model.solveModel(time_limit=20000) == pywraplp.Solver.OPTIMAL
+        objs[circle] = model.WeightedObjValue
+    assert objs["position"] == pytest.approx(objs["index"], rel=1e-6)
+
+
+def test_position_solution_is_feasible_for_index_form(tiny_instance):
+    position = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    position.buildModel(circle="position")
+    assert position.solveModel(time_limit=20000) == pywraplp.Solver.OPTIMAL
+    index = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    index.buildModel(circle="index")
+    # 固定x、y、z、w为position形式的解，index形式仍可行且目标值相同
+    for name, val in position.DecisionIncumbent.items():
+        var = index.LookupVariable(name)
+        var.SetBounds(round(val), round(val))
+    assert index.solveModel(time_limit=20000) == pywraplp.Solver.OPTIMAL
+    assert index.WeightedObjValue == pytest.approx(position.WeightedObjValue, rel=1e-6)
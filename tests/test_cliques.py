@@ -0,0 +1,8 @@
+from moris.model.cliques import mono_cliques
+
+
+def test_mono_cliques():
+    assert mono_cliques(["a", "b"], []) == []
+    assert mono_cliques(["M1"], ["M1"]) == []
+    assert mono_cliques(["M1", "M2"], ["M1", "M2"]) == [["M1", "M2"]]
+    assert mono_cliques(["a", "M1", "b", "M2"], ["M1", "M2"]) == [["M1", "M2", "a"], ["M1", "M2", "b"]]
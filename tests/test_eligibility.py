@@ -0,0 +1,55 @@
+import numpy as np
+
+from moris.data import Dataset, DataLoader
+from moris.data.eligibility import CSR
+
+
+def test_csr_from_pairs_sorts_columns_per_row():
+    csr = CSR.fromPairs(["a", "b", "c"], ["x", "y", "z"], [2, 0, 0, 2], [1, 2, 0, 0])
+    assert csr.indptr.tolist() == [0, 2, 2, 4]
+    assert csr.row(0).tolist() == [0, 2]
+    assert csr.row(1).tolist() == []
+    assert csr.row(2).tolist() == [0, 1]
+    assert csr.nnz == 4
+
+
+def test_csr_to_dict_skips_empty_rows():
+    csr = CSR.fromPairs(["a", "b", "c"], ["x", "y", "z"], [2, 0, 0, 2], [1, 2, 0, 0])
+    assert csr.toDict() == {"a": ["x", "z"], "c": ["x", "y"]}
+
+
+def test_csr_transpose():
+    csr = CSR.fromPairs(["a", "b"], ["x", "y", "z"], [0, 0, 1], [0, 2, 2])
+    assert csr.transpose().toDict() == {"x": ["a"], "z": ["a", "b"]}
+    back = csr.transpose().transpose()
+    assert np.array_equal(back.indptr, csr.indptr)
+    assert np.array_equal(back.indices, csr.indices)
+
+
+def test_eligibility_views(instance):
+    dl = DataLoader(Dataset.from_data(instance))
+    elig = dl.eligibility
+    # 工位按产线顺序划分为不带固定设备与带固定设备的工位
+    assert sorted(elig.listMoveSt + elig.listFixSt) == sorted(dl.listStations)
+    assert [s for s in dl.listStations if s in elig.listMoveSt] == elig.listMoveSt
+    assert elig.listFixSt
+    # dict视图与CSR一致，工人 -> 工序与工序 -> 工人互为转置
+    opToWks = dl.opToAvailWks
+    assert sum([len(wks) for wks in opToWks.values()]) == elig.opToWks.nnz
+    wkToOps = {}
+    for (_, op), wks in opToWks.items():
+        for w in wks:
+            wkToOps.setdefault(w, []).append(op)
+    assert {w: sorted(set(ops)) for w, ops in wkToOps.items()} == \
+        {w: sorted(ops) for w, ops in dl.wkToAvailOps.items()}
+    # 视图缓存
+    assert dl.opToAvailSts is dl.opToAvailSts
+
+
+def test_fixed_stations_only_hold_fixed_machines(instance):
+    dl = DataLoader(Dataset.from_data(instance))
+    movable = {m["machine_type"] for m in instance["machine_list"] if m["is_movable"]}
+    fixSts = set(dl.listFixSt)
+    for s in instance["station_list"]:
+        fixed = [m for m in s["curr_machine_list"] if m["machine_type"] not in movable]
+        assert (s["station_code"] in fixSts) == bool(fixed)
@@ -0,0 +1,24 @@
+from moris.data import Dataset, DataLoader
+from moris.graph import Graph
+from moris.model import OptModel
+
+
+def parts(instance):
+    return sorted({p["part_code"] for p in instance["process_list"]})
+
+
+def test_every_part_is_in_a_layer(instance):
+    graph = Graph(DataLoader(Dataset.from_data(instance)).graph)
+    layers = [layer for layer in graph]
+    assert sorted([part for layer in layers for part in layer]) == parts(instance)
+    # 最后一层为终点工件
+    assert graph.MaxLayer > 1 and layers[-1]
+
+
+def test_no_joint_operations(instance):
+    instance["joint_operation_list"] = []
+    model = OptModel(DataLoader(Dataset.from_data(instance)))
+    assert [layer for layer in model.graph] == [parts(instance)]
+    model.buildModel()
+    assert sorted(model.iterParts()) == parts(instance)
+    assert sorted(model.opToIdx) == sorted([p["operation"] for p in instance["process_list"]])
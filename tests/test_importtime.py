@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from moris.commands.importtime import ImportBudget, measure_import
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 取多次测量的最小值，减少机器负载带来的波动
+REPEAT = 3
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    # 子进程以当前目录导入moris
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.mark.parametrize("module", list(ImportBudget))
+def test_import_within_budget(module):
+    cost = min([measure_import(module)[0] for _ in range(REPEAT)])
+    assert cost > 0, "no importtime entry for {0}".format(module)
+    assert cost <= ImportBudget[module], "import {0} took {1:.1f}ms, budget {2}ms".format(
+        module, cost, ImportBudget[module])
+
+
+@pytest.mark.parametrize("module", list(ImportBudget))
+def test_no_eager_heavy_imports(module):
+    _, loaded = measure_import(module)
+    assert loaded == [], "import {0} eagerly loaded {1}".format(module, ", ".join(loaded))
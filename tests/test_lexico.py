@@ -0,0 +1,28 @@
+import pytest
+
+from moris.model.model import pywraplp
+from moris.model.opt import LEX_TOL
+
+
+def test_lexico_takt_not_worse_than_weighted(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    weighted_tt = tiny_model.max_tt.solution_value()
+    weighted_obj = tiny_model.WeightedObjValue
+    tiny_model.minObj("lexico")
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    lexico_tt = tiny_model.max_tt.solution_value()
+    assert lexico_tt <= weighted_tt * (1 + LEX_TOL) + 1e-6
+    assert tiny_model.WeightedObjValue >= weighted_obj - 1e-6
+    # 再次求解时恢复第一阶段的目标与最大节拍上界
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert tiny_model.max_tt.solution_value() == pytest.approx(lexico_tt, rel=LEX_TOL, abs=1e-6)
+    # 切回加权模式时不再保留第二阶段的上界
+    tiny_model.minObj("weighted")
+    assert tiny_model.max_tt.ub() == tiny_model.TaktUb
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert tiny_model.WeightedObjValue == pytest.approx(weighted_obj, rel=1e-6)
+
+
+def test_unknown_mode(tiny_model):
+    with pytest.raises(ValueError):
+        tiny_model.minObj("pareto")
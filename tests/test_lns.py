@@ -0,0 +1,29 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+
+
+def test_lns_improves_a_constructed_start(instance):
+    model = OptModel(DataLoader(Dataset.from_data(instance)))
+    model.buildModel()
+    start = model.relaxAndRound(rounds=3)
+    assert start["obj"] is not None
+    res = model.solveLNS(time_limit=3000, sub_time_limit=500, seed=1)
+    assert res["iterations"] > 0
+    assert start["bound"] - 1e-6 <= res["obj"] <= start["obj"] + 1e-6
+    objs = [h["obj"] for h in res["history"]]
+    assert objs == sorted(objs, reverse=True)
+    # 最好解写回求解器
+    assert model.HasSolution
+    assert model.WeightedObjValue == pytest.approx(res["obj"], rel=1e-6)
+
+
+def test_lns_from_lexico_compares_weighted(tiny_model):
+    tiny_model.minObj("lexico")
+    tiny_model.solveModel(time_limit=10000)
+    lexico = tiny_model.WeightedObjValue
+    res = tiny_model.solveLNS(time_limit=1000, sub_time_limit=200)
+    assert tiny_model.mode == "weighted"
+    assert res["obj"] <= lexico + 1e-6
+    assert tiny_model.ObjValue == pytest.approx(res["obj"], rel=1e-6)
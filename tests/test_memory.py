@@ -0,0 +1,41 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+from moris.model.model import pywraplp
+from moris.model.memory import choose_formulation, estimate_build_mb, check_budget
+from moris.utils import rss_mb
+
+
+def test_choose_formulation_by_budget(tiny_instance):
+    dl = DataLoader(Dataset.from_data(tiny_instance))
+    est = estimate_build_mb(dl)
+    assert est["compact"] < est["full"]
+    base = rss_mb()
+    assert choose_formulation(dl, base + est["full"] + 100) == "full"
+    assert choose_formulation(dl, base + (est["full"] + est["compact"]) / 2) == "compact"
+    with pytest.raises(MemoryError):
+        choose_formulation(dl, base / 2)
+
+
+def test_build_over_budget_fails_before_building(tiny_instance):
+    model = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    with pytest.raises(MemoryError):
+        model.buildModel(memory_budget=1)
+    assert model.solver.NumVariables() == 0
+
+
+def test_low_memory_build_matches_full(tiny_model, tiny_instance):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    model = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    model.buildModel(low_memory=True)
+    assert model.formulation == "compact" and model.track_peak_rss and not model.var
+    assert model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert model.WeightedObjValue == pytest.approx(tiny_model.WeightedObjValue, rel=1e-6)
+    assert len(model.solutionSupport()) == len(tiny_model.solutionSupport())
+
+
+def test_check_budget():
+    with pytest.raises(MemoryError):
+        check_budget("addObj2", rss_mb() / 2)
+    check_budget("addObj2", None)
@@ -0,0 +1,68 @@
+import copy
+
+from moris.data import Dataset, DataLoader
+from moris.data.plant import PlantData, SharedPlant, MasterKeys, split_instance, attach_plant, group_by_plant
+from moris.model.runner import solve_batch
+
+
+def test_split_instance_round_trip(instance):
+    master, rest = split_instance(instance)
+    assert sorted(master) == sorted(MasterKeys)
+    assert not set(master) & set(rest)
+    assert dict(rest, **master) == instance
+    plant = PlantData.fromData(instance)
+    # 只含算例自身数据的算例补全主数据，完整的算例原样返回
+    assert plant.complete(rest) == instance
+    assert plant.complete(instance) is instance
+
+
+def sorted_values(d):
+    return {k: sorted(v) for k, v in d.items()}
+
+
+def test_plant_dataset_matches_direct_parse(instance):
+    plant = PlantData.fromData(instance)
+    shared = DataLoader(plant.dataset(split_instance(instance)[1]))
+    direct = DataLoader(Dataset.from_data(instance))
+    assert shared.listStations == direct.listStations
+    assert shared.listFixSt == direct.listFixSt
+    # 可选工人的顺序来自polars去重，不保证一致
+    for view in ["opToAvailWks", "wkToAvailOps"]:
+        assert sorted_values(getattr(shared, view)) == sorted_values(getattr(direct, view))
+
+
+def test_plant_bytes_and_shared_memory_round_trip(instance):
+    plant = PlantData.fromData(instance)
+    other = PlantData.fromBytes(plant.toBytes())
+    assert other.key == plant.key
+    assert other.lists == plant.lists
+    assert all([other.frames[name].frame_equal(df) for name, df in plant.frames.items()])
+    shared = SharedPlant(plant)
+    try:
+        other = attach_plant(shared.handle)
+    finally:
+        shared.close()
+    assert other.key == plant.key
+    assert all([other.frames[name].frame_equal(df) for name, df in plant.frames.items()])
+
+
+def test_group_by_plant(instance):
+    same = copy.deepcopy(instance)
+    same["process_list"] = same["process_list"][:-1]
+    other = copy.deepcopy(instance)
+    other["station_list"] = other["station_list"][:-1]
+    broken = {k: v for k, v in instance.items() if k != "worker_list"}
+    keys, plants, issues = group_by_plant([instance, same, other, broken])
+    # 工序不同但主数据相同的算例共享一个工厂
+    assert keys[0] == keys[1] != keys[2]
+    assert keys[3] is None
+    assert set(plants) == set(keys[:3])
+    assert [issue.code for issue in issues[3]] == ["PARSE_ERROR"]
+
+
+def test_solve_batch_in_process(tiny_instance):
+    broken = {k: v for k, v in tiny_instance.items() if k != "worker_list"}
+    results = solve_batch([tiny_instance, broken, tiny_instance], time_limit=20000, processes=1)
+    assert [res["status"] for res in results] == ["OPTIMAL", "INVALID", "OPTIMAL"]
+    assert results[0]["plant"] == results[2]["plant"] and results[1]["plant"] is None
+    assert results[0]["obj"] == results[2]["obj"]
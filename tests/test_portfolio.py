@@ -0,0 +1,25 @@
+import pytest
+
+from moris.model.model import pywraplp
+from moris.model.portfolio import PortfolioConfig, run_portfolio
+
+
+def test_solver_specific_params():
+    assert PortfolioConfig("a", "SCIP", seed=2, symmetry=False).SolverSpecificParams == \
+        "randomization/randomseedshift = 2\npropagating/symmetry/freq = -1"
+    assert PortfolioConfig("b", "CP_SAT", seed=1).SolverSpecificParams == "random_seed:1"
+    assert PortfolioConfig("a", "SCIP").Exact and not PortfolioConfig("b", "CP_SAT").Exact
+
+
+def test_portfolio_loads_the_weighted_best(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    optimum = tiny_model.WeightedObjValue
+    configs = [PortfolioConfig("scip", "SCIP"), PortfolioConfig("cpsat-lexico", "CP_SAT", mode="lexico")]
+    res = run_portfolio(tiny_model, configs, time_limit=30000)
+    assert res["config"] in ["scip", "cpsat-lexico"]
+    assert res["obj"] == pytest.approx(optimum, rel=1e-4)
+    assert res["bound"] is None or res["bound"] <= res["obj"] + 1e-6
+    # 回写后求解器的目标值为加权目标
+    assert tiny_model.HasSolution
+    assert tiny_model.ObjValue == pytest.approx(res["obj"])
+    assert tiny_model.WeightedObjValue == pytest.approx(res["obj"], rel=1e-6)
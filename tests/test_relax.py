@@ -0,0 +1,27 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+from moris.model.model import pywraplp
+
+
+def test_lp_bound_below_optimum(tiny_model):
+    res = tiny_model.relaxAndRound(rounds=1)
+    assert res["lp_status"] == "OPTIMAL"
+    tiny_model.resetSolve()
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert res["bound"] <= tiny_model.WeightedObjValue + 1e-6
+
+
+def test_rounding_gives_a_feasible_solution(instance):
+    model = OptModel(DataLoader(Dataset.from_data(instance)))
+    model.buildModel()
+    res = model.relaxAndRound(rounds=3)
+    assert res["constructed"] > 0
+    assert res["bound"] <= res["obj"] + 1e-6
+    assert res["gap"] == pytest.approx((res["obj"] - res["bound"]) / res["obj"])
+    # 最好的取整解写回求解器
+    assert model.HasSolution
+    assert model.WeightedObjValue == pytest.approx(res["obj"], rel=1e-6)
+    ops = [op["operation"] for r in model.get_dispatch_results()["dispatch_results"] for op in r["operation_list"]]
+    assert sorted(ops) == sorted([p["operation"] for p in instance["process_list"]])
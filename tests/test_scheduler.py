@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from moris.model.model import pywraplp
+from moris.model.scheduler import BudgetJob, BudgetScheduler, schedule_instances, INIT_SLICE, MIN_SLICE
+
+
+def result(obj=None, bound=None, status=pywraplp.Solver.FEASIBLE, **kwargs):
+    res = {"status": status, "obj": obj, "bound": bound, "incumbent": {"x": 1} if obj is not None else None,
+           "dispatch_results": [], "time": 100.0}
+    res.update(kwargs)
+    return res
+
+
+def test_budget_job_update():
+    job = BudgetJob("a", {})
+    assert job.ExpectedGain == float("inf")
+    job.update(result(status=pywraplp.Solver.NOT_SOLVED, constructed=False))
+    assert (job.obj, job.misses, job.stale, job.constructed) == (None, 1, 1, False)
+    job.update(result(obj=10.0, bound=4.0))
+    assert (job.obj, job.misses, job.stale) == (10.0, 0, 0)
+    assert job.Gap == pytest.approx(0.6)
+    assert job.ExpectedGain == pytest.approx(6.0)
+    # 未改进：保留最好解与最大的下界，预期改进量衰减
+    job.update(result(obj=12.0, bound=3.0))
+    assert (job.obj, job.bound, job.stale) == (10.0, 4.0, 1)
+    assert job.ExpectedGain == pytest.approx(3.0)
+    assert job.status == pywraplp.Solver.FEASIBLE and not job.done
+    # 最好解达到下界时不再调度
+    job.update(result(obj=8.0, bound=8.0))
+    assert job.done and job.status == pywraplp.Solver.OPTIMAL
+    assert job.used == 400.0 and job.slices == 4
+    assert [h["obj"] for h in job.to_dict()["history"]] == [None, 10.0, 10.0, 8.0]
+
+
+def test_budget_job_optimal_status_finishes():
+    job = BudgetJob("a", {})
+    job.update(result(obj=5.0, status=pywraplp.Solver.OPTIMAL))
+    assert job.done
+    assert job.to_dict()["status"] == "OPTIMAL"
+
+
+def test_pick_fresh_then_unsolved_then_gain():
+    scheduler = BudgetScheduler({"a": {}, "b": {}, "c": {}}, deadline=time.time() + 60, cores=1)
+    a, b, c = scheduler.jobs
+    assert scheduler.pick() is a
+    a.update(result(obj=10.0, bound=9.0))
+    b.update(result(obj=10.0, bound=5.0))
+    assert scheduler.pick() is c
+    c.update(result(status=pywraplp.Solver.NOT_SOLVED))
+    # 没有可行解的算例优先，其次是预期改进量最大的算例
+    assert scheduler.pick() is c
+    c.done = True
+    assert scheduler.pick() is b
+    b.done = a.done = True
+    assert scheduler.pick() is None
+
+
+def test_slice_lengths():
+    scheduler = BudgetScheduler({"a": {}, "b": {}}, deadline=time.time() + 60, cores=1)
+    a, _ = scheduler.jobs
+    assert scheduler.sliceFor(a) == INIT_SLICE
+    a.update(result(obj=10.0, bound=5.0))
+    assert scheduler.sliceFor(a) == MIN_SLICE
+    # 连续未改进时加倍
+    a.update(result(obj=10.0, bound=5.0))
+    assert scheduler.sliceFor(a) == 2 * MIN_SLICE
+    # 时间片不超过剩余时间
+    scheduler.deadline = time.time() + 3
+    assert scheduler.sliceFor(a) <= 1000
+
+
+def test_schedule_instances(tiny_instance):
+    res = schedule_instances({"a": tiny_instance, "b": tiny_instance}, deadline=time.time() + 60, cores=1)
+    assert [r["name"] for r in res] == ["a", "b"]
+    for r in res:
+        assert r["status"] == "OPTIMAL" and r["error"] is None
+        assert r["dispatch_results"]
+    assert res[0]["obj"] == pytest.approx(res[1]["obj"])
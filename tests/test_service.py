@@ -0,0 +1,80 @@
+import json
+import asyncio
+
+import pytest
+
+from moris.commands.service import Service, QUEUED, CANCELLED, DONE
+
+
+@pytest.fixture
+def service():
+    # 不启动求解进程，只测试请求路由与任务队列
+    service = Service(workers=0, queue_size=2, default_time_limit=1000, max_history=1)
+    service.queue = asyncio.Queue(maxsize=service.queue_size)
+    return service
+
+
+def post(service, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    return service.route("POST", "/jobs", body)
+
+
+def test_health(service):
+    code, res = service.route("GET", "/health", b"")
+    assert code == 200
+    assert res["queue_size"] == 2
+
+
+@pytest.mark.parametrize("body", [b"{", b"[1, 2]", json.dumps({"time_limit": 1000}).encode("utf-8")])
+def test_reject_bad_body(service, body):
+    code, res = post(service, body)
+    assert code == 400
+
+
+@pytest.mark.parametrize("params", [{"time_limit": 0}, {"time_limit": -5}, {"time_limit": "1000"},
+                                    {"time_limit": 1.5}, {"time_limit": True}, {"backend": "GUROBI"},
+                                    {"mode": "pareto"}])
+def test_reject_bad_params(service, small_instance, params):
+    code, res = post(service, dict(params, instance=small_instance))
+    assert code == 400
+    assert service.queue.qsize() == 0
+
+
+def test_submit_status_cancel(service, small_instance):
+    code, res = post(service, {"instance": small_instance, "time_limit": 500, "backend": "CP_SAT"})
+    assert code == 202
+    job_id = res["job_id"]
+    assert service.jobs[job_id].params == {"time_limit": 500, "backend": "CP_SAT"}
+    code, res = service.route("GET", "/jobs/" + job_id, b"")
+    assert (code, res["status"]) == (200, QUEUED)
+    code, _ = service.route("GET", "/jobs/{0}/result".format(job_id), b"")
+    assert code == 409
+    code, res = service.route("DELETE", "/jobs/" + job_id, b"")
+    assert (code, res["status"]) == (200, CANCELLED)
+
+
+def test_default_time_limit_and_bare_instance(service, small_instance):
+    code, res = post(service, small_instance)
+    assert code == 202
+    assert service.jobs[res["job_id"]].time_limit == 1000
+
+
+def test_queue_full(service, small_instance):
+    for _ in range(service.queue_size):
+        assert post(service, small_instance)[0] == 202
+    assert post(service, small_instance)[0] == 503
+
+
+def test_unknown_routes(service):
+    assert service.route("GET", "/jobs/nope", b"")[0] == 404
+    assert service.route("GET", "/other", b"")[0] == 404
+
+
+def test_prune_keeps_recent_history(service, small_instance):
+    ids = [post(service, small_instance)[1]["job_id"] for _ in range(2)]
+    # 状态已更新但结束时间尚未写入的任务也可以淘汰
+    service.jobs[ids[0]].status = DONE
+    service.jobs[ids[1]].status = DONE
+    service.jobs[ids[1]].finished = service.jobs[ids[1]].submitted + 1
+    service.prune()
+    assert list(service.jobs) == [ids[1]]
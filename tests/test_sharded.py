@@ -0,0 +1,46 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+from moris.model.model import pywraplp
+from moris.model.sharded import Shard, chunks, assign, build_sharded, usable_processes
+
+
+def test_chunks_keep_order_and_costs():
+    items = list("abcdefg")
+    costs = [1, 1, 1, 1, 1, 1, 4]
+    res = chunks(items, costs, 3)
+    assert len(res) <= 3
+    assert [x for chunk, _ in res for x in chunk] == items
+    assert [cost for _, cost in res] == [sum(costs[items.index(x)] for x in chunk) for chunk, _ in res]
+    assert chunks(items, costs, 1) == [(items, 10.0)]
+
+
+def test_assign_balances_longest_first():
+    shards = [Shard("f", "m", cost=c) for c in [5, 4, 3, 3, 2, 1]]
+    groups = assign(shards, 2)
+    assert sorted([sum([s.cost for s in g]) for g in groups]) == [9, 9]
+    # 分片少于进程数时不返回空的组
+    assert len(assign(shards[:2], 4)) == 2
+
+
+def test_usable_processes(monkeypatch):
+    monkeypatch.setattr("moris.model.sharded.mp.cpu_count", lambda: 1)
+    assert usable_processes(4) == 1
+    assert usable_processes(None) == 1
+    monkeypatch.setattr("moris.model.sharded.mp.cpu_count", lambda: 8)
+    assert usable_processes(4) == 4
+
+
+def test_sharded_build_matches_serial(tiny_instance):
+    serial = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    serial.buildModel()
+    sharded = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    # 直接调用分片构建：单核机器上buildModel会退回串行构建
+    build_sharded(sharded, processes=2)
+    sharded.minObj()
+    assert sharded.solver.NumVariables() == serial.solver.NumVariables()
+    assert sharded.solver.NumConstraints() == serial.solver.NumConstraints()
+    for model in [serial, sharded]:
+        assert model.solveModel(time_limit=20000) == pywraplp.Solver.OPTIMAL
+    assert sharded.WeightedObjValue == pytest.approx(serial.WeightedObjValue, rel=1e-6)
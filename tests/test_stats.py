@@ -0,0 +1,36 @@
+import pytest
+
+from moris.data import Dataset, DataLoader
+from moris.model import OptModel
+from moris.model.model import pywraplp
+
+
+def test_families_add_up_to_the_model(tiny_model):
+    report = tiny_model.modelStats()
+    families = report["families"]
+    # 只统计构建约束族的方法（生成器iterParts不计入）
+    assert "iterParts" not in families
+    assert {"create_var", "addVarConstr", "addCircleConstr", "addObj1"} <= set(families)
+    assert sum([d["vars"] for d in families.values()]) == report["total"]["vars"]
+    assert sum([d["constrs"] for d in families.values()]) == report["total"]["constrs"]
+    assert all([d["peak_rss"] is None for d in families.values()])
+    assert report["solver"]["status"] is None and report["solver"]["first_solved_call_time"] is None
+
+
+def test_solver_stats_after_solve(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    solver = tiny_model.modelStats()["solver"]
+    assert solver["obj"] == pytest.approx(tiny_model.ObjValue)
+    assert solver["gap"] == pytest.approx(0.0, abs=1e-6)
+    assert 0 < solver["first_solved_call_time"] <= solver["solve_time"]
+    tiny_model.resetSolve()
+    tiny_model.solveModel(time_limit=10000)
+    assert tiny_model.stats.first_solved_call_time < tiny_model.stats.solve_time
+
+
+def test_peak_rss_only_for_low_memory_builds(tiny_instance):
+    model = OptModel(DataLoader(Dataset.from_data(tiny_instance)))
+    model.buildModel(low_memory=True)
+    report = model.modelStats()
+    assert all([d["peak_rss"] is not None for d in report["families"].values()])
+    assert report["total"]["peak_rss"] == max([d["peak_rss"] for d in report["families"].values()])
@@ -0,0 +1,71 @@
+import pytest
+
+from moris.model.model import pywraplp
+from moris.model.whatif import Scenario, scenario_edits, evaluate_scenarios
+
+
+def stations(model):
+    return {s for _, _, s in model.solutionSupport()}
+
+
+def free_station(model):
+    fixed = {s for _, _, _, s in model.data_loader.fixed_alloc}
+    return sorted(stations(model) - fixed)[0]
+
+
+def test_scenario_edits_do_not_touch_the_model(tiny_model):
+    s = tiny_model.data_loader.listStations[0]
+    state = tiny_model.whatIfState
+    edits, new_state = scenario_edits(tiny_model, Scenario().blockStation(s), state)
+    assert edits and s in new_state.blockedSts
+    assert tiny_model.whatIfState is state and not state.blockedSts
+    assert all([tiny_model.solver.LookupVariable(e[1]).ub() == 1 for e in edits if e[0] == "var_bounds"])
+
+
+def test_block_and_unblock_station(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    obj = tiny_model.WeightedObjValue
+    s = free_station(tiny_model)
+    tiny_model.blockStation(s)
+    assert tiny_model.reSolve(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert s not in stations(tiny_model)
+    assert tiny_model.WeightedObjValue >= obj - 1e-6
+    tiny_model.unblockStation(s)
+    assert tiny_model.reSolve(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert tiny_model.WeightedObjValue == pytest.approx(obj, rel=1e-6)
+
+
+def test_change_efficiency(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    obj = tiny_model.WeightedObjValue
+    op, w, _ = tiny_model.solutionSupport()[0]
+    # 效率降低只会使最优目标变差
+    tiny_model.changeEfficiency(w, op[1], 0.1)
+    assert tiny_model.reSolve(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert tiny_model.WeightedObjValue > obj
+
+
+def test_evaluate_scenarios_matches_in_place(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    s = free_station(tiny_model)
+    results = evaluate_scenarios(tiny_model, [Scenario("base"), Scenario("block").blockStation(s)],
+                                 time_limit=10000, processes=1)
+    assert [res["scenario"] for res in results] == ["base", "block"]
+    assert results[0]["obj"] == pytest.approx(tiny_model.ObjValue, rel=1e-6)
+    tiny_model.blockStation(s)
+    assert tiny_model.reSolve(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert results[1]["obj"] == pytest.approx(tiny_model.ObjValue, rel=1e-6)
+    assert s not in {st for _, _, st in results[1]["assignment"]}
+
+
+def test_remove_and_add_worker(tiny_model):
+    assert tiny_model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    obj = tiny_model.WeightedObjValue
+    fixed = {w for _, _, w, _ in tiny_model.data_loader.fixed_alloc}
+    w = sorted(set(tiny_model.data_loader.listWorkers) - fixed)[0]
+    tiny_model.removeWorker(w)
+    if tiny_model.reSolve(time_limit=10000) == pywraplp.Solver.OPTIMAL:
+        assert w not in {wk for _, wk, _ in tiny_model.solutionSupport()}
+    tiny_model.addWorker(w)
+    assert tiny_model.reSolve(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    assert tiny_model.WeightedObjValue == pytest.approx(obj, rel=1e-6)
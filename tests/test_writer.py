@@ -0,0 +1,47 @@
+import json
+
+from moris.data import Dataset, DataLoader, DispatchWriter
+from moris.data.generator import GeneratorConfig, InstanceGenerator
+from moris.model import OptModel
+from moris.model.model import pywraplp
+
+
+def build(instance):
+    model = OptModel(DataLoader(Dataset.from_data(instance)))
+    model.buildModel()
+    return model
+
+
+def test_dispatch_results_cover_every_operation(tmp_path, tiny_instance):
+    model = build(tiny_instance)
+    assert model.solveModel(time_limit=10000) == pywraplp.Solver.OPTIMAL
+    results = model.get_dispatch_results()["dispatch_results"]
+    ops = [op["operation"] for res in results for op in res["operation_list"]]
+    assert sorted(ops) == sorted([p["operation"] for p in tiny_instance["process_list"]])
+    # 每个工位至多一个工人
+    assert len({res["station_code"] for res in results}) == len(results)
+    for res in results:
+        numbers = [op["operation_number"] for op in res["operation_list"]]
+        assert numbers == sorted(numbers)
+    assert model.get_solution().height == len(ops)
+    path = str(tmp_path / "dispatch.jsonl")
+    with DispatchWriter(path) as writer:
+        writer.write("tiny", model.get_dispatch_results())
+        writer.write("tiny-2", {"dispatch_results": []})
+    with open(path, encoding="utf-8") as fp:
+        lines = [json.loads(line) for line in fp]
+    assert [line["instance"] for line in lines] == ["tiny", "tiny-2"]
+    assert lines[0]["dispatch_results"] == results
+
+
+def test_no_solution_gives_empty_results(tiny_instance):
+    # 构建后未求解
+    model = build(tiny_instance)
+    assert model.get_dispatch_results() == {"dispatch_results": []}
+    assert model.get_solution().height == 0
+    # 求解无解
+    config = GeneratorConfig(n_stations=5, n_workers=3, n_parts=2, ops_per_part=3, n_categories=3, n_machines=3,
+                             seed=1)
+    model = build(InstanceGenerator(config).generate())
+    assert model.solveModel(time_limit=10000) == pywraplp.Solver.INFEASIBLE
+    assert model.get_dispatch_results() == {"dispatch_results": []}